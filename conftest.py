@@ -0,0 +1,10 @@
+"""
+Shared pytest setup: make the project root importable once for every test.
+"""
+
+import sys
+from pathlib import Path
+
+_root = str(Path(__file__).parent)
+if _root not in sys.path:
+    sys.path.insert(0, _root)
@@ -5,17 +5,347 @@ Receives full script context from Script Generator UI and transforms basic scene
 into SDXL-optimized prompts with narrative intelligence and style consistency.
 """
 
+import hashlib
+import json
+import os
 import sys
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
+# Optional: embedding model for the semantic prompt cache
+try:
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+# Optional: faster parsing of the AI's JSON replies
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional: FAISS for the nearest-neighbour search (NumPy otherwise)
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from utils.ai_providers import generate_with_ai
+from utils.performance_optimizer import DiskCache
 from settings.config import Config
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so handlers stay the same
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+
+# System prompts are module constants, byte-identical on every call, and
+# share one long leading block: providers with automatic prompt prefix
+# caching (Groq, xAI, OpenAI) can reuse it across scenes and runs. Request
+# text is laid out the same way, per-video context first and the per-scene
+# text last.
+_NARRATIVE_SYSTEM_PROMPT = """You are an expert visual storytelling analyst. Analyze the provided video content to determine the optimal visual style for AI image generation.
+
+Focus on:
+- Overall mood and tone
+- Visual style (cinematic, documentary, educational, dramatic)
+- Color palette preferences
+- Lighting style
+- Composition approach
+- Technical quality level
+
+Respond with a JSON object containing: mood, visual_style, color_palette, lighting, composition, quality_level."""
+
+_SDXL_PROMPT_RULES = """You are an expert SDXL prompt engineer specializing in YouTube Shorts backgrounds.
+
+Transform scene descriptions into optimized SDXL prompts that will generate high-quality vertical background images. Keep the scenes of one video visually consistent with each other.
+
+CRITICAL REQUIREMENTS:
+- Generate prompts that work well with SDXL models
+- Always include vertical composition (9:16 aspect ratio)
+- Use cinematic, professional terminology
+- Include technical photography terms (lighting, camera angles, depth of field)
+- Add art style descriptors that SDXL understands
+- Optimize for YouTube Shorts mobile viewing
+"""
+
+_SCENE_SYSTEM_PROMPT = _SDXL_PROMPT_RULES + """
+RESPOND WITH JSON:
+{
+  "optimized_prompt": "detailed SDXL prompt",
+  "negative_prompt": "what to avoid in this scene"
+}"""
+
+_BATCH_SCENE_SYSTEM_PROMPT = _SDXL_PROMPT_RULES + """
+RESPOND WITH JSON, one entry per scene in the order given:
+{
+  "scenes": [
+    {"optimized_prompt": "detailed SDXL prompt", "negative_prompt": "what to avoid in this scene"}
+  ]
+}"""
+
+# Substrings of provider errors that mean the request was too long
+_CONTEXT_OVERFLOW_MARKERS = (
+    "context length", "context_length", "context window", "too long",
+    "maximum context", "too many tokens", "reduce the length",
+)
+
+
+def _is_context_overflow(error: Exception) -> bool:
+    """True when a provider error reports that the prompt exceeded the context window"""
+    message = str(error).lower()
+    return any(marker in message for marker in _CONTEXT_OVERFLOW_MARKERS)
+
+
+_prompt_cache: Optional[DiskCache] = None
+
+
+def _get_prompt_cache() -> Optional[DiskCache]:
+    """Disk cache of optimized scene prompts under CACHE_DIR/prompt_opt (None when caching is off)"""
+    global _prompt_cache
+    if not getattr(Config, 'ENABLE_CACHING', True):
+        return None
+    if _prompt_cache is None:
+        try:
+            _prompt_cache = DiskCache(Path(Config.CACHE_DIR) / "prompt_opt")
+        except OSError as e:
+            print(f"  ⚠️ Prompt cache unavailable: {e}")
+            return None
+    return _prompt_cache
+
+
+def clear_prompt_cache() -> int:
+    """
+    Delete every cached optimized prompt, e.g. before timing the optimizer.
+    
+    Returns:
+        Number of entries removed
+    """
+    cache = _get_prompt_cache()
+    if cache is None:
+        return 0
+    removed = 0
+    for cache_file in cache.cache_dir.glob("*.cache"):
+        cache_file.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def _scene_cache_key(scene_desc: str, scene_role: str, script_data: Dict) -> str:
+    """Cache key for one scene: its text and role, the script context and the AI model"""
+    payload = json.dumps(
+        {"scene": scene_desc, "role": scene_role, "context": script_data,
+         "model": _ai_model_id()},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _ai_model_id() -> str:
+    """provider/model that answers generate_with_ai calls"""
+    provider = Config.AI_PROVIDER.lower()
+    return f"{provider}/{getattr(Config, f'{provider.upper()}_MODEL', '')}"
+
+
+def _script_context_id(script_data: Dict) -> str:
+    """Short fingerprint of the script context a prompt was optimized for"""
+    payload = json.dumps(script_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class SemanticPromptCache:
+    """
+    Optimized prompts looked up by scene meaning rather than exact text
+    
+    Scene descriptions are embedded with a small sentence-transformers model
+    (normalized, so inner product is cosine similarity); a new scene reuses
+    the cached prompt of the most similar earlier scene with the same role,
+    script context and AI model, when the similarity reaches the threshold.
+    Vectors (raw float32 rows) and entries (JSON lines) persist under
+    cache_dir as vectors.f32 and entries.jsonl; new entries are appended,
+    and both files are only rewritten when max_entries is exceeded and the
+    oldest entries are dropped. The embedding model is only loaded once there
+    is something to look up or store.
+    """
+    
+    def __init__(self, cache_dir: Path, model_name: str, threshold: float, max_entries: int = 5000):
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._model = None
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Dict] = []
+        self._index = None
+    
+    def _is_empty(self) -> bool:
+        """Whether there are no cached prompts, checked without loading the model"""
+        if self._model is not None:
+            return not self._entries
+        entries_path = self.cache_dir / "entries.jsonl"
+        return not entries_path.exists() or entries_path.stat().st_size == 0
+    
+    def _load(self) -> None:
+        """Load the embedding model and the persisted vectors on first real use"""
+        if self._model is not None:
+            return
+        self._model = SentenceTransformer(self.model_name, device="cpu")
+        dim = self._model.get_sentence_embedding_dimension()
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        vectors_path = self.cache_dir / "vectors.f32"
+        entries_path = self.cache_dir / "entries.jsonl"
+        if vectors_path.exists() and entries_path.exists():
+            try:
+                vectors = np.fromfile(vectors_path, dtype=np.float32)
+                vectors = vectors[:len(vectors) // dim * dim].reshape(-1, dim)
+                entries = []
+                with open(entries_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            break  # Torn last line from an interrupted append
+                count = min(len(vectors), len(entries))
+                self._vectors, self._entries = vectors[:count], entries[:count]
+                if count != len(vectors) or count != len(entries):
+                    # Realign the files so later appends pair up again
+                    self._rewrite()
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ Semantic prompt cache unreadable, starting empty: {e}")
+        self._rebuild_index()
+    
+    def _rebuild_index(self) -> None:
+        """FAISS index over the current vectors (None without FAISS)"""
+        if FAISS_AVAILABLE:
+            self._index = faiss.IndexFlatIP(self._vectors.shape[1])
+            self._index.add(self._vectors)
+    
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Unit-length embeddings of scene descriptions, one row each"""
+        return self._model.encode(texts, normalize_embeddings=True).astype(np.float32)
+    
+    def lookup(
+        self, scene_desc: str, scene_role: str, context_id: str, ai_model: str
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Cached (optimized_prompt, negative_prompt) for a near-duplicate scene
+        
+        Returns:
+            The cached tuple, or None when no scene with the same role, script
+            context and AI model is similar enough
+        """
+        if self._is_empty():
+            return None
+        self._load()
+        if not self._entries:
+            return None
+        vector = self._embed([scene_desc])
+        k = min(8, len(self._entries))
+        if self._index is not None:
+            scores, ids = self._index.search(vector, k)
+            candidates = zip(scores[0].tolist(), ids[0].tolist())
+        else:
+            similarities = self._vectors @ vector[0]
+            ids = np.argsort(-similarities)[:k]
+            candidates = zip(similarities[ids].tolist(), ids.tolist())
+        for score, idx in candidates:
+            if score < self.threshold:
+                break
+            entry = self._entries[idx]
+            if (entry["model"] == ai_model and entry.get("role") == scene_role
+                    and entry.get("context") == context_id):
+                return tuple(entry["prompt"])
+        return None
+    
+    def add_many(
+        self, scenes: List[Tuple[str, str]], context_id: str, ai_model: str, results: List[Tuple[str, str]]
+    ) -> None:
+        """
+        Remember optimized prompts and append them to the cache files
+        
+        Args:
+            scenes: (scene description, scene role) per prompt
+            context_id: _script_context_id of the script the prompts belong to
+            ai_model: provider/model that optimized them
+            results: (optimized_prompt, negative_prompt) per scene
+        """
+        if not scenes:
+            return
+        self._load()
+        vectors = self._embed([scene_desc for scene_desc, _ in scenes])
+        entries = [
+            {"scene": scene_desc, "role": scene_role, "context": context_id,
+             "model": ai_model, "prompt": list(result)}
+            for (scene_desc, scene_role), result in zip(scenes, results)
+        ]
+        self._vectors = np.vstack([self._vectors, vectors])
+        self._entries.extend(entries)
+        
+        if len(self._entries) > self.max_entries:
+            # Drop the oldest, leaving headroom so the next appends do not
+            # trigger another full rewrite straight away
+            keep = self.max_entries - self.max_entries // 10
+            self._vectors, self._entries = self._vectors[-keep:], self._entries[-keep:]
+            self._rebuild_index()
+            self._rewrite()
+            return
+        
+        if self._index is not None:
+            self._index.add(vectors)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Vectors first: a torn entries line is dropped on load, and
+            # _load trims whichever file ended up longer
+            with open(self.cache_dir / "vectors.f32", 'ab') as f:
+                f.write(vectors.tobytes())
+            with open(self.cache_dir / "entries.jsonl", 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        except OSError as e:
+            print(f"  ⚠️ Could not save semantic prompt cache: {e}")
+    
+    def _rewrite(self) -> None:
+        """Persist the in-memory cache in full"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write beside the targets and swap in, so a crash never pairs
+            # new vectors with old entries
+            with open(self.cache_dir / "vectors.f32.tmp", 'wb') as f:
+                f.write(self._vectors.tobytes())
+            with open(self.cache_dir / "entries.jsonl.tmp", 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in self._entries)
+            os.replace(self.cache_dir / "vectors.f32.tmp", self.cache_dir / "vectors.f32")
+            os.replace(self.cache_dir / "entries.jsonl.tmp", self.cache_dir / "entries.jsonl")
+        except OSError as e:
+            print(f"  ⚠️ Could not save semantic prompt cache: {e}")
+
+
+_semantic_cache: Optional[SemanticPromptCache] = None
+
+
+def _get_semantic_cache() -> Optional[SemanticPromptCache]:
+    """Semantic prompt cache, or None when disabled or sentence-transformers is missing"""
+    global _semantic_cache
+    if not (SEMANTIC_CACHE_AVAILABLE
+            and getattr(Config, 'ENABLE_CACHING', True)
+            and getattr(Config, 'SD_SEMANTIC_CACHE_ENABLED', False)):
+        return None
+    if _semantic_cache is None:
+        _semantic_cache = SemanticPromptCache(
+            Path(Config.CACHE_DIR) / "prompt_opt" / "semantic",
+            getattr(Config, 'SD_SEMANTIC_CACHE_MODEL', 'sentence-transformers/all-MiniLM-L6-v2'),
+            getattr(Config, 'SD_SEMANTIC_CACHE_THRESHOLD', 0.92),
+            getattr(Config, 'SD_SEMANTIC_CACHE_MAX_ENTRIES', 5000),
+        )
+    return _semantic_cache
+
 
 class AIPromptOptimizer:
     """Context-aware prompt optimizer that enhances scene descriptions with SDXL intelligence"""
@@ -24,6 +354,7 @@ class AIPromptOptimizer:
         self.provider = getattr(Config, 'SD_PROMPT_OPTIMIZER_PROVIDER', 'groq').lower()
         self.context_aware = getattr(Config, 'SD_PROMPT_CONTEXT_AWARE', True)
         self.vertical_optimization = True  # Always optimize for 9:16 YouTube Shorts
+        self.fallback_count = 0  # Scenes answered by _fallback_optimization
         
     def optimize_prompts_with_context(
         self, 
@@ -58,28 +389,69 @@ class AIPromptOptimizer:
         
         print(f"  📖 Context: '{video_title}' - {len(scene_descriptions)} scenes")
         
-        # Analyze narrative flow and style
-        narrative_analysis = self._analyze_narrative_context(
-            video_title, narrator_script, video_topic
-        )
+        # Each scene is tagged with its role in the narrative
+        scenes = [
+            (scene_desc, self._determine_scene_role(i, len(scene_descriptions)))
+            for i, scene_desc in enumerate(scene_descriptions)
+        ]
         
-        # Optimize each scene with context
-        optimized_prompts = []
-        for i, scene_desc in enumerate(scene_descriptions):
-            print(f"  Optimizing scene {i+1}/{len(scene_descriptions)}: {scene_desc[:50]}...")
+        # Scenes optimized before for the same script and model come from
+        # the disk cache; only the rest are sent to the AI
+        cache = _get_prompt_cache()
+        keys = [_scene_cache_key(desc, role, script_data) for desc, role in scenes]
+        optimized_prompts: List[Optional[Tuple[str, str]]] = [None] * len(scenes)
+        if cache is not None:
+            for i, key in enumerate(keys):
+                if cache.is_valid(key):
+                    cached = cache.get(key)
+                    if cached:
+                        optimized_prompts[i] = tuple(cached)
+        
+        # Near-duplicates of scenes optimized earlier by the same model
+        semantic_cache = _get_semantic_cache()
+        ai_model = _ai_model_id()
+        context_id = _script_context_id(script_data)
+        if semantic_cache is not None:
+            for i, prompt in enumerate(optimized_prompts):
+                if prompt is None:
+                    optimized_prompts[i] = semantic_cache.lookup(*scenes[i], context_id, ai_model)
+        
+        misses = [i for i, prompt in enumerate(optimized_prompts) if prompt is None]
+        if len(misses) < len(scenes):
+            print(f"  ♻️ {len(scenes) - len(misses)} scene prompts reused from cache")
+        
+        if misses:
+            # Analyze narrative flow and style
+            narrative_analysis = self._analyze_narrative_context(
+                video_title, narrator_script, video_topic
+            )
             
-            # Determine scene role in narrative
-            scene_role = self._determine_scene_role(i, len(scene_descriptions))
+            # A scene repeated in the same role is optimized once and its
+            # result shared (roles differ by position, so the key includes it)
+            first_miss = {}
+            for i in misses:
+                first_miss.setdefault(keys[i], i)
+            unique = list(first_miss.values())
             
-            # Generate optimized prompt
-            optimized_prompt, negative_prompt = self._optimize_single_scene(
-                scene_desc, 
-                narrative_analysis, 
-                scene_role,
-                video_title
+            # Optimize all remaining scenes in one request;
+            # _optimize_scene_batch splits the batch if needed
+            print(f"  Optimizing {len(unique)} scenes in one request...")
+            fallbacks_before = self.fallback_count
+            results = self._optimize_scene_batch(
+                [scenes[i] for i in unique], narrative_analysis, video_title
             )
+            by_key = {keys[i]: result for i, result in zip(unique, results)}
+            for i in misses:
+                optimized_prompts[i] = by_key[keys[i]]
             
-            optimized_prompts.append((optimized_prompt, negative_prompt))
+            # Offline fallback results are not cached, so the next run retries the AI
+            if self.fallback_count == fallbacks_before:
+                ttl = getattr(Config, 'SD_PROMPT_CACHE_TTL', 7 * 24 * 3600)
+                if cache is not None:
+                    for i, result in zip(unique, results):
+                        cache.put(keys[i], list(result), ttl=ttl)
+                if semantic_cache is not None:
+                    semantic_cache.add_many([scenes[i] for i in unique], context_id, ai_model, results)
         
         print(f"  Optimized {len(optimized_prompts)} prompts with AI intelligence")
         return optimized_prompts
@@ -92,18 +464,6 @@ class AIPromptOptimizer:
     ) -> Dict[str, str]:
         """Analyze the narrative context to understand video style and mood"""
         
-        system_prompt = """You are an expert visual storytelling analyst. Analyze the provided video content to determine the optimal visual style for AI image generation.
-
-Focus on:
-- Overall mood and tone
-- Visual style (cinematic, documentary, educational, dramatic)
-- Color palette preferences
-- Lighting style
-- Composition approach
-- Technical quality level
-
-Respond with a JSON object containing: mood, visual_style, color_palette, lighting, composition, quality_level."""
-
         user_prompt = f"""Analyze this YouTube Short content:
 
 Title: {title}
@@ -113,12 +473,11 @@ Script: {script[:500]}...
 Determine the optimal visual style for background images that will support this narration."""
 
         try:
-            analysis_text = generate_with_ai(system_prompt, user_prompt)
+            analysis_text = generate_with_ai(_NARRATIVE_SYSTEM_PROMPT, user_prompt)
             
             # Parse JSON response (fallback to defaults if parsing fails)
             try:
-                import json
-                analysis = json.loads(analysis_text)
+                analysis = _json_loads(analysis_text)
                 return {
                     'mood': analysis.get('mood', 'engaging'),
                     'visual_style': analysis.get('visual_style', 'cinematic'),
@@ -149,6 +508,77 @@ Determine the optimal visual style for background images that will support this
         else:
             return "development"  # Develop the story
     
+    def _optimize_scene_batch(
+        self,
+        scenes: List[Tuple[str, str]],
+        narrative_analysis: Dict[str, str],
+        video_title: str
+    ) -> List[Tuple[str, str]]:
+        """
+        Optimize several scenes with a single AI request
+        
+        Args:
+            scenes: (scene description, scene role) pairs in narrative order
+            narrative_analysis: Result of _analyze_narrative_context
+            video_title: Video title
+            
+        Returns:
+            List of (optimized_prompt, negative_prompt) tuples, one per scene
+        
+        A batch that overflows the context window or comes back unparseable
+        (usually a reply cut off at the token limit) is split in half and
+        retried; a single scene goes through _optimize_single_scene. Other
+        provider errors fall back to offline optimization for the batch.
+        """
+        if len(scenes) == 1:
+            scene_desc, scene_role = scenes[0]
+            return [self._optimize_single_scene(scene_desc, narrative_analysis, scene_role, video_title)]
+        
+        scene_blocks = "\n".join(
+            f"### SCENE {i + 1} (role: {scene_role})\n{scene_desc}"
+            for i, (scene_desc, scene_role) in enumerate(scenes)
+        )
+        user_prompt = f"""Video Title: {video_title}
+Visual Style: {narrative_analysis['visual_style']}
+Mood: {narrative_analysis['mood']}
+Color Palette: {narrative_analysis['color_palette']}
+Lighting: {narrative_analysis['lighting']}
+Composition: {narrative_analysis['composition']}
+
+SCENES:
+{scene_blocks}
+
+Generate an optimized SDXL prompt for each of the {len(scenes)} scenes."""
+        
+        try:
+            response_text = generate_with_ai(_BATCH_SCENE_SYSTEM_PROMPT, user_prompt)
+            results = _json_loads(response_text)["scenes"]
+            if not isinstance(results, list) or len(results) != len(scenes):
+                raise ValueError(f"expected {len(scenes)} scenes, got {len(results)}")
+            return [
+                self._finish_prompt(
+                    result.get('optimized_prompt', scene_desc),
+                    result.get('negative_prompt', '')
+                )
+                for result, (scene_desc, _) in zip(results, scenes)
+            ]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"    ⚠️ Could not parse batch response ({e}), splitting batch")
+        except Exception as e:
+            if not _is_context_overflow(e):
+                print(f"    ⚠️ AI optimization failed: {e}, using fallback")
+                return [
+                    self._fallback_optimization(scene_desc, narrative_analysis)
+                    for scene_desc, _ in scenes
+                ]
+            print(f"    ⚠️ Batch of {len(scenes)} scenes too long, splitting batch")
+        
+        middle = len(scenes) // 2
+        return (
+            self._optimize_scene_batch(scenes[:middle], narrative_analysis, video_title)
+            + self._optimize_scene_batch(scenes[middle:], narrative_analysis, video_title)
+        )
+    
     def _optimize_single_scene(
         self, 
         scene_desc: str, 
@@ -158,75 +588,29 @@ Determine the optimal visual style for background images that will support this
     ) -> Tuple[str, str]:
         """Optimize a single scene description with full context"""
         
-        system_prompt = """You are an expert SDXL prompt engineer specializing in YouTube Shorts backgrounds.
-
-Transform the given scene description into an optimized SDXL prompt that will generate high-quality vertical background images.
-
-CRITICAL REQUIREMENTS:
-- Generate prompts that work well with SDXL models
-- Always include vertical composition (9:16 aspect ratio)
-- Use cinematic, professional terminology
-- Include technical photography terms (lighting, camera angles, depth of field)
-- Add art style descriptors that SDXL understands
-- Optimize for YouTube Shorts mobile viewing
-
-RESPOND WITH JSON:
-{
-  "optimized_prompt": "detailed SDXL prompt",
-  "negative_prompt": "what to avoid in this scene"
-}"""
-
-        user_prompt = f"""Scene Description: {scene_desc}
-
-Video Title: {video_title}
-Scene Role: {scene_role}
+        user_prompt = f"""Video Title: {video_title}
 Visual Style: {narrative_analysis['visual_style']}
 Mood: {narrative_analysis['mood']}
 Color Palette: {narrative_analysis['color_palette']}
 Lighting: {narrative_analysis['lighting']}
 Composition: {narrative_analysis['composition']}
 
+Scene Role: {scene_role}
+Scene Description: {scene_desc}
+
 Generate an optimized SDXL prompt for this scene."""
 
         try:
-            response_text = generate_with_ai(system_prompt, user_prompt)
+            response_text = generate_with_ai(_SCENE_SYSTEM_PROMPT, user_prompt)
             
             # Parse JSON response
             try:
-                import json
-                result = json.loads(response_text)
-                
-                optimized_prompt = result.get('optimized_prompt', scene_desc)
-                negative_prompt = result.get('negative_prompt', '')
+                result = _json_loads(response_text)
                 
-                # Add standard vertical optimization if not already present
-                if 'vertical' not in optimized_prompt.lower() and 'portrait' not in optimized_prompt.lower():
-                    optimized_prompt += ", vertical composition, portrait orientation, 9:16 aspect ratio"
-                
-                # Add standard quality boosters
-                quality_boosters = [
-                    "high quality", "detailed", "cinematic", "professional photography",
-                    "vibrant colors", "sharp focus", "mobile optimized"
-                ]
-                
-                for booster in quality_boosters:
-                    if booster not in optimized_prompt.lower():
-                        optimized_prompt += f", {booster}"
-                
-                # Ensure negative prompt has standard avoidances
-                standard_negatives = [
-                    "blurry", "low quality", "distorted", "ugly", "bad composition",
-                    "horizontal", "landscape orientation", "text", "watermark"
-                ]
-                
-                for neg in standard_negatives:
-                    if neg not in negative_prompt.lower():
-                        if negative_prompt:
-                            negative_prompt += ", " + neg
-                        else:
-                            negative_prompt = neg
-                
-                return optimized_prompt, negative_prompt
+                return self._finish_prompt(
+                    result.get('optimized_prompt', scene_desc),
+                    result.get('negative_prompt', '')
+                )
                 
             except (json.JSONDecodeError, AttributeError):
                 print(f"    ⚠️ Could not parse AI response, using fallback optimization")
@@ -236,6 +620,38 @@ Generate an optimized SDXL prompt for this scene."""
             print(f"    ⚠️ AI optimization failed: {e}, using fallback")
             return self._fallback_optimization(scene_desc, narrative_analysis)
     
+    def _finish_prompt(self, optimized_prompt: str, negative_prompt: str) -> Tuple[str, str]:
+        """Add the standard vertical, quality and negative terms an AI prompt is missing"""
+        
+        # Add standard vertical optimization if not already present
+        if 'vertical' not in optimized_prompt.lower() and 'portrait' not in optimized_prompt.lower():
+            optimized_prompt += ", vertical composition, portrait orientation, 9:16 aspect ratio"
+        
+        # Add standard quality boosters
+        quality_boosters = [
+            "high quality", "detailed", "cinematic", "professional photography",
+            "vibrant colors", "sharp focus", "mobile optimized"
+        ]
+        
+        for booster in quality_boosters:
+            if booster not in optimized_prompt.lower():
+                optimized_prompt += f", {booster}"
+        
+        # Ensure negative prompt has standard avoidances
+        standard_negatives = [
+            "blurry", "low quality", "distorted", "ugly", "bad composition",
+            "horizontal", "landscape orientation", "text", "watermark"
+        ]
+        
+        for neg in standard_negatives:
+            if neg not in negative_prompt.lower():
+                if negative_prompt:
+                    negative_prompt += ", " + neg
+                else:
+                    negative_prompt = neg
+        
+        return optimized_prompt, negative_prompt
+    
     def _basic_optimization(self, scene_descriptions: List[str]) -> List[Tuple[str, str]]:
         """Basic optimization without script context"""
         
@@ -265,6 +681,8 @@ Generate an optimized SDXL prompt for this scene."""
     ) -> Tuple[str, str]:
         """Fallback optimization when AI fails"""
         
+        self.fallback_count += 1
+        
         # Apply narrative analysis to enhance the prompt
         style_terms = []
         
@@ -8,11 +8,20 @@ and provide refinement suggestions for iterative improvement.
 import sys
 import base64
 import io
+import json
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
+import numpy as np
 from PIL import Image
 
+# Optional: OpenCV for the local sharpness/colour pre-check
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -21,6 +30,92 @@ from utils.ai_providers import generate_with_ai
 from settings.config import Config
 
 
+# Local pre-check references: Laplacian variance of a crisp render and the
+# saturation spread of a colourful one; each maps to half of a 0-10 score
+_SHARPNESS_REFERENCE = 300.0
+_SATURATION_REFERENCE = 40.0
+
+
+def _fast_quality_score(image: Image.Image) -> Optional[float]:
+    """
+    Cheap 0-10 score from sharpness and colour, or None without OpenCV.
+    
+    Blurry (low Laplacian variance) or flat, washed-out (low saturation
+    spread) images score low; it cannot judge content, only rule images in.
+    """
+    
+    if not CV2_AVAILABLE:
+        return None
+    
+    rgb = np.asarray(image.convert('RGB'))
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    saturation_spread = np.std(cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)[..., 1])
+    return (5.0 * min(1.0, sharpness / _SHARPNESS_REFERENCE)
+            + 5.0 * min(1.0, saturation_spread / _SATURATION_REFERENCE))
+
+
+# Scoring instructions shared by the single-image and batched analyses
+_VISION_SYSTEM_PROMPT = """You are an expert image quality analyst for YouTube Shorts backgrounds. Analyze the provided image and evaluate it on multiple quality factors.
+
+Rate each factor on a scale of 1-10:
+- prompt_match: How well does the image match the intended prompt?
+- composition: Is the composition effective for vertical video?
+- vertical_format: Is it optimized for 9:16 aspect ratio and mobile viewing?
+- artifacts: Are there visual artifacts or quality issues?
+- narrative_fit: Does it support the video's narrative context?
+
+Respond with JSON:
+{
+  "overall_score": 8.5,
+  "factor_scores": {
+    "prompt_match": 8,
+    "composition": 9,
+    "vertical_format": 7,
+    "artifacts": 9,
+    "narrative_fit": 8
+  },
+  "analysis": "Detailed analysis of the image quality",
+  "strengths": ["List of strengths"],
+  "weaknesses": ["List of areas for improvement"],
+  "refinement_suggestions": ["Specific suggestions for improvement"]
+}"""
+
+_TEXT_SYSTEM_PROMPT = """You are an expert image quality analyst for YouTube Shorts backgrounds. Based on the prompt and context provided, evaluate what the generated image should look like and assess its likely quality.
+
+Rate each factor on a scale of 1-10:
+- prompt_match: How likely is the image to match the intended prompt?
+- composition: Is the prompt composition effective for vertical video?
+- vertical_format: Is the prompt optimized for 9:16 aspect ratio?
+- artifacts: Are there likely to be visual artifacts based on the prompt?
+- narrative_fit: Does the prompt support the video's narrative context?
+
+Respond with JSON:
+{
+  "overall_score": 8.5,
+  "factor_scores": {
+    "prompt_match": 8,
+    "composition": 9,
+    "vertical_format": 7,
+    "artifacts": 9,
+    "narrative_fit": 8
+  },
+  "analysis": "Analysis of prompt quality and likely image results",
+  "strengths": ["List of prompt strengths"],
+  "weaknesses": ["List of prompt areas for improvement"],
+  "refinement_suggestions": ["Specific suggestions for prompt improvement"]
+}"""
+
+_BATCH_FORMAT = """
+
+You will receive several numbered scenes. Evaluate each one on its own and respond with JSON:
+{"scenes": [<one object in the format above per scene, in the same order>]}"""
+
+# Scenes per batched call; more inputs per request start to blur the
+# per-scene scores into each other
+_QUALITY_BATCH_SIZE = 6
+
+
 class ImageQualityAnalyzer:
     """AI-powered image quality analyzer with context-aware scoring"""
     
@@ -28,6 +123,7 @@ class ImageQualityAnalyzer:
         self.use_quality_analysis = getattr(Config, 'SD_USE_QUALITY_ANALYSIS', True)
         self.quality_threshold = getattr(Config, 'SD_QUALITY_THRESHOLD', 7.5)
         self.max_iterations = getattr(Config, 'SD_MAX_REFINEMENT_ITERATIONS', 2)
+        self.fast_quality_threshold = getattr(Config, 'SD_FAST_QUALITY_THRESHOLD', 8.0)
         self.quality_factors = getattr(Config, 'SD_QUALITY_CHECK_FACTORS', 
                                      ["prompt_match", "composition", "vertical_format", "artifacts", "narrative_fit"])
         
@@ -67,6 +163,11 @@ class ImageQualityAnalyzer:
         
         print(f"Quality Analyzer: Evaluating scene {scene_index + 1}...")
         
+        # Clearly sharp, colourful images pass without an AI request
+        fast_analysis = self._fast_analysis(image)
+        if fast_analysis:
+            return fast_analysis
+        
         # If vision models available, use them; otherwise use text-based analysis
         if self.vision_available:
             return self._analyze_with_vision(image, original_prompt, scene_description, script_context)
@@ -85,30 +186,7 @@ class ImageQualityAnalyzer:
         # Convert image to base64 for API
         image_base64 = self._image_to_base64(image)
         
-        system_prompt = """You are an expert image quality analyst for YouTube Shorts backgrounds. Analyze the provided image and evaluate it on multiple quality factors.
-
-Rate each factor on a scale of 1-10:
-- prompt_match: How well does the image match the intended prompt?
-- composition: Is the composition effective for vertical video?
-- vertical_format: Is it optimized for 9:16 aspect ratio and mobile viewing?
-- artifacts: Are there visual artifacts or quality issues?
-- narrative_fit: Does it support the video's narrative context?
-
-Respond with JSON:
-{
-  "overall_score": 8.5,
-  "factor_scores": {
-    "prompt_match": 8,
-    "composition": 9,
-    "vertical_format": 7,
-    "artifacts": 9,
-    "narrative_fit": 8
-  },
-  "analysis": "Detailed analysis of the image quality",
-  "strengths": ["List of strengths"],
-  "weaknesses": ["List of areas for improvement"],
-  "refinement_suggestions": ["Specific suggestions for improvement"]
-}"""
+        system_prompt = _VISION_SYSTEM_PROMPT
 
         user_prompt = f"""Analyze this YouTube Shorts background image:
 
@@ -117,34 +195,14 @@ Scene Description: {scene_description}
 
 {self._get_script_context_for_analysis(script_context)}
 
-Image: [BASE64_IMAGE_DATA]"""
+The image is attached."""
 
         try:
-            # Replace placeholder with actual base64 data
-            user_prompt = user_prompt.replace("[BASE64_IMAGE_DATA]", image_base64)
-            
-            response_text = generate_with_ai(system_prompt, user_prompt)
+            # The image travels as an image content part, not as prompt text
+            response_text = generate_with_ai(system_prompt, user_prompt, images=[image_base64])
             
             # Parse JSON response
-            import json
-            analysis_result = json.loads(response_text)
-            
-            overall_score = analysis_result.get('overall_score', 5.0)
-            meets_threshold = overall_score >= self.quality_threshold
-            
-            print(f"  📊 Overall Score: {overall_score:.1f}/10 (Threshold: {self.quality_threshold})")
-            print(f"  {'✅ PASS' if meets_threshold else '❌ FAIL'} - {'Meets quality threshold' if meets_threshold else 'Below quality threshold'}")
-            
-            return {
-                "enabled": True,
-                "overall_score": overall_score,
-                "meets_threshold": meets_threshold,
-                "factor_scores": analysis_result.get('factor_scores', {}),
-                "analysis": analysis_result.get('analysis', 'No analysis provided'),
-                "strengths": analysis_result.get('strengths', []),
-                "weaknesses": analysis_result.get('weaknesses', []),
-                "refinement_suggestions": analysis_result.get('refinement_suggestions', [])
-            }
+            return self._build_analysis(json.loads(response_text))
             
         except Exception as e:
             print(f"  Vision analysis failed: {e}, falling back to text-based analysis")
@@ -159,30 +217,7 @@ Image: [BASE64_IMAGE_DATA]"""
     ) -> Dict[str, Any]:
         """Analyze image using text-based LLM analysis (fallback method)"""
         
-        system_prompt = """You are an expert image quality analyst for YouTube Shorts backgrounds. Based on the prompt and context provided, evaluate what the generated image should look like and assess its likely quality.
-
-Rate each factor on a scale of 1-10:
-- prompt_match: How likely is the image to match the intended prompt?
-- composition: Is the prompt composition effective for vertical video?
-- vertical_format: Is the prompt optimized for 9:16 aspect ratio?
-- artifacts: Are there likely to be visual artifacts based on the prompt?
-- narrative_fit: Does the prompt support the video's narrative context?
-
-Respond with JSON:
-{
-  "overall_score": 8.5,
-  "factor_scores": {
-    "prompt_match": 8,
-    "composition": 9,
-    "vertical_format": 7,
-    "artifacts": 9,
-    "narrative_fit": 8
-  },
-  "analysis": "Analysis of prompt quality and likely image results",
-  "strengths": ["List of prompt strengths"],
-  "weaknesses": ["List of prompt areas for improvement"],
-  "refinement_suggestions": ["Specific suggestions for prompt improvement"]
-}"""
+        system_prompt = _TEXT_SYSTEM_PROMPT
 
         user_prompt = f"""Analyze this YouTube Shorts background generation:
 
@@ -197,30 +232,134 @@ Evaluate the quality of the prompt and likely resulting image."""
             response_text = generate_with_ai(system_prompt, user_prompt)
             
             # Parse JSON response
-            import json
-            analysis_result = json.loads(response_text)
-            
-            overall_score = analysis_result.get('overall_score', 5.0)
-            meets_threshold = overall_score >= self.quality_threshold
-            
-            print(f"  📊 Overall Score: {overall_score:.1f}/10 (Threshold: {self.quality_threshold})")
-            print(f"  {'✅ PASS' if meets_threshold else '❌ FAIL'} - {'Meets quality threshold' if meets_threshold else 'Below quality threshold'}")
-            
-            return {
-                "enabled": True,
-                "overall_score": overall_score,
-                "meets_threshold": meets_threshold,
-                "factor_scores": analysis_result.get('factor_scores', {}),
-                "analysis": analysis_result.get('analysis', 'No analysis provided'),
-                "strengths": analysis_result.get('strengths', []),
-                "weaknesses": analysis_result.get('weaknesses', []),
-                "refinement_suggestions": analysis_result.get('refinement_suggestions', [])
-            }
+            return self._build_analysis(json.loads(response_text))
             
         except Exception as e:
             print(f"  Text-based analysis failed: {e}, using default scoring")
             return self._get_default_analysis()
     
+    def analyze_image_quality_batch(
+        self,
+        images: List[Image.Image],
+        original_prompts: List[str],
+        scene_descriptions: List[str],
+        script_context: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze several generated images with one AI request per batch.
+        
+        Args:
+            images: Generated images, in scene order
+            original_prompts: SDXL prompt used for each image
+            scene_descriptions: Basic description of each scene
+            script_context: Full script context for narrative fit
+            
+        Returns:
+            One analysis dictionary per image, in the same order
+        """
+        
+        if not self.use_quality_analysis:
+            return [self.analyze_image_quality(image, "", "") for image in images]
+        
+        # Only images the local pre-check cannot pass go to the AI
+        analyses = [self._fast_analysis(image) for image in images]
+        pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if len(pending) < len(images):
+            print(f"Quality Analyzer: {len(images) - len(pending)} of {len(images)} scenes passed the local check")
+        
+        for first in range(0, len(pending), _QUALITY_BATCH_SIZE):
+            chunk = pending[first:first + _QUALITY_BATCH_SIZE]
+            results = self._analyze_batch(
+                [images[i] for i in chunk], [original_prompts[i] for i in chunk],
+                [scene_descriptions[i] for i in chunk], script_context, chunk[0]
+            )
+            for i, result in zip(chunk, results):
+                analyses[i] = result
+        return analyses
+    
+    def _analyze_batch(
+        self,
+        images: List[Image.Image],
+        original_prompts: List[str],
+        scene_descriptions: List[str],
+        script_context: Optional[Dict[str, Any]],
+        first_index: int
+    ) -> List[Dict[str, Any]]:
+        """One batched request; falls back to per-image analysis if the reply does not fit"""
+        
+        print(f"Quality Analyzer: Evaluating scenes {first_index + 1}-{first_index + len(images)} in one request...")
+        
+        system_prompt = (_VISION_SYSTEM_PROMPT if self.vision_available else _TEXT_SYSTEM_PROMPT) + _BATCH_FORMAT
+        scene_blocks = []
+        for i, (image, prompt, scene) in enumerate(zip(images, original_prompts, scene_descriptions)):
+            block = f"### SCENE {i + 1}\nOriginal Prompt: {prompt}\nScene Description: {scene}"
+            if self.vision_available:
+                block += f"\nImage: attached image {i + 1}"
+            scene_blocks.append(block)
+        # Attached in scene order as image content parts
+        attached_images = [self._image_to_base64(image) for image in images] if self.vision_available else None
+        
+        user_prompt = f"""Analyze these YouTube Shorts background {'images' if self.vision_available else 'generations'}:
+
+{self._get_script_context_for_analysis(script_context)}
+
+""" + "\n\n".join(scene_blocks)
+        
+        try:
+            response_text = generate_with_ai(system_prompt, user_prompt, images=attached_images)
+            scene_results = json.loads(response_text)["scenes"]
+            if len(scene_results) != len(images):
+                raise ValueError(f"expected {len(images)} scene results, got {len(scene_results)}")
+            return [self._build_analysis(result) for result in scene_results]
+            
+        except Exception as e:
+            print(f"  Batched analysis failed: {e}, analyzing scenes one at a time")
+            return [
+                self.analyze_image_quality(image, prompt, scene, script_context, first_index + i)
+                for i, (image, prompt, scene) in enumerate(zip(images, original_prompts, scene_descriptions))
+            ]
+    
+    def _fast_analysis(self, image: Image.Image) -> Optional[Dict[str, Any]]:
+        """Passing analysis from the local pre-check, or None if the AI should decide"""
+        
+        score = _fast_quality_score(image)
+        # Never pass an image on a score the AI threshold would fail
+        if score is None or score < max(self.fast_quality_threshold, self.quality_threshold):
+            return None
+        
+        print(f"  📊 Local check: {score:.1f}/10 - sharp and colourful, skipping AI analysis")
+        return {
+            "enabled": True,
+            "source": "fast",
+            "overall_score": score,
+            "meets_threshold": True,
+            "factor_scores": {},
+            "analysis": "Passed local sharpness and colour check",
+            "strengths": ["Sharp", "Colourful"],
+            "weaknesses": [],
+            "refinement_suggestions": []
+        }
+    
+    def _build_analysis(self, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Analysis dictionary from a parsed AI reply"""
+        
+        overall_score = analysis_result.get('overall_score', 5.0)
+        meets_threshold = overall_score >= self.quality_threshold
+        
+        print(f"  📊 Overall Score: {overall_score:.1f}/10 (Threshold: {self.quality_threshold})")
+        print(f"  {'✅ PASS' if meets_threshold else '❌ FAIL'} - {'Meets quality threshold' if meets_threshold else 'Below quality threshold'}")
+        
+        return {
+            "enabled": True,
+            "overall_score": overall_score,
+            "meets_threshold": meets_threshold,
+            "factor_scores": analysis_result.get('factor_scores', {}),
+            "analysis": analysis_result.get('analysis', 'No analysis provided'),
+            "strengths": analysis_result.get('strengths', []),
+            "weaknesses": analysis_result.get('weaknesses', []),
+            "refinement_suggestions": analysis_result.get('refinement_suggestions', [])
+        }
+    
     def generate_refinement_prompt(
         self,
         original_prompt: str,
@@ -273,7 +412,6 @@ Generate an improved prompt that addresses the identified issues."""
             response_text = generate_with_ai(system_prompt, user_prompt)
             
             # Parse JSON response
-            import json
             refinement_result = json.loads(response_text)
             
             refined_prompt = refinement_result.get('refined_prompt', original_prompt)
@@ -361,6 +499,29 @@ def analyze_image_quality(
     return analyzer.analyze_image_quality(image, original_prompt, scene_description, script_context, scene_index)
 
 
+def analyze_image_quality_batch(
+    images: List[Image.Image],
+    original_prompts: List[str],
+    scene_descriptions: List[str],
+    script_context: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Analyze several images' quality with batched AI requests.
+    
+    Args:
+        images: Generated images, in scene order
+        original_prompts: SDXL prompt used for each image
+        scene_descriptions: Basic description of each scene
+        script_context: Full script context for narrative fit
+        
+    Returns:
+        One analysis dictionary per image, in the same order
+    """
+    
+    analyzer = ImageQualityAnalyzer()
+    return analyzer.analyze_image_quality_batch(images, original_prompts, scene_descriptions, script_context)
+
+
 def generate_refinement_prompt(
     original_prompt: str,
     quality_analysis: Dict[str, Any],
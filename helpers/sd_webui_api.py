@@ -6,35 +6,77 @@ This allows using the WebUI's powerful features while keeping our existing workf
 """
 
 import base64
+import hashlib
 import io
 import json
+import os
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 
+# Optional: orjson parses the multi-MB base64 image replies several times faster
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
 
 class SDWebUIAPI:
     """Interface to AUTOMATIC1111 Stable Diffusion WebUI API"""
     
-    def __init__(self, host: str = "http://127.0.0.1:7860", timeout: int = 300):
+    def __init__(
+        self,
+        host: str = "http://127.0.0.1:7860",
+        timeout: int = 300,
+        pool_maxsize: int = 16,
+        cache_dir: Optional[str] = None,
+    ):
         """
         Initialize WebUI API client
         
         Args:
             host: WebUI API host URL (default: http://127.0.0.1:7860)
             timeout: Request timeout in seconds (default: 300 for slow generations)
+            pool_maxsize: Keep-alive connections held open to the WebUI (one per
+                in-flight request, so queued batches reuse them too)
+            cache_dir: Folder for generated PNGs reused across runs
+                (default: Config.CACHE_DIR/sd_webui)
+        
+        The image cache is opt-in: per call with use_cache=True, or for every
+        call when Config.SD_WEBUI_IMAGE_CACHE is set.
         """
         self.host = host.rstrip('/')
         self.timeout = timeout
-        self._check_connection()
+        self.cache_images = False
+        try:
+            from settings.config import Config
+            self.cache_images = getattr(Config, 'SD_WEBUI_IMAGE_CACHE', False)
+            if cache_dir is None:
+                cache_dir = str(Path(Config.CACHE_DIR) / "sd_webui")
+        except ImportError:
+            pass
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        # One session for every call so the TCP connection stays warm
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.connected = self._check_connection()
     
     def _check_connection(self) -> bool:
         """Check if WebUI API is accessible"""
         try:
-            response = requests.get(f"{self.host}/sdapi/v1/options", timeout=5)
+            response = self.session.get(f"{self.host}/sdapi/v1/options", timeout=5)
             if response.status_code == 200:
                 print(f"✓ Connected to Stable Diffusion WebUI at {self.host}")
                 return True
@@ -57,6 +99,8 @@ class SDWebUIAPI:
         sampler: str = "DPM++ 2M Karras",
         seed: int = -1,
         controlnet_units: Optional[List[Dict[str, Any]]] = None,
+        task_id: Optional[str] = None,
+        use_cache: Optional[bool] = None,
     ) -> Optional[Image.Image]:
         """
         Generate a single image using the WebUI API
@@ -71,6 +115,10 @@ class SDWebUIAPI:
             sampler: Sampling method (see WebUI for options)
             seed: Random seed (-1 for random)
             controlnet_units: List of ControlNet units for guidance
+            task_id: WebUI task id for the job, so get_task_progress can follow it
+            use_cache: Reuse/store the PNG in the image cache; a random seed
+                is then fixed per request, so the same request always returns
+                the same image (default: Config.SD_WEBUI_IMAGE_CACHE)
         
         Returns:
             PIL Image or None if generation failed
@@ -93,6 +141,8 @@ class SDWebUIAPI:
             "n_iter": 1,
             "batch_size": 1,
         }
+        if task_id:
+            payload["force_task_id"] = task_id
         
         # Add ControlNet support if units provided
         if controlnet_units and len(controlnet_units) > 0:
@@ -133,11 +183,32 @@ class SDWebUIAPI:
             # Config not available, skip tiling
             pass
         
+        # Opt-in: identical requests reuse the PNG from an earlier run. A
+        # random seed is replaced by one derived from the request, so the
+        # cached image is exactly what that request generates. The key names
+        # the checkpoint loaded right now; if it cannot be read, no caching
+        cache_path = None
+        if use_cache is None:
+            use_cache = self.cache_images
+        checkpoint = self._current_checkpoint() if use_cache and self.cache_dir is not None else None
+        if checkpoint:
+            key_payload = {k: v for k, v in payload.items() if k != "force_task_id"}
+            key_payload["model"] = checkpoint
+            key = hashlib.sha256(json.dumps(key_payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            if payload["seed"] == -1:
+                payload["seed"] = int(key[:8], 16)
+            cache_path = self.cache_dir / f"{key}.png"
+            if cache_path.exists():
+                with Image.open(cache_path) as cached:
+                    cached.load()
+                print(f"  ✓ Reused cached image {key[:12]} (skipped generation)")
+                return cached
+        
         try:
             print(f"  Generating via WebUI API ({width}x{height}, {steps} steps)...")
             start_time = time.time()
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.host}/sdapi/v1/txt2img",
                 json=payload,
                 timeout=self.timeout
@@ -148,12 +219,15 @@ class SDWebUIAPI:
                 return None
             
             # Parse response
-            result = response.json()
+            result = _json_loads(response.content)
             
             # Decode base64 image
             if "images" in result and len(result["images"]) > 0:
                 image_data = base64.b64decode(result["images"][0])
                 image = Image.open(io.BytesIO(image_data))
+                image.load()  # Decode once here; callers hand the image to save/analysis threads
+                if cache_path is not None:
+                    self._store_in_cache(image_data, cache_path)
                 
                 gen_time = time.time() - start_time
                 print(f"  ✓ Generated in {gen_time:.1f}s")
@@ -170,6 +244,27 @@ class SDWebUIAPI:
             print(f"  Error generating image: {e}")
             return None
     
+    def _current_checkpoint(self) -> Optional[str]:
+        """Checkpoint the WebUI has loaded now (None if it cannot be read)"""
+        try:
+            response = self.session.get(f"{self.host}/sdapi/v1/options", timeout=5)
+            if response.status_code == 200:
+                return response.json().get("sd_model_checkpoint") or None
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        return None
+    
+    def _store_in_cache(self, png_data: bytes, cache_path: Path) -> None:
+        """Write PNG bytes to the cache atomically (never a truncated hit)"""
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{id(png_data)}.tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(png_data)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"  Warning: could not cache image: {e}")
+            tmp_path.unlink(missing_ok=True)
+    
     def generate_batch(
         self,
         prompts: List[str],
@@ -179,10 +274,22 @@ class SDWebUIAPI:
         steps: int = 20,
         cfg_scale: float = 7.5,
         sampler: str = "DPM++ 2M Karras",
+        max_concurrency: Optional[int] = None,
+        mode: str = "sync",
+        poll_interval: float = 5.0,
+        use_cache: Optional[bool] = None,
     ) -> List[Image.Image]:
         """
         Generate multiple images from a list of prompts
         
+        Requests are sent concurrently over the shared session (capped by
+        max_concurrency) so one image's transfer and decode overlaps the
+        next generation instead of waiting on it.
+        
+        In "queued" mode every prompt is submitted at once with its own task
+        id and the WebUI's queue schedules them (alongside other clients on
+        a shared server); progress is polled instead of printed per image.
+        
         Args:
             prompts: List of positive prompts
             negative_prompt: Common negative prompt for all images
@@ -191,25 +298,54 @@ class SDWebUIAPI:
             steps: Sampling steps
             cfg_scale: Guidance scale
             sampler: Sampling method
+            max_concurrency: In-flight requests (default: Config.SD_WEBUI_MAX_CONCURRENCY)
+            mode: "sync" or "queued" (non-interactive runs)
+            poll_interval: Seconds between progress polls in queued mode
+            use_cache: Reuse/store PNGs in the image cache (see generate_image)
         
         Returns:
-            List of PIL Images (may be shorter if some failed)
+            List of PIL Images in prompt order (may be shorter if some failed)
         """
         
-        images = []
-        for i, prompt in enumerate(prompts):
-            print(f"\n[{i+1}/{len(prompts)}] {prompt[:60]}...")
-            
-            image = self.generate_image(
-                prompt=prompt,
+        if max_concurrency is None:
+            try:
+                from settings.config import Config
+                max_concurrency = getattr(Config, 'SD_WEBUI_MAX_CONCURRENCY', 2)
+            except ImportError:
+                max_concurrency = 2
+        
+        queued = mode == "queued"
+        task_ids = [f"task({uuid.uuid4().hex[:15]})" for _ in prompts] if queued else [None] * len(prompts)
+        
+        def generate(i):
+            if not queued:
+                print(f"\n[{i+1}/{len(prompts)}] {prompts[i][:60]}...")
+            return self.generate_image(
+                prompt=prompts[i],
                 negative_prompt=negative_prompt,
                 width=width,
                 height=height,
                 steps=steps,
                 cfg_scale=cfg_scale,
                 sampler=sampler,
+                task_id=task_ids[i],
+                use_cache=use_cache,
             )
-            
+        
+        workers = len(prompts) if queued else min(max_concurrency, len(prompts))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(generate, i) for i in range(len(prompts))]
+            if queued:
+                print(f"  Queued {len(prompts)} jobs on the WebUI")
+                pending = futures
+                while pending:
+                    pending = list(wait(pending, timeout=poll_interval).not_done)
+                    if pending:
+                        self._print_queue_status(task_ids, futures)
+            results = [future.result() for future in futures]
+        
+        images = []
+        for i, image in enumerate(results):
             if image:
                 images.append(image)
             else:
@@ -217,10 +353,76 @@ class SDWebUIAPI:
         
         return images
     
+    def get_task_progress(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Progress of one WebUI job
+        
+        Returns:
+            Dict with active/queued/completed flags and progress (0-1), or None
+        """
+        try:
+            response = self.session.post(
+                f"{self.host}/internal/progress",
+                json={"id_task": task_id, "id_live_preview": -1, "live_preview": False},
+                timeout=5,
+            )
+            if response.status_code == 200:
+                return response.json()
+        except requests.exceptions.RequestException:
+            pass
+        return None
+    
+    def _print_queue_status(self, task_ids: List[Optional[str]], futures: List) -> None:
+        """One-line summary of a queued batch"""
+        done = sum(future.done() for future in futures)
+        running = queued = 0
+        for task_id, future in zip(task_ids, futures):
+            if future.done():
+                continue
+            progress = self.get_task_progress(task_id) or {}
+            running += bool(progress.get("active"))
+            queued += bool(progress.get("queued"))
+        print(f"  Batch: {done} done, {running} running, {queued} queued")
+    
+    def warmup(self) -> float:
+        """
+        Load the WebUI's checkpoint into VRAM with a throwaway 64x64, 1-step image
+        
+        The first txt2img after WebUI start-up (or a model switch) pays for
+        loading the checkpoint; call this before timing generations. It
+        goes straight to the API, never through the image cache.
+        
+        Returns:
+            Seconds the warm-up took (0.0 if it failed)
+        """
+        print("Warming up model...")
+        start_time = time.time()
+        payload = {
+            "prompt": "warmup",
+            "width": 64,
+            "height": 64,
+            "steps": 1,
+            "cfg_scale": 1.0,
+            "save_images": False,
+            "send_images": False,
+        }
+        try:
+            response = self.session.post(
+                f"{self.host}/sdapi/v1/txt2img", json=payload, timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"  Warm-up failed: {e}")
+            return 0.0
+        
+        elapsed = time.time() - start_time
+        print(f"  ✓ Model ready ({elapsed:.1f}s)")
+        return elapsed
+    
     def get_models(self) -> List[str]:
         """Get list of available Stable Diffusion models"""
         try:
-            response = requests.get(f"{self.host}/sdapi/v1/sd-models", timeout=10)
+            response = self.session.get(f"{self.host}/sdapi/v1/sd-models", timeout=10)
             if response.status_code == 200:
                 models = response.json()
                 return [model["title"] for model in models]
@@ -232,7 +434,7 @@ class SDWebUIAPI:
     def get_samplers(self) -> List[str]:
         """Get list of available samplers"""
         try:
-            response = requests.get(f"{self.host}/sdapi/v1/samplers", timeout=10)
+            response = self.session.get(f"{self.host}/sdapi/v1/samplers", timeout=10)
             if response.status_code == 200:
                 samplers = response.json()
                 return [sampler["name"] for sampler in samplers]
@@ -244,12 +446,35 @@ class SDWebUIAPI:
     def interrupt(self):
         """Interrupt current generation"""
         try:
-            requests.post(f"{self.host}/sdapi/v1/interrupt", timeout=5)
+            self.session.post(f"{self.host}/sdapi/v1/interrupt", timeout=5)
             print("Generation interrupted")
         except Exception as e:
             print(f"Error interrupting: {e}")
 
 
+_API_CLIENTS: Dict[Tuple[str, int], SDWebUIAPI] = {}
+_API_CLIENTS_LOCK = threading.Lock()
+
+
+def get_webui_api(host: str = "http://127.0.0.1:7860", timeout: int = 300) -> SDWebUIAPI:
+    """
+    Return the process-wide WebUI client for a host, creating it on first use.
+
+    Reusing the client keeps its HTTP session (and connection pool) alive
+    across generation runs instead of reconnecting and re-probing each time.
+    Only clients that reached the WebUI are kept, so a WebUI started later
+    is picked up by the next call.
+    """
+    key = (host.rstrip('/'), timeout)
+    with _API_CLIENTS_LOCK:
+        api = _API_CLIENTS.get(key)
+        if api is None:
+            api = SDWebUIAPI(host=host, timeout=timeout)
+            if api.connected:
+                _API_CLIENTS[key] = api
+        return api
+
+
 def test_api():
     """Test the WebUI API connection and generation"""
     print("=" * 60)
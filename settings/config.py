@@ -6,6 +6,7 @@ All paths point to D:/YouTubeShortsProject
 """
 
 import os
+import tomllib
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -19,6 +20,22 @@ env_path = PROJECT_PATH / ".env"
 if env_path.exists():
     load_dotenv(env_path)
 
+# Model selection lives in a small sidecar so switch_grok_model.py can
+# change it without rewriting this file
+MODEL_SETTINGS_PATH = Path(__file__).parent / "model.toml"
+
+
+def _load_model_settings() -> dict:
+    """Read settings/model.toml, or return {} if it is missing or invalid."""
+    try:
+        with open(MODEL_SETTINGS_PATH, "rb") as f:
+            return tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError):
+        return {}
+
+
+_model_settings = _load_model_settings()
+
 
 class Config:
 
@@ -42,10 +59,11 @@ class Config:
     # "grok-3" - Current default, reliable performance
     # "grok-4-fast" - Newest, optimized for speed and efficiency (2M context, 344 tokens/sec)
     GROK_API_KEY = os.getenv("GROK_API_KEY", "")
-    GROK_MODEL = "grok-beta"
+    GROK_MODEL = _model_settings.get("grok_model", "grok-beta")
     GROK_API_BASE = "https://api.x.ai/v1"
     GROK_TEMPERATURE = 0.8
     GROK_MAX_TOKENS = 1000
+    GROK_CACHE_TTL = 7 * 24 * 3600  # seconds a reply is reused by callers passing use_cache=True
     
     # Token Optimization Settings
     GROK_USE_EFFICIENT_MODE = True  # Enable token-efficient generation
@@ -72,6 +90,8 @@ class Config:
     PIPER_MODEL_PATH = r"D:\YouTubeShortsProject\NCWM\models\piper\en-us-amy-medium.onnx"
     PIPER_CONFIG_PATH = r"D:\YouTubeShortsProject\NCWM\models\piper\en-us-amy-medium.onnx.json"
     PIPER_USE_CUDA = False  # Set to True if you have CUDA GPU for faster generation
+    PIPER_SYNTHESIS_WORKERS = 4  # Sentences synthesized in parallel (CPU cores)
+    PIPER_INT8 = False  # CPU only: run a dynamic int8 copy of the voice (faster, compare quality first)
     
     # Edge TTS Settings (Fallback)
     EDGE_VOICE_NAME = "en-US-AriaNeural"
@@ -82,6 +102,10 @@ class Config:
     # Stable Diffusion Settings
     SD_METHOD = "webui"  # Options: "webui", "diffusers"
     SD_WEBUI_URL = "http://127.0.0.1:7860"
+    SD_WEBUI_MAX_CONCURRENCY = 2  # In-flight txt2img requests per batch (WebUI queues them on the GPU)
+    # Reuse WebUI images for identical requests (fixes the seed per prompt, so
+    # unchanged scenes always get the same picture; meant for test re-runs)
+    SD_WEBUI_IMAGE_CACHE = False
     SD_MODEL_NAME = "sd_xl_base_1.0.safetensors"
     SD_INFERENCE_STEPS = 12
     SD_GUIDANCE_SCALE = 7.5
@@ -90,6 +114,18 @@ class Config:
     SD_MAX_SCENES = 3
     SD_USE_AI_PROMPT_OPTIMIZER = True
     SD_PROMPT_OPTIMIZER_PROVIDER = "groq"
+    SD_PROMPT_CACHE_TTL = 7 * 24 * 3600  # seconds an optimized scene prompt is reused
+    # Reuse prompts of near-duplicate scenes (needs sentence-transformers, downloads
+    # the embedding model on first store; faiss optional)
+    SD_SEMANTIC_CACHE_ENABLED = False
+    SD_SEMANTIC_CACHE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    SD_SEMANTIC_CACHE_THRESHOLD = 0.92  # cosine similarity, 0-1
+    SD_SEMANTIC_CACHE_MAX_ENTRIES = 5000  # oldest entries are dropped past this
+    # Images scoring at least this (0-10) on the local sharpness/colour check skip AI quality analysis
+    SD_FAST_QUALITY_THRESHOLD = 8.0
+    # UNet weight precision for the diffusers method
+    # Options: "fp16" (default, loaded as bf16 on Ampere+), "int8"/"nf4" (bitsandbytes), "fp8" (torchao, Ada/Hopper only)
+    SD_QUANT = "fp16"
 
     # Quality presets for different use cases
     QUALITY_PRESETS = {
@@ -118,6 +154,7 @@ class Config:
     NVENC_BITRATE = "5M"
     NVENC_MAX_BITRATE = "8M"
     NVENC_GOP_SIZE = 30
+    NVENC_MAX_SESSIONS = 2  # Concurrent NVENC encodes (consumer GeForce cards cap this)
 
     # Caption Settings
     CAPTION_FONT_SIZE = 52
@@ -144,8 +181,19 @@ class Config:
     WATERMARK_POSITION = ('right', 'top')
 
     # Video Settings
-    VIDEO_PRESET = "fast"
+    # libx264 only (hardware encoders use the GPU/NVENC settings above).
+    # Shorts are slow-moving slideshows, so the cheapest motion search loses
+    # next to nothing at CRF 23; clear TUNE/PARAMS for general footage
+    VIDEO_PRESET = "ultrafast"
     VIDEO_CRF = 23
+    VIDEO_X264_TUNE = "stillimage"
+    VIDEO_X264_PARAMS = "keyint=60:min-keyint=30:scenecut=0:ref=1:me=dia:subme=1"
+    # Final render rate control: "bitrate" (NVENC_RC/NVENC_BITRATE, or the
+    # libx264 settings above) or "quality" (constant quality, VBR capped at
+    # NVENC_MAX_BITRATE; smaller files at the same perceived quality)
+    ENCODE_MODE = "bitrate"
+    NVENC_CQ = 21  # quality mode, NVENC
+    QUALITY_CRF = 20  # quality mode, libx264
     WATERMARK_POSITION_MODE = "top-right"
 
     # Performance Settings
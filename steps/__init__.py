@@ -11,6 +11,7 @@ Contains the 5 main steps to create a YouTube Short:
 
 from .step1_write_script import (
     estimate_script_duration,
+    generate_word_stream,
     generate_word_timestamps,
     write_script_with_ollama,
 )
@@ -21,11 +22,12 @@ from .step3_generate_backgrounds import (
     images_to_video_clips,
 )
 from .step4_add_captions import create_shorts_captions
-from .step5_combine_everything import combine_into_final_video
+from .step5_combine_everything import combine_into_final_video, combine_into_final_video_async
 
 __all__ = [
     "write_script_with_ollama",
     "estimate_script_duration",
+    "generate_word_stream",
     "generate_word_timestamps",
     "create_voice_narration",
     "generate_ai_backgrounds",
@@ -33,4 +35,5 @@ __all__ = [
     "check_gpu_available",
     "create_shorts_captions",
     "combine_into_final_video",
+    "combine_into_final_video_async",
 ]
@@ -0,0 +1,154 @@
+"""
+CAPTION KERNELS
+
+Numeric helpers for the step 4 ASS caption builder.
+JIT-compiled with Numba when it is installed; the same NumPy code runs
+unchanged without it.
+"""
+
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when Numba is not installed."""
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+class WordStream(NamedTuple):
+    """Word timings as parallel columns (words[i] spans starts[i]..ends[i] seconds)."""
+
+    words: List[str]
+    starts: np.ndarray
+    ends: np.ndarray
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        """Row view: one {"word", "start", "end"} dict per word."""
+        return [
+            {"word": word, "start": start, "end": end}
+            for word, start, end in zip(self.words, self.starts.tolist(), self.ends.tolist())
+        ]
+
+
+@njit(cache=True)
+def _word_bounds(word_count, total_duration):
+    """Running-sum loop for word_bounds (unrounded)."""
+    starts = np.empty(word_count)
+    ends = np.empty(word_count)
+    time_per_word = total_duration / word_count
+    current = 0.0
+    for i in range(word_count):
+        starts[i] = current
+        current += time_per_word
+        ends[i] = current
+    ends[word_count - 1] = total_duration
+    return starts, ends
+
+
+def word_bounds(word_count: int, total_duration: float):
+    """
+    Evenly spaced word timings across a narration.
+
+    Args:
+        word_count: Number of words (> 0)
+        total_duration: Narration length in seconds
+
+    Returns:
+        Tuple (starts, ends) of float64 arrays rounded to 0.01 s like
+        Python's round(); the last word ends exactly at total_duration
+    """
+    starts, ends = _word_bounds(word_count, float(total_duration))
+    # np.round scales by 100 first and can land on the other side of a
+    # half-cent (6.78 vs 6.77), so round each value the way Python does
+    return (
+        np.array([round(x, 2) for x in starts.tolist()], dtype=np.float64),
+        np.array([round(x, 2) for x in ends.tolist()], dtype=np.float64),
+    )
+
+
+@njit(cache=True)
+def sec_to_hmsc(seconds):
+    """
+    Split seconds into ASS timestamp fields.
+
+    Args:
+        seconds: float64 array of times in seconds (negatives clamp to 0)
+
+    Returns:
+        Tuple of int64 arrays (hours, minutes, seconds, centiseconds)
+    """
+    total_cs = np.rint(np.maximum(seconds, 0.0) * 100.0).astype(np.int64)
+    cs = total_cs % 100
+    total_s = total_cs // 100
+    s = total_s % 60
+    total_m = total_s // 60
+    m = total_m % 60
+    h = total_m // 60
+    return h, m, s, cs
+
+
+def format_ass_timestamps(seconds: np.ndarray) -> List[str]:
+    """Format an array of seconds as ASS timestamps (H:MM:SS.cs)."""
+    h, m, s, cs = sec_to_hmsc(np.ascontiguousarray(seconds, dtype=np.float64))
+    return [
+        f"{hh}:{mm:02d}:{ss:02d}.{cc:02d}"
+        for hh, mm, ss, cc in zip(h.tolist(), m.tolist(), s.tolist(), cs.tolist())
+    ]
+
+
+@njit(parallel=True, cache=True)
+def _phrase_times_parallel(starts, ends, words_per_phrase):
+    """Per-phrase loop for build_phrase_times, split across cores by prange."""
+    n = starts.shape[0]
+    m = (n + words_per_phrase - 1) // words_per_phrase
+    phrase_start = np.empty(m)
+    phrase_end = np.empty(m)
+    kf_cs = np.empty(n, np.int64)
+    for p in prange(m):
+        i0 = p * words_per_phrase
+        i1 = min(n, i0 + words_per_phrase)
+        phrase_start[p] = max(0.0, starts[i0])
+        phrase_end[p] = max(phrase_start[p], ends[i1 - 1])
+        for j in range(i0, i1):
+            kf_cs[j] = np.int64(np.rint(max(0.08, ends[j] - starts[j]) * 100.0))
+    return phrase_start, phrase_end, kf_cs
+
+
+def build_phrase_times(starts: np.ndarray, ends: np.ndarray, words_per_phrase: int):
+    """
+    Phrase timings and karaoke fill times for a whole transcript.
+
+    Args:
+        starts: float64 array of word start times (seconds)
+        ends: float64 array of word end times (seconds)
+        words_per_phrase: Words per caption phrase
+
+    Returns:
+        Tuple (phrase_start, phrase_end, kf_cs): phrase bounds in seconds
+        (start clamped to >= 0, end to >= start) and per-word \\kf
+        centiseconds with an 80 ms minimum
+    """
+    starts = np.ascontiguousarray(starts, dtype=np.float64)
+    ends = np.ascontiguousarray(ends, dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        return _phrase_times_parallel(starts, ends, words_per_phrase)
+
+    # Plain NumPy: a Python-level prange loop would be far slower
+    firsts = np.arange(0, len(starts), words_per_phrase)
+    lasts = np.minimum(firsts + words_per_phrase, len(starts)) - 1
+    phrase_start = np.maximum(0.0, starts[firsts])
+    phrase_end = np.maximum(phrase_start, ends[lasts])
+    kf_cs = np.rint(np.maximum(0.08, ends - starts) * 100).astype(np.int64)
+    return phrase_start, phrase_end, kf_cs
@@ -12,6 +12,7 @@ import time
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Union
 
+import numpy as np
 import requests
 
 # Add project root to path
@@ -19,6 +20,7 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from settings.config import Config
+from steps._caption_kernels import WordStream, word_bounds
 from utils import (
     extract_json_from_response,
     validate_json_structure,
@@ -312,16 +314,16 @@ def estimate_script_duration(script: str, words_per_second: float = 2.5) -> floa
 
 
 @monitor_performance
-def generate_word_timestamps(script: str, total_duration: float) -> List[Dict[str, Any]]:
+def generate_word_stream(script: str, total_duration: float) -> WordStream:
     """
-    Create timestamps for each word (for karaoke captions).
+    Create timestamps for each word as parallel arrays (for karaoke captions).
 
     Args:
         script: The text to split into words
         total_duration: Total audio length in seconds
 
     Returns:
-        List of dictionaries with word, start, end times
+        WordStream of words with start and end times in seconds
     """
 
     # Clean script and split into words
@@ -336,30 +338,25 @@ def generate_word_timestamps(script: str, total_duration: float) -> List[Dict[st
     words = cleaned.split()
 
     if not words:
-        return []
+        return WordStream([], np.empty(0), np.empty(0))
 
-    time_per_word = total_duration / len(words)
+    starts, ends = word_bounds(len(words), total_duration)
+    return WordStream(words, starts, ends)
 
-    timestamps = []
-    current_time = 0
 
-    for i, word in enumerate(words):
-        start_time = round(current_time, 2)
-        # For the last word, ensure it ends at the total duration
-        if i == len(words) - 1:
-            end_time = round(total_duration, 2)
-        else:
-            end_time = round(current_time + time_per_word, 2)
-        timestamps.append(
-            {
-                "word": word,
-                "start": start_time,
-                "end": end_time,
-            }
-        )
-        current_time += time_per_word
+def generate_word_timestamps(script: str, total_duration: float) -> List[Dict[str, Any]]:
+    """
+    Create timestamps for each word (for karaoke captions).
+
+    Args:
+        script: The text to split into words
+        total_duration: Total audio length in seconds
+
+    Returns:
+        List of dictionaries with word, start, end times
+    """
 
-    return timestamps
+    return generate_word_stream(script, total_duration).as_dicts()
 
 
 if __name__ == "__main__":
@@ -31,6 +31,7 @@ from utils.validation_utils import (
     validate_string_input, validate_numeric_input, validate_audio_specs
 )
 from utils.logging_utils import get_logger
+from utils.tts_manager import create_voice_narration as tts_create_voice
 
 logger = get_logger("voice_generation")
 
@@ -89,8 +90,6 @@ def create_voice_narration(script_text: str, voice_name: Optional[str] = None) -
     Returns:
         Dictionary with 'path' and 'duration' keys
     """
-    from utils.tts_manager import create_voice_narration as tts_create_voice
-    
     # Validate input
     script_text = validate_string_input(
         script_text, "script_text", min_length=1, max_length=2000
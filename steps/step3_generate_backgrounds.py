@@ -5,13 +5,19 @@ Uses Stable Diffusion to generate custom vertical backgrounds for YouTube Shorts
 Requires GPU. Generates 1080x1920 images from text descriptions.
 """
 
+import gc
+import hashlib
 import os
+import shutil
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple, Union, Callable
 
 import torch
+from PIL import Image as PILImage
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -23,7 +29,7 @@ import subprocess
 
 # Import WebUI API helper
 try:
-    from helpers.sd_webui_api import SDWebUIAPI
+    from helpers.sd_webui_api import SDWebUIAPI, get_webui_api
     WEBUI_AVAILABLE = True
 except ImportError:
     WEBUI_AVAILABLE = False
@@ -33,7 +39,9 @@ except ImportError:
 try:
     from helpers.ai_prompt_optimizer import optimize_prompts_with_ai
     from helpers.controlnet_processor import process_control_images
-    from helpers.image_quality_analyzer import analyze_image_quality, generate_refinement_prompt
+    from helpers.image_quality_analyzer import (
+        analyze_image_quality, analyze_image_quality_batch, generate_refinement_prompt
+    )
     AI_ENHANCEMENTS_AVAILABLE = True
 except ImportError:
     AI_ENHANCEMENTS_AVAILABLE = False
@@ -43,7 +51,9 @@ except ImportError:
 os.environ["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"
 
 # Import unified SD generation manager
-from utils.sd_generation_manager import generate_ai_backgrounds_unified, create_sd_manager
+from utils.sd_generation_manager import (
+    generate_ai_backgrounds_unified, create_sd_manager, load_sd_pipeline
+)
 from utils.gpu_manager import get_gpu_manager, gpu_memory_context, check_gpu_compatibility
 from utils.performance_optimizer import performance_optimizer, optimize_stable_diffusion_settings
 from utils.error_handler import (
@@ -55,6 +65,7 @@ from utils.validation_utils import (
     validate_video_specs
 )
 from utils.logging_utils import get_logger
+from utils.video_utils import check_hardware_acceleration, write_clip_meta
 
 logger = get_logger("background_generation")
 
@@ -65,6 +76,146 @@ def check_gpu_available() -> bool:
     return compatible
 
 
+@lru_cache(maxsize=1)
+def _temp_dir() -> str:
+    """Resolve Config.TEMP_DIR and create it once per process; shared by images and clips."""
+    temp_dir = str(Path(Config.TEMP_DIR).resolve())
+    os.makedirs(temp_dir, exist_ok=True)
+    return temp_dir
+
+
+def _render_cache_enabled() -> bool:
+    """Whether Ken Burns clips are reused across runs (Config.ENABLE_CACHING)."""
+    return getattr(Config, "ENABLE_CACHING", True)
+
+
+@lru_cache(maxsize=None)
+def _render_cache_dir(kind: str) -> str:
+    """Folder under Config.CACHE_DIR for one kind of cached render (e.g. "ken_burns")."""
+    cache_dir = os.path.join(str(Path(Config.CACHE_DIR).resolve()), kind)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _cache_key(*parts: Any) -> str:
+    """Short blake2b digest of everything that determines a render's output."""
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _store_in_cache(source: Union[str, Path], cached_path: str) -> None:
+    """
+    Atomically place a file in the render cache.
+
+    Writes next to the target and renames, so a crash never leaves a
+    truncated entry that later runs would treat as a hit.
+    """
+    tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, cached_path)
+    except OSError as e:
+        logger.warning(f"Could not write render cache entry {cached_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _image_content_key(img_path: str) -> Optional[str]:
+    """Content hash of an image file, or None when its pixels are not on disk."""
+    if not os.path.exists(img_path):
+        return None
+
+    digest = hashlib.blake2b(digest_size=8)
+    with open(img_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _ken_burns_cache_path(img_path: str, duration: float) -> Optional[str]:
+    """Cache location of the Ken Burns clip for an image, or None when caching is off."""
+    if not _render_cache_enabled():
+        return None
+    content_key = _image_content_key(img_path)
+    if content_key is None:
+        return None
+    key = _cache_key(
+        content_key, duration, Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT,
+        Config.VIDEO_FPS, _clip_encoder_args(),
+    )
+    return os.path.join(_render_cache_dir("ken_burns"), f"ken_burns_clip_{key}.mp4")
+
+
+def _refine_scenes(
+    scenes: List[Tuple[int, str, str, Any]],
+    script_data: Optional[Dict],
+    regenerate: Callable[[int, str, str], Any],
+) -> List[Any]:
+    """
+    Quality-check generated scenes with batched analysis and refine the failures.
+
+    Args:
+        scenes: (scene index, scene description, prompt, image) per generated scene
+        script_data: Full script context for narrative fit
+        regenerate: Generates an image for (scene index, prompt, negative prompt)
+
+    Returns:
+        The image to keep for each scene, in the same order
+    """
+    images = [image for _, _, _, image in scenes]
+    if not scenes or not (AI_ENHANCEMENTS_AVAILABLE and getattr(Config, 'SD_USE_QUALITY_ANALYSIS', True)):
+        return images
+
+    print(f"\n🔍 Quality Analysis: Evaluating {len(scenes)} generated images...")
+    analyses = analyze_image_quality_batch(
+        images,
+        [prompt for _, _, prompt, _ in scenes],
+        [scene_desc for _, scene_desc, _, _ in scenes],
+        script_data,
+    )
+
+    max_iterations = getattr(Config, 'SD_MAX_REFINEMENT_ITERATIONS', 2)
+    for n, ((i, scene_desc, prompt, _), quality_analysis) in enumerate(zip(scenes, analyses)):
+        if quality_analysis.get('meets_threshold', True):
+            print(f"  ✅ Scene {i+1} meets quality threshold ({quality_analysis.get('overall_score', 0):.1f}/10)")
+            continue
+
+        print(f"  ⚠️ Scene {i+1} below threshold ({quality_analysis.get('overall_score', 0):.1f}/10)")
+        for iteration in range(1, max_iterations + 1):
+            print(f"  🔄 Refinement iteration {iteration}/{max_iterations}...")
+
+            refined_prompt, refined_negative = generate_refinement_prompt(
+                prompt, quality_analysis, iteration
+            )
+            try:
+                refined_image = regenerate(i, refined_prompt, refined_negative)
+            except Exception as e:
+                print(f"  ⚠️ Refinement {iteration} failed: {e}, keeping the original image")
+                break
+
+            if refined_image:
+                # Re-analyze refined image
+                refined_analysis = analyze_image_quality(
+                    image=refined_image,
+                    original_prompt=refined_prompt,
+                    scene_description=scene_desc,
+                    script_context=script_data,
+                    scene_index=i
+                )
+
+                if refined_analysis.get('meets_threshold', False):
+                    print(f"  ✅ Refined image meets quality threshold!")
+                    images[n] = refined_image
+                    break
+                print(f"  ⚠️ Refinement {iteration} still below threshold")
+                quality_analysis = refined_analysis  # Use refined analysis for next iteration
+
+    return images
+
+
 def generate_ai_backgrounds_webui_enhanced(
     scene_descriptions: List[str], 
     script_data: Optional[Dict[str, Any]] = None,
@@ -92,8 +243,8 @@ def generate_ai_backgrounds_webui_enhanced(
         return generate_ai_backgrounds_diffusers_enhanced(scene_descriptions, script_data, duration_per_scene)
     
     try:
-        # Initialize WebUI API
-        api = SDWebUIAPI(
+        # Reuse the process-wide WebUI client (keeps its HTTP session warm)
+        api = get_webui_api(
             host=Config.SD_WEBUI_HOST,
             timeout=Config.SD_WEBUI_TIMEOUT
         )
@@ -122,10 +273,11 @@ def generate_ai_backgrounds_webui_enhanced(
         
         # Generate images with AI enhancements
         image_paths = []
-        temp_dir = Path(Config.TEMP_DIR)
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(_temp_dir())
         
         previous_image = None  # For ControlNet visual continuity
+        generated = []  # (scene index, description, prompt, image) before refinement
+        scene_controlnet = {}  # ControlNet data per scene, reused for refinements
         
         for i, (scene_desc, optimized_prompt_data) in enumerate(zip(optimized_scenes, optimized_prompts)):
             print(f"\n[Scene {i+1}/{len(optimized_scenes)}]")
@@ -159,76 +311,8 @@ def generate_ai_backgrounds_webui_enhanced(
             )
             
             if image:
-                # QUALITY ANALYSIS & REFINEMENT LOOP
-                if AI_ENHANCEMENTS_AVAILABLE and getattr(Config, 'SD_USE_QUALITY_ANALYSIS', True):
-                    print(f"  🔍 Quality Analysis: Evaluating generated image...")
-                    
-                    quality_analysis = analyze_image_quality(
-                        image=image,
-                        original_prompt=optimized_prompt,
-                        scene_description=scene_desc,
-                        script_context=script_data,
-                        scene_index=i
-                    )
-                    
-                    # Check if quality meets threshold
-                    if not quality_analysis.get('meets_threshold', True):
-                        print(f"  ⚠️ Quality below threshold ({quality_analysis.get('overall_score', 0):.1f}/10)")
-                        
-                        # Try refinement (max iterations)
-                        max_iterations = getattr(Config, 'SD_MAX_REFINEMENT_ITERATIONS', 2)
-                        for iteration in range(1, max_iterations + 1):
-                            print(f"  🔄 Refinement iteration {iteration}/{max_iterations}...")
-                            
-                            # Generate refined prompt
-                            refined_prompt, refined_negative = generate_refinement_prompt(
-                                optimized_prompt, quality_analysis, iteration
-                            )
-                            
-                            # Regenerate with refined prompt
-                            refined_image = api.generate_image(
-                                prompt=refined_prompt,
-                                negative_prompt=refined_negative,
-                                width=Config.SD_GENERATION_WIDTH,
-                                height=Config.SD_GENERATION_HEIGHT,
-                                steps=Config.SD_INFERENCE_STEPS,
-                                cfg_scale=Config.SD_GUIDANCE_SCALE,
-                                sampler=Config.SD_WEBUI_SAMPLER,
-                                controlnet_units=controlnet_data.get("controlnet_units", []) if controlnet_data else None
-                            )
-                            
-                            if refined_image:
-                                # Re-analyze refined image
-                                refined_analysis = analyze_image_quality(
-                                    image=refined_image,
-                                    original_prompt=refined_prompt,
-                                    scene_description=scene_desc,
-                                    script_context=script_data,
-                                    scene_index=i
-                                )
-                                
-                                if refined_analysis.get('meets_threshold', False):
-                                    print(f"  ✅ Refined image meets quality threshold!")
-                                    image = refined_image
-                                    break
-                                else:
-                                    print(f"  ⚠️ Refinement {iteration} still below threshold")
-                                    if iteration < max_iterations:
-                                        quality_analysis = refined_analysis  # Use refined analysis for next iteration
-                    else:
-                        print(f"  ✅ Image meets quality threshold ({quality_analysis.get('overall_score', 0):.1f}/10)")
-                
-                # Upscale to final resolution if needed
-                if Config.SD_GENERATION_WIDTH != Config.VIDEO_WIDTH or Config.SD_GENERATION_HEIGHT != Config.VIDEO_HEIGHT:
-                    from PIL import Image as PILImage
-                    image = image.resize((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), PILImage.Resampling.LANCZOS)
-                    print(f"  ✓ Upscaled to {Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}")
-                
-                # Save image
-                image_path = temp_dir / f"ai_background_{i}.png"
-                image.save(image_path)
-                image_paths.append(str(image_path))
-                print(f"  ✓ Saved: {image_path.name}")
+                generated.append((i, scene_desc, optimized_prompt, image))
+                scene_controlnet[i] = controlnet_data
                 
                 # Store for ControlNet continuity
                 previous_image = image
@@ -236,6 +320,34 @@ def generate_ai_backgrounds_webui_enhanced(
             else:
                 print(f"  ✗ Failed to generate scene {i+1}")
         
+        def regenerate(i, prompt, negative_prompt):
+            controlnet_data = scene_controlnet[i]
+            return api.generate_image(
+                prompt=prompt,
+                negative_prompt=negative_prompt,
+                width=Config.SD_GENERATION_WIDTH,
+                height=Config.SD_GENERATION_HEIGHT,
+                steps=Config.SD_INFERENCE_STEPS,
+                cfg_scale=Config.SD_GUIDANCE_SCALE,
+                sampler=Config.SD_WEBUI_SAMPLER,
+                controlnet_units=controlnet_data.get("controlnet_units", []) if controlnet_data else None
+            )
+        
+        # QUALITY ANALYSIS & REFINEMENT (one batched analysis for all scenes)
+        final_images = _refine_scenes(generated, script_data, regenerate)
+        
+        for (i, _, _, _), image in zip(generated, final_images):
+            # Upscale to final resolution if needed
+            if Config.SD_GENERATION_WIDTH != Config.VIDEO_WIDTH or Config.SD_GENERATION_HEIGHT != Config.VIDEO_HEIGHT:
+                image = image.resize((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), PILImage.Resampling.LANCZOS)
+                print(f"  ✓ Upscaled scene {i+1} to {Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}")
+            
+            # Save image
+            image_path = temp_dir / f"ai_background_{i}.png"
+            image.save(image_path)
+            image_paths.append(str(image_path))
+            print(f"  ✓ Saved: {image_path.name}")
+        
         print(f"\n✓ Generated {len(image_paths)} AI backgrounds via WebUI with AI enhancements")
         return image_paths
         
@@ -268,8 +380,8 @@ def generate_ai_backgrounds_webui(
         return generate_ai_backgrounds_diffusers(scene_descriptions, duration_per_scene)
     
     try:
-        # Initialize WebUI API
-        api = SDWebUIAPI(
+        # Reuse the process-wide WebUI client (keeps its HTTP session warm)
+        api = get_webui_api(
             host=Config.SD_WEBUI_HOST,
             timeout=Config.SD_WEBUI_TIMEOUT
         )
@@ -282,8 +394,7 @@ def generate_ai_backgrounds_webui(
         
         # Generate images
         image_paths = []
-        temp_dir = Path(Config.TEMP_DIR)
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(_temp_dir())
         
         for i, description in enumerate(optimized_scenes):
             print(f"\n[Scene {i+1}/{len(optimized_scenes)}]")
@@ -309,7 +420,6 @@ def generate_ai_backgrounds_webui(
             if image:
                 # Upscale to final resolution if needed
                 if Config.SD_GENERATION_WIDTH != Config.VIDEO_WIDTH or Config.SD_GENERATION_HEIGHT != Config.VIDEO_HEIGHT:
-                    from PIL import Image as PILImage
                     image = image.resize((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), PILImage.Resampling.LANCZOS)
                     print(f"  ✓ Upscaled to {Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}")
                 
@@ -409,12 +519,8 @@ def generate_ai_backgrounds_diffusers_enhanced(
                 f"GPU Memory before loading: {torch.cuda.memory_allocated() / 1024**3:.1f} GB"
             )
 
-        pipe = DiffusionPipeline.from_pretrained(
-            Config.STABLE_DIFFUSION_MODEL,
-            torch_dtype=torch.float16,  # Use half precision to save memory
-            use_safetensors=True,
-            variant="fp16" if device == "cuda" else None,
-        ).to(device)
+        # Half precision (or quantized UNet per Config.SD_QUANT) to save memory
+        pipe = load_sd_pipeline(device)
 
         # Enable memory optimizations for 6GB GPU
         if Config.SD_ATTENTION_SLICING:
@@ -434,17 +540,15 @@ def generate_ai_backgrounds_diffusers_enhanced(
 
         # Generate images with optimized settings
         image_paths = []
-        temp_dir = Path(Config.TEMP_DIR)
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(_temp_dir())
 
-        previous_image = None  # For visual continuity analysis
+        generated = []  # (scene index, description, prompt, image) before refinement
 
         for i, (scene_desc, optimized_prompt_data) in enumerate(zip(optimized_scenes, optimized_prompts)):
             # CRITICAL: Clear GPU memory before each generation
             if device == "cuda":
                 torch.cuda.empty_cache()
                 torch.cuda.ipc_collect()
-                import gc
                 gc.collect()
                 print(f"    GPU Memory cleared before scene {i+1}")
             
@@ -475,7 +579,6 @@ def generate_ai_backgrounds_diffusers_enhanced(
                         print("    Clearing cache to prevent stuck state...")
                         torch.cuda.empty_cache()
                         torch.cuda.ipc_collect()
-                        import gc
                         gc.collect()
 
                 # OPTIMIZATION: Use reduced inference steps
@@ -510,90 +613,15 @@ def generate_ai_backgrounds_diffusers_enhanced(
                 gen_time = time.time() - start_gen_time
                 print(f"    Generation completed in {gen_time:.1f} seconds")
                 
-                # QUALITY ANALYSIS & REFINEMENT LOOP (Diffusers method)
-                if AI_ENHANCEMENTS_AVAILABLE and getattr(Config, 'SD_USE_QUALITY_ANALYSIS', True):
-                    print(f"  🔍 Quality Analysis: Evaluating generated image...")
-                    
-                    quality_analysis = analyze_image_quality(
-                        image=image,
-                        original_prompt=optimized_prompt,
-                        scene_description=scene_desc,
-                        script_context=script_data,
-                        scene_index=i
-                    )
-                    
-                    # Check if quality meets threshold
-                    if not quality_analysis.get('meets_threshold', True):
-                        print(f"  ⚠️ Quality below threshold ({quality_analysis.get('overall_score', 0):.1f}/10)")
-                        
-                        # Try refinement (max iterations)
-                        max_iterations = getattr(Config, 'SD_MAX_REFINEMENT_ITERATIONS', 2)
-                        for iteration in range(1, max_iterations + 1):
-                            print(f"  🔄 Refinement iteration {iteration}/{max_iterations}...")
-                            
-                            # Generate refined prompt
-                            refined_prompt, refined_negative = generate_refinement_prompt(
-                                optimized_prompt, quality_analysis, iteration
-                            )
-                            
-                            # Regenerate with refined prompt
-                            refined_image = pipe(
-                                refined_prompt,
-                                height=gen_height,
-                                width=gen_width,
-                                num_inference_steps=inference_steps,
-                                guidance_scale=Config.SD_GUIDANCE_SCALE,
-                                negative_prompt=refined_negative,
-                            ).images[0]
-                            
-                            if refined_image:
-                                # Re-analyze refined image
-                                refined_analysis = analyze_image_quality(
-                                    image=refined_image,
-                                    original_prompt=refined_prompt,
-                                    scene_description=scene_desc,
-                                    script_context=script_data,
-                                    scene_index=i
-                                )
-                                
-                                if refined_analysis.get('meets_threshold', False):
-                                    print(f"  ✅ Refined image meets quality threshold!")
-                                    image = refined_image
-                                    break
-                                else:
-                                    print(f"  ⚠️ Refinement {iteration} still below threshold")
-                                    if iteration < max_iterations:
-                                        quality_analysis = refined_analysis  # Use refined analysis for next iteration
-                    else:
-                        print(f"  ✅ Image meets quality threshold ({quality_analysis.get('overall_score', 0):.1f}/10)")
-                
-                # Upscale to final resolution if needed
-                if gen_width != Config.VIDEO_WIDTH or gen_height != Config.VIDEO_HEIGHT:
-                    from PIL import Image
-                    image = image.resize((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), Image.Resampling.LANCZOS)
-                    print(f"    Upscaled to {Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}")
-
-                # Save to temp folder on D drive
-                image_path = temp_dir / f"ai_background_{i}.png"
-                image.save(image_path)
-                image_paths.append(str(image_path))
-
-                print(f"    Saved: {image_path.name}")
+                generated.append((i, scene_desc, optimized_prompt, image))
 
                 # OPTIMIZATION: Aggressive memory cleanup after each generation
                 if device == "cuda":
                     torch.cuda.empty_cache()
                     torch.cuda.ipc_collect()
                     # Force garbage collection
-                    import gc
                     gc.collect()
 
-                # Clear image reference
-                del image
-                
-                # Store for visual continuity analysis
-                previous_image = image_path
-                
                 # CRITICAL: Add small delay between generations to prevent stuck state
                 if device == "cuda" and i < len(optimized_scenes) - 1:
                     print("    Brief pause between generations...")
@@ -607,6 +635,31 @@ def generate_ai_backgrounds_diffusers_enhanced(
                     torch.cuda.ipc_collect()
                 continue
 
+        def regenerate(i, prompt, negative_prompt):
+            return pipe(
+                prompt,
+                height=gen_height,
+                width=gen_width,
+                num_inference_steps=inference_steps,
+                guidance_scale=Config.SD_GUIDANCE_SCALE,
+                negative_prompt=negative_prompt,
+            ).images[0]
+
+        # QUALITY ANALYSIS & REFINEMENT (one batched analysis for all scenes)
+        final_images = _refine_scenes(generated, script_data, regenerate)
+
+        for (i, _, _, _), image in zip(generated, final_images):
+            # Upscale to final resolution if needed
+            if gen_width != Config.VIDEO_WIDTH or gen_height != Config.VIDEO_HEIGHT:
+                image = image.resize((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), PILImage.Resampling.LANCZOS)
+                print(f"    Upscaled scene {i+1} to {Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}")
+
+            # Save to temp folder on D drive
+            image_path = temp_dir / f"ai_background_{i}.png"
+            image.save(image_path)
+            image_paths.append(str(image_path))
+            print(f"    Saved: {image_path.name}")
+
         print(f"Generated {len(image_paths)} AI backgrounds with AI enhancements")
 
         return image_paths
@@ -633,7 +686,6 @@ def generate_ai_backgrounds_diffusers_enhanced(
                 print(f"Warning: Error during cleanup: {cleanup_error}")
         
         # Force garbage collection
-        import gc
         gc.collect()
 
 
@@ -693,12 +745,8 @@ def generate_ai_backgrounds_diffusers(
                 f"GPU Memory before loading: {torch.cuda.memory_allocated() / 1024**3:.1f} GB"
             )
 
-        pipe = DiffusionPipeline.from_pretrained(
-            Config.STABLE_DIFFUSION_MODEL,
-            torch_dtype=torch.float16,  # Use half precision to save memory
-            use_safetensors=True,
-            variant="fp16" if device == "cuda" else None,
-        ).to(device)
+        # Half precision (or quantized UNet per Config.SD_QUANT) to save memory
+        pipe = load_sd_pipeline(device)
 
         # Enable memory optimizations for 6GB GPU
         if Config.SD_ATTENTION_SLICING:
@@ -718,15 +766,13 @@ def generate_ai_backgrounds_diffusers(
 
         # Generate images with optimized settings
         image_paths = []
-        temp_dir = Path(Config.TEMP_DIR)
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(_temp_dir())
 
         for i, description in enumerate(optimized_scenes):
             # CRITICAL: Clear GPU memory before each generation
             if device == "cuda":
                 torch.cuda.empty_cache()
                 torch.cuda.ipc_collect()
-                import gc
                 gc.collect()
                 print(f"    GPU Memory cleared before scene {i+1}")
             print(
@@ -756,7 +802,6 @@ def generate_ai_backgrounds_diffusers(
                         print("    Clearing cache to prevent stuck state...")
                         torch.cuda.empty_cache()
                         torch.cuda.ipc_collect()
-                        import gc
                         gc.collect()
 
                 # OPTIMIZATION: Use reduced inference steps
@@ -774,11 +819,13 @@ def generate_ai_backgrounds_diffusers(
                 if inference_steps < 10:
                     inference_steps = 10  # SDXL minimum for quality
                     print(f"    SDXL minimum steps set to {inference_steps} for quality")
+
+                image_path = temp_dir / f"ai_background_{i}.png"
                 
                 # Generate image with optimized settings
                 print(f"    Starting generation (this should take ~10-15 seconds)...")
                 start_gen_time = time.time()
-                
+
                 image = pipe(
                     vertical_prompt,
                     height=gen_height,
@@ -793,12 +840,10 @@ def generate_ai_backgrounds_diffusers(
                 
                 # Upscale to final resolution if needed
                 if gen_width != Config.VIDEO_WIDTH or gen_height != Config.VIDEO_HEIGHT:
-                    from PIL import Image
-                    image = image.resize((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), Image.Resampling.LANCZOS)
+                    image = image.resize((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), PILImage.Resampling.LANCZOS)
                     print(f"    Upscaled to {Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}")
 
                 # Save to temp folder on D drive
-                image_path = temp_dir / f"ai_background_{i}.png"
                 image.save(image_path)
                 image_paths.append(str(image_path))
 
@@ -809,7 +854,6 @@ def generate_ai_backgrounds_diffusers(
                     torch.cuda.empty_cache()
                     torch.cuda.ipc_collect()
                     # Force garbage collection
-                    import gc
                     gc.collect()
 
                 # Clear image reference
@@ -854,7 +898,6 @@ def generate_ai_backgrounds_diffusers(
                 print(f"Warning: Error during cleanup: {cleanup_error}")
         
         # Force garbage collection
-        import gc
         gc.collect()
 
 
@@ -984,11 +1027,148 @@ def generate_ai_backgrounds_enhanced(
     )
 
 
+# FFmpeg only reports real errors; no banner or per-frame progress output
+_FFMPEG_QUIET = ("-hide_banner", "-loglevel", "error", "-nostats")
+_FFMPEG_ERROR_TAIL = 4096  # bytes of stderr kept when a render fails
+
+
+def _ffmpeg_error_tail(stderr: bytes) -> str:
+    """Decode the end of a captured FFmpeg stderr for logging."""
+    return stderr[-_FFMPEG_ERROR_TAIL:].decode("utf-8", errors="replace").strip()
+
+
+@lru_cache(maxsize=1)
+def _clip_encoder_args() -> Tuple[str, ...]:
+    """
+    Pick the H.264 encoder for clip renders (probed once per process).
+
+    Uses the NVENC hardware encoder when GPU encoding is enabled, a CUDA GPU is
+    present and FFmpeg was built with h264_nvenc; otherwise CPU libx264.
+    """
+    if (getattr(Config, "USE_GPU_ENCODING", True)
+            and check_gpu_available()
+            and check_hardware_acceleration().get("nvenc")):
+        return ("-c:v", "h264_nvenc", "-preset", "p4", "-tune", "hq",
+                "-rc", "vbr", "-cq", "23", "-b:v", "6M")
+    return ("-c:v", "libx264")
+
+
+@lru_cache(maxsize=8)
+def _ken_burns_filter(frames: int) -> str:
+    """zoompan filter for a clip of the given frame count (stronger zoom & gentle pan)."""
+    # zoompan scales to the output size itself, no separate pre-scale pass needed
+    return (
+        f"zoompan=z='min(zoom+0.0025,1.12)':"
+        f"d={frames}:"
+        f"x='iw/2-(iw/zoom/2)':"
+        f"y='ih/2-(ih/zoom/2)':"
+        f"s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}:"
+        f"fps={Config.VIDEO_FPS}"
+    )
+
+
+def _write_clip_meta(video_path: str, duration: float) -> None:
+    """Record a rendered clip's format (always VIDEO_WIDTH x VIDEO_HEIGHT yuv420p H.264) for step 5."""
+    write_clip_meta(video_path, Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT, Config.VIDEO_FPS, duration)
+
+
+def _ken_burns_command(img_path: str, duration: float, video_path: str, threads: int = 0) -> List[str]:
+    """
+    Build the FFmpeg command for a Ken Burns clip (stronger zoom & gentle pan).
+
+    Args:
+        img_path: Source image path
+        duration: Clip duration in seconds
+        video_path: Output clip path
+        threads: FFmpeg thread cap (0 = FFmpeg default)
+    """
+    return [
+        "ffmpeg", *_FFMPEG_QUIET, "-y",
+        "-loop", "1",
+        "-t", str(duration),
+        "-i", str(img_path),
+        "-vf", _ken_burns_filter(int(duration * Config.VIDEO_FPS)),
+        *_clip_encoder_args(),
+        "-pix_fmt", "yuv420p",
+        "-r", str(Config.VIDEO_FPS),
+        *_thread_args(threads),
+        video_path
+    ]
+
+
+def _ken_burns_workers(clip_count: int) -> int:
+    """
+    Number of Ken Burns renders to run at once.
+
+    libx264 zoompan renders are mostly single-threaded, so half the cores can
+    run in parallel. Consumer NVIDIA cards limit concurrent NVENC sessions,
+    so the hardware path is capped at Config.NVENC_MAX_SESSIONS.
+    """
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    if "h264_nvenc" in _clip_encoder_args():
+        workers = min(workers, getattr(Config, "NVENC_MAX_SESSIONS", 2) or 2)
+    return max(1, min(clip_count, workers))
+
+
+def _clip_threads(workers: int) -> int:
+    """
+    FFmpeg threads per clip render when `workers` renders run at once.
+
+    Splits the FFMPEG_THREADS budget (all cores when 0) between the parallel
+    renders, so they do not each spawn a thread per core and oversubscribe.
+    """
+    budget = getattr(Config, "FFMPEG_THREADS", 0) or os.cpu_count() or 2
+    return max(1, budget // max(1, workers))
+
+
+def _thread_args(threads: int) -> Tuple[str, ...]:
+    """FFmpeg -threads option, or nothing for the FFmpeg default."""
+    return ("-threads", str(threads)) if threads > 0 else ()
+
+
+def _render_ken_burns_clip(
+    img_path: str, duration: float, temp_dir: str, index: int, cached_path: Optional[str] = None,
+    threads: int = 0,
+) -> str:
+    """
+    Render one Ken Burns clip, falling back to a static clip if FFmpeg fails.
+
+    A successful render is also copied to cached_path when given. threads
+    caps FFmpeg's threads (0 = FFmpeg default).
+    """
+    video_path = os.path.join(temp_dir, f"ken_burns_clip_{index}.mp4")
+    cmd = _ken_burns_command(img_path, duration, video_path, threads=threads)
+    cmd.insert(1, "-nostdin")  # Parallel renders must not share the terminal
+
+    try:
+        result = subprocess.run(
+            cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        if result.returncode == 0:
+            print(f"  Ken Burns clip {index+1} created: {duration}s (zoom: 1.12x)")
+            _write_clip_meta(video_path, duration)
+            if cached_path:
+                _store_in_cache(video_path, cached_path)
+                _write_clip_meta(cached_path, duration)
+            return video_path
+        print(f"  FFmpeg failed on clip {index+1} with return code {result.returncode}")
+        logger.error(f"Ken Burns render failed for {img_path}: {_ffmpeg_error_tail(result.stderr)}")
+    except Exception as e:
+        print(f"  ERROR creating Ken Burns clip from {img_path}: {e}")
+
+    # Fallback: create static video
+    video_path = _create_static_video_fallback(img_path, duration, temp_dir, index, threads)
+    print(f"    Fallback: Static video created for clip {index+1}")
+    return video_path
+
+
 def images_to_video_clips(image_paths: List[str], duration_per_image: float = 3.0) -> List[str]:
     """
     Convert static AI images to video clips with Ken Burns effect using FFmpeg.
     
     Creates video files with subtle zoom/pan motion for engaging YouTube Shorts backgrounds.
+    Clips cached from an earlier run are reused; the rest are rendered in
+    parallel FFmpeg processes.
 
     Args:
         image_paths: List of image file paths
@@ -1004,87 +1184,77 @@ def images_to_video_clips(image_paths: List[str], duration_per_image: float = 3.
 
     print(f"Converting {len(image_paths)} images to video clips with Ken Burns effect...")
 
-    video_clips = []
-    temp_dir = Path("temp_files")
-    temp_dir.mkdir(exist_ok=True)
+    temp_dir = _temp_dir()
+    clip_slots: List[Optional[str]] = [None] * len(image_paths)
+    to_render = []  # (slot index, image path, cache path)
 
     for i, img_path in enumerate(image_paths):
-        try:
-            print(f"  Creating Ken Burns clip {i+1}: {duration_per_image}s")
-            
-            # Output video path
-            video_path = temp_dir / f"ken_burns_clip_{i}.mp4"
-            
-            # FFmpeg command for Ken Burns effect (stronger zoom & gentle pan)
-            cmd = [
-                "ffmpeg", "-y",
-                "-loop", "1",
-                "-t", str(duration_per_image),
-                "-i", str(img_path),
-                "-vf", f"scale=iw*1.12:ih*1.12,"
-                      f"zoompan=z='min(zoom+0.0025,1.12)':"
-                      f"d={int(duration_per_image * Config.VIDEO_FPS)}:"
-                      f"x='iw/2-(iw/zoom/2)':"
-                      f"y='ih/2-(ih/zoom/2)':"
-                      f"s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}",
-                "-c:v", "libx264",
-                "-pix_fmt", "yuv420p",
-                "-r", str(Config.VIDEO_FPS),
-                str(video_path)
+        img_path = str(img_path)
+        cached_clip = _ken_burns_cache_path(img_path, duration_per_image)
+
+        if cached_clip and os.path.exists(cached_clip):
+            # Same pixels, duration and encoder as an earlier run
+            clip_slots[i] = cached_clip
+            print(f"  Ken Burns clip {i+1} reused from cache")
+        else:
+            to_render.append((i, img_path, cached_clip))
+
+    if to_render:
+        workers = _ken_burns_workers(len(to_render))
+        threads = _clip_threads(workers)
+        print(f"  Rendering {len(to_render)} Ken Burns clips ({workers} in parallel)...")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ken_burns") as pool:
+            futures = [
+                (i, img_path, pool.submit(
+                    _render_ken_burns_clip, img_path, duration_per_image, temp_dir, i, cached_clip,
+                    threads,
+                ))
+                for i, img_path, cached_clip in to_render
             ]
-            
-            # Execute FFmpeg command
-            print(f"    Running FFmpeg for Ken Burns effect...")
-            result = subprocess.run(cmd, text=True)
-            
-            if result.returncode == 0:
-                video_clips.append(str(video_path))
-                print(f"    Ken Burns effect applied (zoom: 1.05x)")
-            else:
-                print(f"    FFmpeg failed with return code: {result.returncode}")
-                # Fallback: create static video
-                video_clips.append(_create_static_video_fallback(img_path, duration_per_image, temp_dir, i))
-                print(f"    Fallback: Static video created")
-
-        except Exception as e:
-            print(f"  ERROR creating Ken Burns clip from {img_path}: {e}")
-            # Fallback: create static video
-            try:
-                video_path = _create_static_video_fallback(img_path, duration_per_image, temp_dir, i)
-                video_clips.append(video_path)
-                print(f"    Fallback: Static video created")
-            except Exception as fallback_error:
-                print(f"    ERROR: Could not create fallback video: {fallback_error}")
-                continue
+            for i, img_path, future in futures:
+                try:
+                    clip_slots[i] = future.result()
+                except Exception as e:
+                    print(f"    ERROR: Could not create fallback video for {img_path}: {e}")
+
+    # Keep scene order; drop images that produced no clip at all
+    video_clips = [clip for clip in clip_slots if clip]
 
     print(f"Created {len(video_clips)} video clips with Ken Burns effect")
     return video_clips
 
 
-def _create_static_video_fallback(img_path: str, duration: float, temp_dir: Path, index: int) -> str:
+def _create_static_video_fallback(
+    img_path: str, duration: float, temp_dir: str, index: int, threads: int = 0
+) -> str:
     """Create static video from image as fallback."""
     
-    video_path = temp_dir / f"static_clip_{index}.mp4"
+    video_path = os.path.join(temp_dir, f"static_clip_{index}.mp4")
     
     cmd = [
-        "ffmpeg", "-y",
+        "ffmpeg", *_FFMPEG_QUIET, "-nostdin", "-y",
         "-loop", "1",
         "-i", str(img_path),
         "-t", str(duration),
         "-vf", f"scale={Config.VIDEO_WIDTH}:{Config.VIDEO_HEIGHT}:force_original_aspect_ratio=decrease,"
                f"pad={Config.VIDEO_WIDTH}:{Config.VIDEO_HEIGHT}:(ow-iw)/2:(oh-ih)/2",
-        "-c:v", "libx264",
+        *_clip_encoder_args(),
         "-pix_fmt", "yuv420p",
         "-r", str(Config.VIDEO_FPS),
-        str(video_path)
+        *_thread_args(threads),
+        video_path
     ]
     
     print(f"    Creating static video fallback...")
-    result = subprocess.run(cmd, text=True)
+    result = subprocess.run(
+        cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False
+    )
     if result.returncode != 0:
+        logger.error(f"Static video render failed for {img_path}: {_ffmpeg_error_tail(result.stderr)}")
         raise RuntimeError(f"Static video creation failed with return code: {result.returncode}")
     
-    return str(video_path)
+    _write_clip_meta(video_path, duration)
+    return video_path
 
 
 if __name__ == "__main__":
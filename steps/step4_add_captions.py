@@ -5,47 +5,59 @@ Creates large, centered karaoke-style captions for YouTube Shorts.
 Optimized for mobile viewing without sound.
 """
 
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple, Union
 
-# Captions now handled by FFmpeg in step5_combine_everything.py
+import numpy as np
+
+# The ASS file written here is burned in by FFmpeg/libass in step 5
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from settings.config import Config
+from steps._caption_kernels import WordStream, build_phrase_times, format_ass_timestamps
 
 
-def create_shorts_captions(word_timestamps: List[Dict[str, Any]]) -> str:
+def create_shorts_captions(word_timestamps: Union[List[Dict[str, Any]], WordStream]) -> str:
     """
     Generate an ASS (.ass) karaoke subtitle file from per-word timestamps.
 
     Args:
-        word_timestamps: List of dicts with keys: word, start, end (seconds)
+        word_timestamps: List of dicts with keys: word, start, end (seconds),
+            or a WordStream from generate_word_stream
 
     Returns:
         Path (str) to generated .ass file. Empty string if none.
     """
 
-    if not word_timestamps:
+    if isinstance(word_timestamps, WordStream):
+        empty = not word_timestamps.words
+    else:
+        empty = not word_timestamps
+    if empty:
         print("WARNING: No word timestamps provided for captions")
         return ""
 
-    # Output path
-    temp_dir = Path("temp_files")
+    # Output path (same temp folder as the step 3 clips)
+    temp_dir = Path(Config.TEMP_DIR)
     temp_dir.mkdir(parents=True, exist_ok=True)
     ass_path = temp_dir / "captions.ass"
 
     # Group words into short phrases for mobile readability
     words_per_phrase = getattr(Config, "WORDS_PER_CAPTION", 3) or 3
-    phrases = group_words_into_short_phrases(word_timestamps, words_per_phrase=words_per_phrase)
+    words = _words_to_array(word_timestamps)
 
     # ASS header and style
     play_res_x = getattr(Config, "VIDEO_WIDTH", 1080)
     play_res_y = getattr(Config, "VIDEO_HEIGHT", 1920)
     font_name = getattr(Config, "CAPTION_FONT_NAME", "Arial")
     font_size = getattr(Config, "CAPTION_FONT_SIZE", 52)
+    outline = getattr(Config, "CAPTION_STROKE_WIDTH", 2)
     # Keep captions above YouTube Shorts UI (safe area)
     margin_v = 300
 
@@ -66,112 +78,119 @@ def create_shorts_captions(word_timestamps: List[Dict[str, Any]]) -> str:
         "",
         "[V4+ Styles]",
         "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
-        # BorderStyle=1 (outline only), Outline=2, Shadow=1, Alignment=2 (bottom-center)
-        f"Style: StyleKaraoke,{font_name},{font_size},{primary_colour},{secondary_colour},{outline_colour},{back_colour},-1,0,0,0,100,100,0,0,1,2,1,2,60,60,{margin_v},1",
+        # BorderStyle=1 (outline only), Shadow=1, Alignment=2 (bottom-center)
+        f"Style: StyleKaraoke,{font_name},{font_size},{primary_colour},{secondary_colour},{outline_colour},{back_colour},-1,0,0,0,100,100,0,0,1,{outline},1,2,60,60,{margin_v},1",
         "",
         "[Events]",
         "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
     ]
 
-    lines: List[str] = []
-
-    for phrase in phrases:
-        if not phrase:
-            continue
-        # Determine start/end for this phrase
-        start = max(0.0, float(phrase[0]["start"]))
-        end = max(start, float(phrase[-1]["end"]))
-        # Build karaoke sequence with \kf tags (centiseconds)
-        parts: List[str] = []
-        for w in phrase:
-            dur = max(0.08, float(w["end"]) - float(w["start"]))  # minimum 80 ms per word
-            cs = int(round(dur * 100))
-            word_text = str(w["word"]).replace("{", "(").replace("}", ")")
-            parts.append(f"{{\\kf{cs}}}{word_text}")
-
-        text_payload = " ".join(parts)
-        start_ts = _sec_to_ass_ts(start)
-        end_ts = _sec_to_ass_ts(end)
-        # Bottom-center alignment via style (Alignment=2), so no \pos needed
-        line = f"Dialogue: 0,{start_ts},{end_ts},StyleKaraoke,,0,0,0,,{{\\an2}}{text_payload}"
-        lines.append(line)
-
-    with open(ass_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(header + lines) + "\n")
+    # Dialogue lines arrive already encoded and go straight into one growing
+    # byte buffer, so no whole-file str is ever built; single syscall write
+    header.append("")
+    sink = bytearray("\n".join(header).encode("utf-8"))
+    for line in _iter_dialogue_lines(words, words_per_phrase):
+        sink += line
+    _write_file_bytes(ass_path, sink)
 
     print(f"Created karaoke ASS: {ass_path}")
     return str(ass_path)
 
-    caption_clips = []
 
-    # Group words into short phrases (2-3 words for mobile)
-    phrases = group_words_into_short_phrases(
-        word_timestamps, words_per_phrase=Config.WORDS_PER_CAPTION
+def _write_file_bytes(path: Path, payload: Union[bytes, bytearray]) -> None:
+    """Write bytes through a raw file descriptor, bypassing the text I/O layer."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(str(path), flags, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# Braces would open ASS override blocks inside the caption text
+_ASS_TEXT_ESCAPE = str.maketrans("{}", "()")
+
+
+# One row per word; the word column stays a Python object so long words are never truncated
+_WORD_DTYPE = np.dtype([("word", object), ("start", np.float64), ("end", np.float64)])
+
+
+def _words_to_array(word_timestamps: Union[List[Dict[str, Any]], WordStream]) -> np.ndarray:
+    """Pack word timings into a single structured array (word, start, end)."""
+    if isinstance(word_timestamps, WordStream):
+        words = np.empty(len(word_timestamps.words), dtype=_WORD_DTYPE)
+        words["word"] = word_timestamps.words
+        words["start"] = word_timestamps.starts
+        words["end"] = word_timestamps.ends
+        return words
+
+    words = np.empty(len(word_timestamps), dtype=_WORD_DTYPE)
+    words["word"] = [str(w["word"]) for w in word_timestamps]
+    words["start"] = [w["start"] for w in word_timestamps]
+    words["end"] = [w["end"] for w in word_timestamps]
+    return words
+
+
+def _phrase_bounds(word_count: int, words_per_phrase: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of the first and last word of every phrase."""
+    firsts = np.arange(0, word_count, words_per_phrase)
+    lasts = np.minimum(firsts + words_per_phrase, word_count) - 1
+    return firsts, lasts
+
+
+# Long scripts format phrases on a thread pool; below this many phrases the
+# pool start-up costs more than it saves
+_PARALLEL_PHRASE_MIN = 256
+
+
+def _format_phrase(
+    phrase: Tuple[int, int, str, str],
+    texts: List[bytes],
+    kf_cs: List[int],
+) -> bytearray:
+    """Encode one karaoke Dialogue line from (first, last, start_ts, end_ts)."""
+    first, last, start_ts, end_ts = phrase
+    # Bottom-center alignment via style (Alignment=2), so no \pos needed
+    line = bytearray(b"Dialogue: 0,%s,%s,StyleKaraoke,,0,0,0,,{\\an2}" % (
+        start_ts.encode("ascii"), end_ts.encode("ascii")
+    ))
+    # Karaoke sequence with \kf tags (centiseconds precomputed per word),
+    # written word by word with a trailing space that the newline replaces
+    for k in range(first, last + 1):
+        line += b"{\\kf%d}" % kf_cs[k]
+        line += texts[k]
+        line += b" "
+    line[-1:] = b"\n"
+    return line
+
+
+def _iter_dialogue_lines(words: np.ndarray, words_per_phrase: int) -> Iterator[bytearray]:
+    """Yield one newline-terminated UTF-8 Dialogue line per phrase, in order."""
+    if not len(words):
+        return
+
+    # Phrase start/end times and per-word karaoke fill times in one kernel
+    firsts, lasts = _phrase_bounds(len(words), words_per_phrase)
+    starts, ends, kf_cs = build_phrase_times(words["start"], words["end"], words_per_phrase)
+    start_stamps = format_ass_timestamps(starts)
+    end_stamps = format_ass_timestamps(ends)
+
+    format_phrase = partial(
+        _format_phrase,
+        texts=[w.translate(_ASS_TEXT_ESCAPE).encode("utf-8") for w in words["word"].tolist()],
+        kf_cs=kf_cs.tolist(),
     )
+    phrases = zip(firsts.tolist(), lasts.tolist(), start_stamps, end_stamps)
 
-    print(f"  Creating {len(phrases)} caption phrases...")
-
-    for phrase in phrases:
-        phrase_clips = create_single_phrase_caption(phrase)
-        caption_clips.extend(phrase_clips)
-
-    print(f"Created {len(caption_clips)} caption clips")
+    if len(firsts) < _PARALLEL_PHRASE_MIN:
+        yield from map(format_phrase, phrases)
+        return
 
-    return caption_clips
-
-
-def create_single_phrase_caption(phrase: list) -> list:
-    """
-    Create caption for one phrase with karaoke effect.
-
-    Args:
-        phrase: List of word timing dictionaries
-
-    Returns:
-        List of TextClip objects
-    """
-
-    clips = []
-
-    # Calculate position (center of vertical video)
-    if Config.CAPTION_POSITION == "center":
-        y_position = Config.VIDEO_HEIGHT * 0.5
-    elif Config.CAPTION_POSITION == "top":
-        y_position = Config.VIDEO_HEIGHT * 0.2
-    else:  # bottom
-        y_position = Config.VIDEO_HEIGHT * 0.8
-
-    # Create highlighting effect for each word
-    for i, word_data in enumerate(phrase):
-        try:
-            # Create clip with current word
-            clip = (
-                TextClip(
-                    text=word_data["word"].upper(),  # Uppercase for emphasis
-                    font_size=Config.CAPTION_FONT_SIZE,
-                    color=Config.CAPTION_FONT_COLOR,
-                    stroke_color=Config.CAPTION_STROKE_COLOR,
-                    stroke_width=Config.CAPTION_STROKE_WIDTH,
-                    method="caption",
-                    size=(
-                        int(Config.VIDEO_WIDTH * Config.CAPTION_MAX_WIDTH_PERCENT),
-                        None,
-                    ),
-                    text_align="center",
-                )
-                .set_position(("center", y_position))
-                .set_start(word_data["start"])
-                .set_duration(word_data["end"] - word_data["start"])
-            )
-
-            clips.append(clip)
-
-        except Exception as e:
-            print(f"  WARNING: Error creating caption for '{word_data['word']}': {e}")
-            # Continue with other words even if one fails
-            continue
-
-    return clips
+    # Phrases are independent; map() keeps them in script order
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        yield from pool.map(format_phrase, phrases)
 
 
 def group_words_into_short_phrases(
@@ -193,28 +212,11 @@ def group_words_into_short_phrases(
         List of phrase groups
     """
 
-    phrases: List[List[Dict]] = []
-
-    for i in range(0, len(word_timestamps), words_per_phrase):
-        phrase = word_timestamps[i : i + words_per_phrase]
-        if phrase:  # Skip empty
-            phrases.append(phrase)
-
-    return phrases
-
-
-def _sec_to_ass_ts(sec: float) -> str:
-    """Convert seconds (float) to ASS timestamp H:MM:SS.cs (centiseconds)."""
-    if sec < 0:
-        sec = 0.0
-    total_cs = int(round(sec * 100))
-    cs = total_cs % 100
-    total_s = total_cs // 100
-    s = total_s % 60
-    total_m = total_s // 60
-    m = total_m % 60
-    h = total_m // 60
-    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+    firsts, lasts = _phrase_bounds(len(word_timestamps), words_per_phrase)
+    return [
+        word_timestamps[first : last + 1]
+        for first, last in zip(firsts.tolist(), lasts.tolist())
+    ]
 
 
 if __name__ == "__main__":
@@ -235,15 +237,17 @@ if __name__ == "__main__":
     print(f"\nInput: {len(test_words)} words")
     print(f"Words per caption: {Config.WORDS_PER_CAPTION}")
 
-    captions = create_shorts_captions(test_words)
+    ass_file = create_shorts_captions(test_words)
 
-    print(f"\nOutput: {len(captions)} caption clips")
+    print(f"\nOutput: {ass_file}")
 
-    if captions:
-        print("\nCaption details:")
-        for i, clip in enumerate(captions):
-            print(
-                f"  Clip {i+1}: start={clip.start:.2f}s, duration={clip.duration:.2f}s"
-            )
+    if ass_file:
+        dialogue = [
+            line for line in Path(ass_file).read_text(encoding="utf-8").splitlines()
+            if line.startswith("Dialogue:")
+        ]
+        print(f"\n{len(dialogue)} caption phrases:")
+        for line in dialogue:
+            print(f"  {line}")
 
     print("\nTest complete")
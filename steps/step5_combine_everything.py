@@ -5,17 +5,27 @@ Combines AI backgrounds, audio, and captions into final YouTube Short using pure
 Output: 1080x1920 vertical video, 9:16 aspect ratio, up to 60 seconds.
 """
 
+import os
 import sys
 import json
+import hashlib
+import re
+import shutil
 import subprocess
+import time
+from functools import lru_cache
 from pathlib import Path
 from tempfile import NamedTemporaryFile
-from typing import List, Dict, Any, Optional, Union
+from types import MappingProxyType
+from typing import Callable, List, Dict, Any, Optional, Union
+
+import numpy as np
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from settings.config import Config
+from steps.step1_write_script import generate_word_timestamps
 from utils.error_handler import (
     error_handler, VideoProcessingError, FileOperationError, ValidationError,
     validate_file_path, validate_duration, create_error_context, log_error_with_context
@@ -25,38 +35,57 @@ from utils.validation_utils import (
     validate_file_path_input, validate_video_specs
 )
 from utils.logging_utils import get_logger
+from utils.video_utils import (
+    FFmpegProcess, detect_hw_encoder, encoder_output_args, escape_drawtext,
+    start_combine_video_with_audio, watermark_drawtext
+)
 
 logger = get_logger("video_combination")
 
+# Filter fragments that depend only on Config, resolved once at import
+_WATERMARK_DRAWTEXT = watermark_drawtext(
+    Config.WATERMARK_TEXT,
+    getattr(Config, "WATERMARK_POSITION_MODE", "top-right"),
+    Config.WATERMARK_FONT_SIZE,
+    getattr(Config, "WATERMARK_OPACITY", 0.6),
+)
 
-@error_handler("video_combination", reraise=True)
-def combine_into_final_video(
-    video_clips: List[str],
-    audio_path: str,
-    audio_duration: float,
-    caption_ass_path: str,
-    output_name: str,
-) -> str:
-    """
-    Combine all elements into final YouTube Short using optimized video utilities.
+# Phrase cap for _generate_captions
+_CAPTION_MAX_PHRASES = 20
 
-    Specifications:
-    - Resolution: 1080x1920 (9:16 vertical)
-    - Duration: Up to 60 seconds
-    - Format: MP4 with H.264 codec
+# Output filenames keep letters, digits, space, - and _ (\w is Unicode-aware,
+# matching str.isalnum() plus the underscore)
+_UNSAFE_NAME_CHARS = re.compile(r"[^\w \-]")
 
-    Args:
-        video_clips: List of image paths or video clips
-        audio_path: Path to audio narration
-        audio_duration: Duration in seconds
-        caption_ass_path: Path to ASS subtitle file
-        output_name: Output filename (without extension)
 
-    Returns:
-        Path to final video file
+def _reserve_output_path(output_dir: Path, safe_name: str) -> Path:
+    """
+    Claim a unique <safe_name>[_<hex ns timestamp>].mp4 in output_dir.
+
+    The plain name is kept when free; on a collision a nanosecond timestamp
+    suffix is added instead of scanning the directory for a free counter.
+    O_EXCL creation makes each claim atomic, so concurrent renders never get
+    the same file.
     """
-    from utils.video_utils import combine_video_with_audio
+    name = f"{safe_name}.mp4"
+    while True:
+        output_path = output_dir / name
+        try:
+            fd = os.open(str(output_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            name = f"{safe_name}_{time.time_ns():x}.mp4"
+        else:
+            os.close(fd)
+            return output_path
+
 
+def _prepare_final_render(
+    video_clips: List[str],
+    audio_path: str,
+    audio_duration: float,
+    output_name: str,
+) -> tuple:
+    """Validate step 5 inputs and pick a unique output path."""
     # Validate inputs
     video_clips = validate_list_input(
         video_clips, "video_clips", min_items=1, max_items=20, item_type=str
@@ -88,29 +117,65 @@ def combine_into_final_video(
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Clean output filename
-    safe_name = "".join(c for c in output_name if c.isalnum() or c in (" ", "-", "_"))[
-        :50
-    ]
-    output_path = output_dir / f"{safe_name}.mp4"
-
-    # Ensure unique filename
-    counter = 1
-    while output_path.exists():
-        output_path = output_dir / f"{safe_name}_{counter}.mp4"
-        counter += 1
+    safe_name = _UNSAFE_NAME_CHARS.sub("", output_name)[:50]
+    output_path = _reserve_output_path(output_dir, safe_name)
 
     print(f"  Output: {output_path}")
+    return video_clips, audio_path, audio_duration, output_path
+
+
+@error_handler("video_combination", reraise=True)
+def combine_into_final_video(
+    video_clips: List[str],
+    audio_path: str,
+    audio_duration: float,
+    caption_ass_path: str,
+    output_name: str,
+) -> str:
+    """
+    Combine all elements into final YouTube Short using optimized video utilities.
+
+    Specifications:
+    - Resolution: 1080x1920 (9:16 vertical)
+    - Duration: Up to 60 seconds
+    - Format: MP4 with H.264 codec
+
+    Args:
+        video_clips: List of image paths or video clips
+        audio_path: Path to audio narration
+        audio_duration: Duration in seconds
+        caption_ass_path: Path to ASS subtitle file
+        output_name: Output filename (without extension)
 
+    Returns:
+        Path to final video file
+    """
+    output_path = None
     try:
-        # Use optimized video combination
-        result_path = combine_video_with_audio(
-            video_clips=video_clips,
-            audio_path=audio_path,
-            audio_duration=audio_duration,
-            output_path=str(output_path),
-            caption_ass_path=caption_ass_path
+        video_clips, audio_path, audio_duration, output_path = _prepare_final_render(
+            video_clips, audio_path, audio_duration, output_name
         )
         
+        # Identical inputs and settings: reuse the previous encode
+        cache_path = _final_render_cache_path(
+            video_clips, audio_path, audio_duration, caption_ass_path
+        )
+        if cache_path is not None and cache_path.exists():
+            shutil.copyfile(cache_path, output_path)
+            print(f"  Reused cached render: {cache_path.name}")
+            result_path = str(output_path)
+        else:
+            process = start_combine_video_with_audio(
+                video_clips=video_clips,
+                audio_path=audio_path,
+                audio_duration=audio_duration,
+                output_path=str(output_path),
+                caption_ass_path=caption_ass_path,
+            )
+            result_path = process.wait()
+            if cache_path is not None:
+                _store_final_render(result_path, cache_path)
+        
         print(f"\nVideo saved: {result_path}")
         print(f"Duration: {audio_duration:.1f} seconds")
         print(f"Resolution: {Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT} (9:16)")
@@ -119,203 +184,168 @@ def combine_into_final_video(
         
     except Exception as e:
         print(f"Error during video combination: {e}")
+        # Drop the empty placeholder reserved for the output name
+        if output_path is not None and output_path.exists() and output_path.stat().st_size == 0:
+            output_path.unlink()
         raise
 
 
-def _build_ffmpeg_command(
-    video_clips: List[str], 
-    audio_path: str, 
-    audio_duration: float, 
-    output_name: str, 
-    output_path: str, 
-    caption_ass_path: str = ""
-) -> List[str]:
-    """Build the complete FFmpeg command for video composition."""
-    
-    input_args = []
-    filter_complex_parts = []
-    concat_parts = []
-    
-    # Calculate segment duration
-    segment_duration = max(0.5, float(audio_duration) / max(1, len(video_clips)))
-    
-    input_index = 0
-    
-    # Process video clips
-    for idx, clip in enumerate(video_clips):
-        if isinstance(clip, str) and Path(clip).exists():
-            clip_path = Path(clip)
-            if clip_path.suffix.lower() in ['.mp4', '.avi', '.mov', '.mkv']:
-                # Video file - use directly
-                input_args.extend([
-                    "-t", f"{segment_duration}",
-                    "-i", str(clip)
-                ])
-            else:
-                # Image file - use loop input
-                input_args.extend([
-                    "-loop", "1",
-                    "-t", f"{segment_duration}",
-                    "-i", str(clip)
-                ])
-        elif hasattr(clip, 'filename') and clip.filename:
-            # MoviePy object with filename
-            input_args.extend([
-                "-loop", "1",
-                "-t", f"{segment_duration}",
-                "-i", str(clip.filename)
-            ])
-        else:
-            # Fallback: create colored background
-            color_hex = "%02x%02x%02x" % (30, 30, 40)  # Dark blue-gray
-            input_args.extend([
-                "-f", "lavfi",
-                "-t", f"{segment_duration}",
-                "-i", f"color=c=#{color_hex}:s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}:r={Config.VIDEO_FPS}"
-            ])
-        
-        # Scale and pad to correct resolution
-        label = f"v{idx}"
-        filter_complex_parts.append(
-            f"[{input_index}:v]scale=w={Config.VIDEO_WIDTH}:h={Config.VIDEO_HEIGHT}:"
-            f"force_original_aspect_ratio=decrease,"
-            f"pad={Config.VIDEO_WIDTH}:{Config.VIDEO_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
-            f"setsar=1[{label}]"
-        )
-        concat_parts.append(f"[{label}]")
-        input_index += 1
-    
-    # Build concat filter
-    if concat_parts:
-        concat_filter = "".join(concat_parts) + f"concat=n={len(concat_parts)}:v=1:a=0[vc]"
-        filter_complex_parts.append(concat_filter)
-    else:
-        # No video clips, create solid background
-        filter_complex_parts.append(
-            f"[0:v]setsar=1[vc]"
-        )
-    
-    # Add ASS subtitles via libass if provided
-    current_filter = "vc"
-    if caption_ass_path:
-        fonts_dir = Path("fonts")
-        ass_norm = str(Path(caption_ass_path)).replace("\\", "/")
-        fonts_norm = str(fonts_dir).replace("\\", "/")
-        subtitles_arg = f"subtitles={ass_norm}:fontsdir={fonts_norm}"
-        filter_complex_parts.append(f"[{current_filter}]{subtitles_arg}[vc_final]")
-        current_filter = "vc_final"
-    
-    # Add watermark
-    wm_text = Config.WATERMARK_TEXT.replace(":", "\\:").replace("'", "\\'")
-    pos = getattr(Config, "WATERMARK_POSITION_MODE", "top-right")
-    if pos == "bottom-right":
-        wm_xy = "x=w-tw-20:y=h-th-20"
-    elif pos == "top-left":
-        wm_xy = "x=20:y=20"
-    elif pos == "bottom-left":
-        wm_xy = "x=20:y=h-th-20"
-    else:
-        wm_xy = "x=w-tw-20:y=20"
-    
-    filter_complex_parts.append(
-        f"[{current_filter}]drawtext=text='{wm_text}':"
-        f"fontcolor=white:fontsize={Config.WATERMARK_FONT_SIZE}:"
-        f"{wm_xy}:alpha={Config.WATERMARK_OPACITY}[vout]"
+def _final_render_cache_path(
+    video_clips: List[str],
+    audio_path: str,
+    audio_duration: float,
+    caption_ass_path: str,
+) -> Optional[Path]:
+    """
+    Render cache entry for a final video, or None when caching is off.
+
+    Clips and audio are keyed by path, mtime and size; the small caption file
+    by content, since step 4 rewrites it in place on every run. Encoder and
+    output settings are part of the key, so changing them re-encodes.
+    """
+    if not getattr(Config, "ENABLE_CACHING", False):
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    for path in (*video_clips, audio_path):
+        stat = Path(path).stat()
+        digest.update(f"{Path(path).resolve()}|{stat.st_mtime_ns}|{stat.st_size}\n".encode("utf-8"))
+    if caption_ass_path and Path(caption_ass_path).exists():
+        digest.update(Path(caption_ass_path).read_bytes())
+
+    encoder = detect_hw_encoder()
+    settings = (
+        round(float(audio_duration), 3), encoder, *encoder_output_args(encoder),
+        Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT, Config.VIDEO_FPS,
+        _WATERMARK_DRAWTEXT,
+        getattr(Config, "AUDIO_CODEC", ""), getattr(Config, "AUDIO_BITRATE", ""),
     )
-    
-    # Join all filters
-    filter_complex = ";".join(filter_complex_parts)
-    
-    # Build complete command
-    cmd = [
-        "ffmpeg", "-y",
-        *input_args,
-        "-i", str(audio_path),
-        "-filter_complex", filter_complex,
-        "-map", "[vout]",
-        "-map", f"{input_index}:a",
-        "-shortest",
-        "-r", str(Config.VIDEO_FPS),
-        "-vcodec", Config.VIDEO_CODEC,
-        "-acodec", Config.AUDIO_CODEC,
-        "-b:a", Config.AUDIO_BITRATE,
-        "-preset", getattr(Config, "NVENC_PRESET", "p1"),
-        "-tune", getattr(Config, "NVENC_TUNE", "ull"),
-        "-rc", getattr(Config, "NVENC_RC", "cbr"),
-        "-b:v", getattr(Config, "NVENC_BITRATE", "5M"),
-        "-maxrate", getattr(Config, "NVENC_MAX_BITRATE", "8M"),
-        "-g", str(getattr(Config, "NVENC_GOP_SIZE", 30)),
-        "-t", str(max(0.1, float(audio_duration))),
-        "-threads", str(getattr(Config, "FFMPEG_THREADS", 0) or 0),
-        str(output_path)
-    ]
-    
-    return cmd
+    digest.update(repr(settings).encode("utf-8"))
+
+    cache_dir = Path(Config.CACHE_DIR) / "final_videos"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / f"{digest.hexdigest()}.mp4"
+
+
+def _store_final_render(result_path: str, cache_path: Path) -> None:
+    """Copy a finished render into the cache via a temp file and atomic rename."""
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(result_path, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write render cache entry {cache_path}: {e}")
+        tmp_path.unlink(missing_ok=True)
+
+
+def combine_into_final_video_async(
+    video_clips: List[str],
+    audio_path: str,
+    audio_duration: float,
+    caption_ass_path: str,
+    output_name: str,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> FFmpegProcess:
+    """
+    Start the final render and return while FFmpeg is still running.
+
+    Lets batch runs prepare the next short (script, TTS, backgrounds) while
+    the previous one encodes. Call wait() on the result to get the path.
+
+    Args:
+        video_clips: List of image paths or video clips
+        audio_path: Path to audio narration
+        audio_duration: Duration in seconds
+        caption_ass_path: Path to ASS subtitle file
+        output_name: Output filename (without extension)
+        on_progress: Optional callback receiving the completed fraction (0-1)
+
+    Returns:
+        Running FFmpegProcess (the Popen is available as .proc)
+    """
+    video_clips, audio_path, audio_duration, output_path = _prepare_final_render(
+        video_clips, audio_path, audio_duration, output_name
+    )
+    try:
+        return start_combine_video_with_audio(
+            video_clips=video_clips,
+            audio_path=audio_path,
+            audio_duration=audio_duration,
+            output_path=str(output_path),
+            caption_ass_path=caption_ass_path,
+            on_progress=on_progress,
+        )
+    except Exception:
+        # FFmpeg never started: drop the placeholder reserved for the name
+        output_path.unlink(missing_ok=True)
+        raise
+
+
+@lru_cache(maxsize=128)
+def _load_words(sidecar_str: str, dur_cs: int, mtime_ns: int = 0) -> tuple:
+    """
+    Word timings for a script sidecar, memoized per (sidecar, duration).
+
+    Returns a tuple of read-only word dicts (empty when the sidecar has no
+    script), so repeat calls skip the JSON parse and re-tokenization.
+    mtime_ns is only part of the cache key: a rewritten sidecar misses.
+    """
+    with open(sidecar_str, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    if "script" not in meta:
+        return ()
+
+    words = generate_word_timestamps(meta["script"], dur_cs / 100)
+    return tuple(MappingProxyType(dict(w)) for w in words)
 
 
 def _generate_captions(output_name: str, audio_duration: float) -> List[str]:
-    """Generate caption data from script metadata."""
+    """
+    Generate drawtext caption phrases from script metadata.
+
+    Not used for rendering: captions are burned in from step 4's ASS file by
+    the single subtitles filter. Kept for callers that need the phrase list.
+    """
     try:
-        from steps.step1_write_script import generate_word_timestamps
-        
         sidecar = Path(Config.METADATA_DIR) / f"{output_name}.json"
         if not sidecar.exists():
             return []
             
-        with open(sidecar, 'r', encoding='utf-8') as f:
-            meta = json.load(f)
-            
-        if "script" not in meta:
+        words = _load_words(
+            str(sidecar), int(round(audio_duration * 100)), sidecar.stat().st_mtime_ns
+        )
+        if not words:
             return []
-            
-        words = generate_word_timestamps(meta["script"], audio_duration)
-        
-        # Group words into phrases (2-3 words each)
-        phrases = []
-        for i in range(0, len(words), 2):
-            phrase_words = words[i:i+2]
-            if phrase_words:
-                phrase_text = " ".join([w["word"] for w in phrase_words])
-                start_time = phrase_words[0]["start"]
-                end_time = phrase_words[-1]["end"]
-                phrases.append({
-                    "text": phrase_text.upper().replace(":", "\\:").replace("'", "\\'"),
-                    "start": start_time,
-                    "end": end_time
-                })
         
-        # Limit to 20 phrases max for performance
-        return phrases[:20]
+        # Group words into two-word phrases, capped at 20 phrases for
+        # performance; only the words that can reach a phrase are touched
+        words = words[:_CAPTION_MAX_PHRASES * 2]
+        count = len(words)
+        starts = np.fromiter((w["start"] for w in words), dtype=np.float64, count=count)
+        ends = np.fromiter((w["end"] for w in words), dtype=np.float64, count=count)
+        # Upper-case before building the array: the fixed-width dtype is sized
+        # from the input, and np.char.upper would cut expansions like "ß" -> "SS"
+        texts = np.array([w["word"].upper() for w in words] + [""] * (count % 2), dtype=str)
+
+        pairs = texts.reshape(-1, 2)
+        joined = np.char.add(np.char.add(pairs[:, 0], " "), pairs[:, 1])
+        phrase_texts = np.where(pairs[:, 1] == "", pairs[:, 0], joined)
+        firsts = np.arange(0, count, 2)
+        lasts = np.minimum(firsts + 1, count - 1)
+
+        return [
+            {"text": escape_drawtext(text), "start": start, "end": end}
+            for text, start, end in zip(
+                phrase_texts.tolist(), starts[firsts].tolist(), ends[lasts].tolist()
+            )
+        ]
         
     except Exception as e:
         print(f"  Caption generation error: {e}")
         return []
 
 
-def create_ken_burns_effect(image_path: str, duration: float, output_path: str) -> str:
-    """Create Ken Burns effect using optimized video utilities."""
-    from utils.video_utils import create_ken_burns_video, create_static_video
-    
-    try:
-        print(f"  Creating Ken Burns effect: {Path(image_path).name}")
-        return create_ken_burns_video(image_path, duration, output_path)
-    except Exception as e:
-        print(f"Ken Burns error: {e}, falling back to static video")
-        return create_static_video(image_path, duration, output_path)
-
-
-def _create_static_video(image_path: str, duration: float, output_path: str) -> str:
-    """Create static video from image as fallback."""
-    from utils.video_utils import create_static_video as utils_create_static_video
-    
-    try:
-        print(f"  Creating static video: {Path(image_path).name}")
-        return utils_create_static_video(image_path, duration, output_path)
-    except Exception as e:
-        print(f"Static video creation error: {e}")
-        raise
-
-
 if __name__ == "__main__":
     print("This module combines video, audio, and captions using pure FFmpeg")
     print("Run from main program, not standalone")
@@ -3,7 +3,11 @@ Quick script to switch between Grok models.
 Run this to easily change your Grok model without editing config files.
 """
 
+import json
+import os
 import sys
+import tempfile
+import tomllib
 from pathlib import Path
 
 # Add project root to path
@@ -69,27 +73,24 @@ def switch_grok_model():
     
     # Update config file
     try:
-        config_path = Path("settings/config.py")
-        
-        if not config_path.exists():
-            print(f"Error: Config file not found at {config_path}")
-            return
-        
-        # Read current config
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config_content = f.read()
-        
-        # Update the model line
-        import re
-        pattern = r'GROK_MODEL = "[^"]*"'
-        replacement = f'GROK_MODEL = "{selected_model["name"]}"'
-        
-        new_config = re.sub(pattern, replacement, config_content)
-        
-        # Write updated config
-        with open(config_path, 'w', encoding='utf-8') as f:
-            f.write(new_config)
-        
+        model_path = project_root / "settings" / "model.toml"
+
+        settings = {}
+        if model_path.exists():
+            with open(model_path, "rb") as f:
+                settings = tomllib.load(f)
+        settings["grok_model"] = selected_model["name"]
+
+        # Write to a temp file beside the target and swap it in, so an
+        # interrupted write never leaves a truncated model.toml behind
+        lines = ["# Grok model selection, rewritten by switch_grok_model.py\n"]
+        lines += [f"{key} = {json.dumps(value)}\n" for key, value in settings.items()]
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=model_path.parent, suffix=".tmp", delete=False
+        ) as tmp:
+            tmp.writelines(lines)
+        os.replace(tmp.name, model_path)
+
         print()
         print("✅ SUCCESS!")
         print(f"Switched to: {selected_model['name']}")
@@ -112,7 +113,7 @@ def switch_grok_model():
         
     except Exception as e:
         print(f"❌ Error updating config: {e}")
-        print("Please manually edit settings/config.py and change GROK_MODEL")
+        print("Please manually edit settings/model.toml and change grok_model")
 
 if __name__ == "__main__":
     switch_grok_model()
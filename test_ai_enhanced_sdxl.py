@@ -8,8 +8,16 @@ Comprehensive testing of all AI enhancements:
 - End-to-end workflow integration
 """
 
+import functools
+import importlib
+import inspect
+import io
+import operator
 import sys
+import threading
 import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
@@ -18,26 +26,67 @@ import numpy as np
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 from settings.config import Config
 
+# Shared dummy inputs; the helpers under test only read them (light blue)
+_DUMMY_IMG_512 = Image.new('RGB', (512, 512), (173, 216, 230))
+_DUMMY_IMG_256 = Image.new('RGB', (256, 256), (173, 216, 230))
+
+
+@functools.lru_cache(maxsize=None)
+def _sig(func) -> inspect.Signature:
+    """inspect.signature, built once per function"""
+    return inspect.signature(func)
+
+
+class _ThreadBufferedStdout(io.TextIOBase):
+    """sys.stdout stand-in that sends writes from registered threads to their own buffer"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers: Dict[int, io.StringIO] = {}
+    
+    def write(self, text: str) -> int:
+        return self.buffers.get(threading.get_ident(), self.stream).write(text)
+    
+    def flush(self) -> None:
+        self.stream.flush()
+
 
 class AIEnhancedSDXLTestSuite:
     """Comprehensive test suite for AI-enhanced SDXL system"""
     
+    # Tests with no GPU/WebUI work and no shared mutable state; they run on a
+    # thread pool alongside the others
+    PARALLEL_SAFE = ("WebUI API Integration", "Configuration Validation", "Error Handling")
+    
+    # Imported in the background from __init__ so torch/OpenCV start-up
+    # overlaps the first tests instead of landing inside one of them
+    HELPER_MODULES = (
+        "helpers.ai_prompt_optimizer",
+        "helpers.controlnet_processor",
+        "helpers.image_quality_analyzer",
+        "helpers.sd_webui_api",
+    )
+    
     def __init__(self):
         self.test_results = {}
-        self.start_time = time.time()
+        self.start_time = time.perf_counter_ns()
         
-    def run_all_tests(self) -> Dict[str, bool]:
-        """Run all tests and return results"""
-        
-        print("=" * 80)
-        print("AI-ENHANCED SDXL SYSTEM - COMPREHENSIVE TEST SUITE")
-        print("=" * 80)
+        pool = ThreadPoolExecutor(max_workers=len(self.HELPER_MODULES))
+        self._imports = {name: pool.submit(importlib.import_module, name) for name in self.HELPER_MODULES}
+        pool.shutdown(wait=False)
+    
+    def _helper(self, name: str):
+        """Helper module from the background import, waiting if still loading (re-raises ImportError)"""
+        return self._imports[f"helpers.{name}"].result()
         
-        tests = [
+    def tests(self) -> List[Tuple[str, object]]:
+        """(name, test method) pairs in run order"""
+        return [
             ("AI Prompt Optimizer", self.test_prompt_optimizer),
             ("ControlNet Processor", self.test_controlnet_processor),
             ("Quality Analyzer", self.test_quality_analyzer),
@@ -47,29 +96,78 @@ class AIEnhancedSDXLTestSuite:
             ("Configuration Validation", self.test_configuration_validation),
             ("Error Handling", self.test_error_handling)
         ]
+    
+    def run_all_tests(self) -> Dict[str, bool]:
+        """Run all tests and return results"""
         
-        for test_name, test_func in tests:
-            print(f"\n[TEST] Running: {test_name}")
-            print("-" * 50)
-            
+        print("=" * 80)
+        print("AI-ENHANCED SDXL SYSTEM - COMPREHENSIVE TEST SUITE")
+        print("=" * 80)
+        
+        tests = self.tests()
+        
+        parallel_tests = [(name, func) for name, func in tests if name in self.PARALLEL_SAFE]
+        stdout = _ThreadBufferedStdout(sys.stdout)
+        results = {}
+        logs = {}
+        
+        def run_buffered(test_name, test_func):
+            buffer = io.StringIO()
+            stdout.buffers[threading.get_ident()] = buffer
             try:
-                result = test_func()
-                self.test_results[test_name] = result
-                status = "[PASS]" if result else "[FAIL]"
-                print(f"\n{status}: {test_name}")
+                return self._run_test(test_name, test_func)
+            finally:
+                del stdout.buffers[threading.get_ident()]
+                logs[test_name] = buffer.getvalue()
+        
+        sys.stdout = stdout
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, len(parallel_tests))) as pool:
+                futures = {name: pool.submit(run_buffered, name, func) for name, func in parallel_tests}
                 
-            except Exception as e:
-                print(f"\n[FAIL] {test_name} - {e}")
-                self.test_results[test_name] = False
+                # GPU/WebUI tests run one at a time on this thread meanwhile;
+                # their output is buffered too and written once per test, so
+                # console writes stay out of the timed sections
+                for test_name, test_func in tests:
+                    if test_name not in futures:
+                        results[test_name] = run_buffered(test_name, test_func)
+                        stdout.stream.write(logs[test_name])
+                
+                for test_name, future in futures.items():
+                    results[test_name] = future.result()
+                    stdout.stream.write(logs[test_name])
+        finally:
+            sys.stdout = stdout.stream
+        
+        # Summary lists the tests in their declared order
+        for test_name, _ in tests:
+            self.test_results[test_name] = results[test_name]
         
         # Print summary
         self.print_test_summary()
         return self.test_results
     
+    def _run_test(self, test_name: str, test_func) -> bool:
+        """Run one test with its header and status lines"""
+        
+        print(f"\n[TEST] Running: {test_name}")
+        print("-" * 50)
+        
+        try:
+            result = test_func()
+            status = "[PASS]" if result else "[FAIL]"
+            print(f"\n{status}: {test_name}")
+            return result
+            
+        except Exception as e:
+            print(f"\n[FAIL] {test_name} - {e}")
+            return False
+    
     def test_prompt_optimizer(self) -> bool:
         """Test AI prompt optimization with mock script data"""
         
         try:
+            self._helper("ai_prompt_optimizer")
             from helpers.ai_prompt_optimizer import optimize_prompts_with_ai
             
             # Mock scene descriptions
@@ -128,10 +226,11 @@ class AIEnhancedSDXLTestSuite:
         """Test ControlNet processing and control image generation"""
         
         try:
+            self._helper("controlnet_processor")
             from helpers.controlnet_processor import process_control_images
             
             # Create test images
-            test_image = Image.new('RGB', (512, 512), color='lightblue')
+            test_image = _DUMMY_IMG_512
             
             print(f"  🎯 Testing ControlNet processing...")
             
@@ -187,10 +286,13 @@ class AIEnhancedSDXLTestSuite:
         """Test image quality analysis and refinement"""
         
         try:
-            from helpers.image_quality_analyzer import analyze_image_quality, generate_refinement_prompt
+            self._helper("image_quality_analyzer")
+            from helpers.image_quality_analyzer import (
+                analyze_image_quality, analyze_image_quality_batch, generate_refinement_prompt
+            )
             
             # Create test image
-            test_image = Image.new('RGB', (512, 512), color='lightblue')
+            test_image = _DUMMY_IMG_512
             
             # Mock data
             test_prompt = "Ocean waves at sunset, vertical composition, cinematic, high quality"
@@ -246,6 +348,19 @@ class AIEnhancedSDXLTestSuite:
             else:
                 print(f"    ℹ️ Quality analysis disabled")
             
+            # Test batched analysis (one request for several scenes)
+            print(f"  🔍 Testing batched quality analysis...")
+            batch_analyses = analyze_image_quality_batch(
+                images=[test_image] * 3,
+                original_prompts=[test_prompt] * 3,
+                scene_descriptions=[test_scene] * 3,
+                script_context=test_context
+            )
+            if len(batch_analyses) != 3:
+                print(f"    ❌ Batched analysis returned {len(batch_analyses)} results for 3 images")
+                return False
+            print(f"    ✅ Batched analysis returned one result per image")
+            
             print(f"    ✅ Quality analyzer working correctly")
             return True
             
@@ -260,12 +375,13 @@ class AIEnhancedSDXLTestSuite:
         """Test WebUI API integration with ControlNet support"""
         
         try:
-            from helpers.sd_webui_api import SDWebUIAPI
+            self._helper("sd_webui_api")
+            from helpers.sd_webui_api import get_webui_api
             
             print(f"  🌐 Testing WebUI API integration...")
             
-            # Initialize API
-            api = SDWebUIAPI(host=Config.SD_WEBUI_HOST, timeout=10)
+            # Shared client (one keep-alive session per process)
+            api = get_webui_api(host=Config.SD_WEBUI_HOST, timeout=10)
             
             # Test connection
             print(f"    🔗 Testing connection to {Config.SD_WEBUI_HOST}...")
@@ -273,9 +389,8 @@ class AIEnhancedSDXLTestSuite:
             # Note: This test will fail if WebUI is not running, which is expected
             # We're testing the integration code, not the actual WebUI service
             
-            # Test method signature
-            import inspect
-            sig = inspect.signature(api.generate_image)
+            # Test method signature (on the class function, so the cache holds no client)
+            sig = _sig(type(api).generate_image)
             params = list(sig.parameters.keys())
             
             if 'controlnet_units' not in params:
@@ -352,8 +467,9 @@ class AIEnhancedSDXLTestSuite:
             print(f"  ⚡ Testing performance characteristics...")
             
             # Test prompt optimization speed
-            start_time = time.time()
+            start_time = time.perf_counter_ns()
             
+            self._helper("ai_prompt_optimizer")
             from helpers.ai_prompt_optimizer import optimize_prompts_with_ai
             
             test_scenes = ["Ocean waves at sunset", "City skyline at night"]
@@ -365,7 +481,7 @@ class AIEnhancedSDXLTestSuite:
             
             try:
                 optimized = optimize_prompts_with_ai(test_scenes, test_script_data)
-                opt_time = time.time() - start_time
+                opt_time = (time.perf_counter_ns() - start_time) / 1e9
                 
                 print(f"    ✅ Prompt optimization: {opt_time:.2f}s for {len(test_scenes)} scenes")
                 
@@ -374,18 +490,26 @@ class AIEnhancedSDXLTestSuite:
                 else:
                     print(f"    ✅ Prompt optimization speed acceptable")
                 
+                # Second run with the same task instructions: providers with
+                # prompt prefix caching should answer faster
+                start_time = time.perf_counter_ns()
+                optimize_prompts_with_ai(test_scenes, test_script_data)
+                warm_time = (time.perf_counter_ns() - start_time) / 1e9
+                print(f"    ✅ Repeat prompt optimization: {warm_time:.2f}s (first run {opt_time:.2f}s)")
+                
             except Exception as e:
                 print(f"    ⚠️ Prompt optimization performance test failed: {e}")
             
             # Test ControlNet processing speed
-            start_time = time.time()
+            start_time = time.perf_counter_ns()
             
             try:
+                self._helper("controlnet_processor")
                 from helpers.controlnet_processor import process_control_images
                 
-                test_image = Image.new('RGB', (256, 256), color='lightblue')
+                test_image = _DUMMY_IMG_256
                 controlnet_result = process_control_images(reference_image=test_image)
-                cn_time = time.time() - start_time
+                cn_time = (time.perf_counter_ns() - start_time) / 1e9
                 
                 print(f"    ✅ ControlNet processing: {cn_time:.2f}s")
                 
@@ -420,38 +544,49 @@ class AIEnhancedSDXLTestSuite:
                 'SD_MAX_REFINEMENT_ITERATIONS'
             ]
             
-            missing_configs = []
-            for config_name in required_configs:
-                if not hasattr(Config, config_name):
-                    missing_configs.append(config_name)
-            
-            if missing_configs:
+            # All attributes in one attrgetter call; the missing ones are
+            # only worked out when it fails
+            try:
+                (use_optimizer, optimizer_provider, use_controlnet, use_quality,
+                 quality_threshold, max_refinements) = operator.attrgetter(*required_configs)(Config)
+            except AttributeError:
+                missing_configs = [name for name in required_configs if not hasattr(Config, name)]
                 print(f"    ❌ Missing configuration attributes: {missing_configs}")
                 return False
             
             # Test configuration values
-            if not isinstance(Config.SD_QUALITY_THRESHOLD, (int, float)):
+            if not isinstance(quality_threshold, (int, float)):
                 print(f"    ❌ SD_QUALITY_THRESHOLD should be numeric")
                 return False
             
-            if not 1 <= Config.SD_QUALITY_THRESHOLD <= 10:
+            if not 1 <= quality_threshold <= 10:
                 print(f"    ❌ SD_QUALITY_THRESHOLD should be between 1 and 10")
                 return False
             
-            if not isinstance(Config.SD_MAX_REFINEMENT_ITERATIONS, int):
+            if not isinstance(max_refinements, int):
                 print(f"    ❌ SD_MAX_REFINEMENT_ITERATIONS should be integer")
                 return False
             
-            if Config.SD_MAX_REFINEMENT_ITERATIONS < 0 or Config.SD_MAX_REFINEMENT_ITERATIONS > 5:
+            if max_refinements < 0 or max_refinements > 5:
                 print(f"    ❌ SD_MAX_REFINEMENT_ITERATIONS should be between 0 and 5")
                 return False
             
+            fast_threshold = getattr(Config, 'SD_FAST_QUALITY_THRESHOLD', 8.0)
+            if not isinstance(fast_threshold, (int, float)) or not 0 <= fast_threshold <= 10:
+                print(f"    ❌ SD_FAST_QUALITY_THRESHOLD should be between 0 and 10")
+                return False
+            
+            semantic_threshold = getattr(Config, 'SD_SEMANTIC_CACHE_THRESHOLD', 0.92)
+            if not isinstance(semantic_threshold, (int, float)) or not 0 < semantic_threshold <= 1:
+                print(f"    ❌ SD_SEMANTIC_CACHE_THRESHOLD should be a similarity between 0 and 1")
+                return False
+            
             print(f"    ✅ Configuration validation passed")
-            print(f"    📊 Quality threshold: {Config.SD_QUALITY_THRESHOLD}")
-            print(f"    📊 Max refinements: {Config.SD_MAX_REFINEMENT_ITERATIONS}")
-            print(f"    📊 AI prompt optimizer: {Config.SD_USE_AI_PROMPT_OPTIMIZER}")
-            print(f"    📊 ControlNet enabled: {Config.SD_USE_CONTROLNET}")
-            print(f"    📊 Quality analysis: {Config.SD_USE_QUALITY_ANALYSIS}")
+            print(f"    📊 Quality threshold: {quality_threshold}")
+            print(f"    📊 Max refinements: {max_refinements}")
+            print(f"    📊 AI prompt optimizer: {use_optimizer} ({optimizer_provider})")
+            print(f"    📊 ControlNet enabled: {use_controlnet}")
+            print(f"    📊 Quality analysis: {use_quality}")
             
             return True
             
@@ -466,8 +601,11 @@ class AIEnhancedSDXLTestSuite:
             print(f"  🛡️ Testing error handling...")
             
             # Test with invalid inputs
+            self._helper("ai_prompt_optimizer")
             from helpers.ai_prompt_optimizer import optimize_prompts_with_ai
+            self._helper("controlnet_processor")
             from helpers.controlnet_processor import process_control_images
+            self._helper("image_quality_analyzer")
             from helpers.image_quality_analyzer import analyze_image_quality
             
             # Test prompt optimizer with empty scenes
@@ -514,7 +652,7 @@ class AIEnhancedSDXLTestSuite:
     def print_test_summary(self):
         """Print comprehensive test summary"""
         
-        total_time = time.time() - self.start_time
+        total_time = (time.perf_counter_ns() - self.start_time) / 1e9
         
         print("\n" + "=" * 80)
         print("TEST SUMMARY")
@@ -551,6 +689,26 @@ class AIEnhancedSDXLTestSuite:
             print(f"  3. Check configuration settings in settings/config.py")
 
 
+class AIEnhancedSDXLTests(unittest.TestCase):
+    """unittest/pytest entry point: runs the suite in the runner's own process"""
+    
+    @classmethod
+    def setUpClass(cls):
+        # Import the heavy helpers once for every test in the session
+        cls.suite = AIEnhancedSDXLTestSuite()
+        try:
+            cls.ai_prompt_optimizer = cls.suite._helper("ai_prompt_optimizer")
+            cls.controlnet_processor = cls.suite._helper("controlnet_processor")
+            cls.image_quality_analyzer = cls.suite._helper("image_quality_analyzer")
+        except ImportError as e:
+            raise unittest.SkipTest(f"AI-enhanced SDXL helpers unavailable: {e}")
+    
+    def test_suite(self):
+        for test_name, test_func in self.suite.tests():
+            with self.subTest(test_name):
+                self.assertTrue(self.suite._run_test(test_name, test_func), test_name)
+
+
 def main():
     """Run the test suite"""
     
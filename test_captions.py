@@ -2,15 +2,22 @@
 """Test caption generation and word timestamps"""
 
 import sys
+import time
 from pathlib import Path
 
+import numpy as np
+
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
-from steps.step1_write_script import generate_word_timestamps
+from steps.step1_write_script import generate_word_stream
 from settings.config import Config
 
+# Same substitutions as the drawtext escaping: colons and quotes escaped, spaces dropped
+_ESCAPE_TABLE = str.maketrans({":": "\\:", "'": "\\'", " ": ""})
+
 # Test script
 test_script = "Hey, space fans! Did you know that there's a giant storm on Jupiter that's been raging for CENTURIES?"
 test_duration = 10.0  # 10 seconds
@@ -21,36 +28,44 @@ print(f"Duration: {test_duration} seconds")
 print()
 
 # Generate word timestamps
-words = generate_word_timestamps(test_script, test_duration)
+ws = generate_word_stream(test_script, test_duration)
 
-print(f"Generated {len(words)} word timestamps:")
-for i, word in enumerate(words[:10]):  # Show first 10
-    print(f"  {i+1:2d}. '{word['word']}' - {word['start']:.2f}s to {word['end']:.2f}s")
+print(f"Generated {len(ws.words)} word timestamps:")
+for i in range(min(10, len(ws.words))):  # Show first 10
+    print(f"  {i+1:2d}. '{ws.words[i]}' - {ws.starts[i]:.2f}s to {ws.ends[i]:.2f}s")
 
-if len(words) > 10:
-    print(f"  ... and {len(words) - 10} more words")
+if len(ws.words) > 10:
+    print(f"  ... and {len(ws.words) - 10} more words")
+
+# Timing on a podcast-length transcript (first call includes any Numba compile)
+long_script = " ".join([test_script] * 80)
+for run in ("first", "second"):
+    t0 = time.perf_counter_ns()
+    long_ws = generate_word_stream(long_script, 600.0)
+    print(f"{len(long_ws.words)} words ({run} run): {(time.perf_counter_ns() - t0) / 1e6:.2f} ms")
 
 print()
 print("Testing FFmpeg drawtext filter generation...")
 
 # Test FFmpeg filter generation
-filter_parts = []
-for w in words[:5]:  # Test first 5 words
-    txt = (
-        str(w["word"]).upper().replace(":", "\\:").replace("'", "\\'").replace(" ", "")
-    )
-    start = max(0.0, float(w["start"]))
-    end = max(start + 0.05, float(w["end"]))
-    filter_part = (
-        f"[vc]drawtext=text='{txt}':fontcolor={Config.CAPTION_FONT_COLOR}:fontsize={Config.CAPTION_FONT_SIZE}:"
-        f"borderw={Config.CAPTION_STROKE_WIDTH}:bordercolor={Config.CAPTION_STROKE_COLOR}:"
-        f"x=(w-tw)/2:y=(h/2):enable='between(t,{start:.2f},{end:.2f})'[vc]"
-    )
-    filter_parts.append(filter_part)
+starts = np.maximum(0.0, ws.starts[:5])  # Test first 5 words
+ends = np.maximum(starts + 0.05, ws.ends[:5])
+texts = [word.upper().translate(_ESCAPE_TABLE) for word in ws.words[:5]]
+
+filter_template = (
+    "[vc]drawtext=text='%s':fontcolor=" + str(Config.CAPTION_FONT_COLOR)
+    + ":fontsize=" + str(Config.CAPTION_FONT_SIZE)
+    + ":borderw=" + str(getattr(Config, "CAPTION_STROKE_WIDTH", 2))
+    + ":bordercolor=" + str(getattr(Config, "CAPTION_STROKE_COLOR", "black"))
+    + ":x=(w-tw)/2:y=(h/2):enable='between(t,%.2f,%.2f)'[vc]"
+)
+filter_parts = [filter_template % part for part in zip(texts, starts.tolist(), ends.tolist())]
+filter_graph = ";".join(filter_parts)
 
 print("Generated FFmpeg filters:")
 for i, part in enumerate(filter_parts):
     print(f"  {i+1}. {part[:80]}...")
+print(f"Filter graph: {len(filter_graph)} chars")
 
 print()
 print("Test completed successfully!")
@@ -8,11 +8,12 @@ from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
-try:
-    import customtkinter as ctk
-    from ui.grok_config_panel import GrokConfigPanel
+
+def print_config():
+    """Print the current Grok settings (Config only, no GUI imports)"""
     from settings.config import Config
     
     print("=" * 60)
@@ -24,7 +25,13 @@ try:
     print(f"Grok API Base: {Config.GROK_API_BASE}")
     print(f"Grok Model: {Config.GROK_MODEL}")
     print(f"Grok API Key: {'*' * 20 if Config.GROK_API_KEY else 'NOT SET'}")
-    print()
+    print(flush=True)
+
+
+def launch_gui():
+    """Open the Grok config panel in a test window"""
+    import customtkinter as ctk
+    from ui.grok_config_panel import GrokConfigPanel
     
     # Create test window
     root = ctk.CTk()
@@ -54,14 +61,25 @@ try:
     
     # Start the GUI
     root.mainloop()
+
+
+def main():
+    """Show the configuration first, then load the GUI toolkit and open the panel"""
+    try:
+        print_config()
+        launch_gui()
     
-except ImportError as e:
-    print(f"❌ Import Error: {e}")
-    print("Make sure all required packages are installed:")
-    print("  pip install customtkinter")
-    print("  pip install openai")
+    except ImportError as e:
+        print(f"❌ Import Error: {e}")
+        print("Make sure all required packages are installed:")
+        print("  pip install customtkinter")
+        print("  pip install openai")
     
-except Exception as e:
-    print(f"❌ Error: {e}")
-    import traceback
-    traceback.print_exc()
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,13 @@ This will help you see the quality differences between models.
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 def test_grok_models():
     """Test different Grok models with the same prompt"""
@@ -36,37 +38,38 @@ def test_grok_models():
         from utils.ai_providers import GrokProvider
         from settings.config import Config
         
-        original_model = Config.GROK_MODEL
-        print(f"Current model: {original_model}")
+        print(f"Current model: {Config.GROK_MODEL}")
         print()
         
-        results = {}
+        system_prompt = "You are a storyteller. Create engaging, pure storytelling content. Focus on narrative, characters, and emotions. Avoid adding facts, statistics, or educational content unless specifically requested."
         
-        for model in models_to_test:
-            print(f"Testing {model}...")
-            print("-" * 40)
-            
-            try:
-                # Temporarily change model
-                Config.GROK_MODEL = model
-                
-                # Generate story
-                system_prompt = "You are a storyteller. Create engaging, pure storytelling content. Focus on narrative, characters, and emotions. Avoid adding facts, statistics, or educational content unless specifically requested."
-                
-                response = GrokProvider.generate(system_prompt, test_prompt)
-                results[model] = response
-                
-                print(f"✅ {model} generated successfully")
-                print(f"Response length: {len(response)} characters")
-                print()
-                
-            except Exception as e:
-                print(f"❌ {model} failed: {e}")
-                results[model] = None
-                print()
+        # Replies are cached on disk, so re-running with the same prompt is
+        # instant; pass --no-cache to query the models again
+        use_cache = "--no-cache" not in sys.argv
         
-        # Restore original model
-        Config.GROK_MODEL = original_model
+        # All models at once; each call names its model, so Config is never changed
+        print(f"Testing {', '.join(models_to_test)} in parallel{'' if use_cache else ' (cache off)'}...")
+        print("-" * 40)
+        with ThreadPoolExecutor(max_workers=len(models_to_test)) as executor:
+            futures = {
+                model: executor.submit(GrokProvider.generate, system_prompt, test_prompt, model, use_cache)
+                for model in models_to_test
+            }
+            
+            results = {}
+            for model, future in futures.items():
+                try:
+                    response = future.result()
+                    results[model] = response
+                    
+                    print(f"✅ {model} generated successfully")
+                    print(f"Response length: {len(response)} characters")
+                    print()
+                    
+                except Exception as e:
+                    print(f"❌ {model} failed: {e}")
+                    results[model] = None
+                    print()
         
         # Show results comparison
         print("=" * 60)
@@ -7,7 +7,8 @@ from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 def test_piper_integration():
     """Test Piper TTS integration with the TTS manager"""
@@ -78,12 +79,16 @@ def test_configuration():
         model_path = getattr(Config, 'PIPER_MODEL_PATH', None)
         config_path = getattr(Config, 'PIPER_CONFIG_PATH', None)
         
-        if model_path and Path(model_path).exists():
+        # One directory listing covers both files
+        from utils.file_operations import files_exist
+        model_exists, config_exists = files_exist(model_path or "", config_path or "")
+        
+        if model_path and model_exists:
             print(f"[SUCCESS] Piper model file exists: {model_path}")
         else:
             print(f"[ERROR] Piper model file not found: {model_path}")
             
-        if config_path and Path(config_path).exists():
+        if config_path and config_exists:
             print(f"[SUCCESS] Piper config file exists: {config_path}")
         else:
             print(f"[ERROR] Piper config file not found: {config_path}")
@@ -4,13 +4,50 @@ This will download a voice model and test the quality.
 """
 
 import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import wave
 import os
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# Optional: tqdm progress bars for the model download (installed with transformers)
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+
+class _PrintProgress:
+    """Minimal stand-in for tqdm: one line per 10% downloaded"""
+    
+    def __init__(self, total=None, initial=0, desc="", **kwargs):
+        self.total = total
+        self.n = initial
+        self.desc = desc
+        self._next_pct = (initial * 100 // total // 10 + 1) * 10 if total else 10
+    
+    def update(self, n):
+        self.n += n
+        if self.total:
+            pct = self.n * 100 // self.total
+            if pct >= self._next_pct:
+                print(f"  {self.desc}: {pct}%")
+                self._next_pct = pct // 10 * 10 + 10
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_progress_bar = tqdm if TQDM_AVAILABLE else _PrintProgress
 
 def download_piper_model():
     """Download a high-quality Piper TTS voice model"""
@@ -44,38 +81,108 @@ def download_piper_model():
     print(f"Description: {model_info['description']}")
     print()
     
-    # Download model file
     model_path = models_dir / f"{selected_model}.onnx"
     config_path = models_dir / f"{selected_model}.onnx.json"
     
-    if not model_path.exists():
-        print("Downloading model file...")
-        try:
-            import urllib.request
-            urllib.request.urlretrieve(model_info["url"], model_path)
-            print(f"[SUCCESS] Model downloaded: {model_path}")
-        except Exception as e:
-            print(f"[ERROR] Failed to download model: {e}")
-            return None
-    else:
-        print(f"[SUCCESS] Model already exists: {model_path}")
-    
-    # Download config file
-    if not config_path.exists():
-        print("Downloading config file...")
-        try:
-            import urllib.request
-            urllib.request.urlretrieve(model_info["config"], config_path)
-            print(f"[SUCCESS] Config downloaded: {config_path}")
-        except Exception as e:
-            print(f"[ERROR] Failed to download config: {e}")
-            return None
-    else:
-        print(f"[SUCCESS] Config already exists: {config_path}")
+    # Model and config download together over one keep-alive session
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    etags_path = models_dir / ".etags.json"
+    try:
+        etags = json.loads(etags_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        etags = {}
+    
+    with requests.Session() as session:
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            downloaded = list(executor.map(
+                lambda job: _download_file(session, job[0], job[1], etags, position=job[2]),
+                [(model_info["url"], model_path, 0), (model_info["config"], config_path, 1)],
+            ))
+    
+    tmp_path = etags_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(etags, indent=2), encoding="utf-8")
+    os.replace(tmp_path, etags_path)
+    
+    if not all(downloaded):
+        return None
     
     return model_path, config_path
 
-def test_piper_tts(model_path, config_path):
+def _download_file(session, url, dest, etags, position=0):
+    """
+    Stream url to dest in 1 MiB chunks, with a progress bar at the given row.
+    
+    A file that exists is re-checked with If-None-Match when its ETag is
+    known (304 = unchanged, nothing transferred); an interrupted download
+    resumes from its .part file with a Range request guarded by If-Range,
+    so a file changed on the server since is fetched whole instead of
+    spliced onto the old bytes.
+    
+    Returns:
+        True if dest is present and current, False on failure
+    """
+    
+    from utils.file_operations import files_exist
+    
+    dest = Path(dest)
+    part = dest.with_name(dest.name + ".part")
+    part_etag_key = f"{url}#part"
+    dest_exists, part_exists = files_exist(dest, part)
+    headers = {}
+    if dest_exists:
+        if url not in etags:
+            print(f"[SUCCESS] Already exists: {dest}")
+            return True
+        headers["If-None-Match"] = etags[url]
+    elif part_exists and part_etag_key in etags:
+        headers["Range"] = f"bytes={part.stat().st_size}-"
+        headers["If-Range"] = etags[part_etag_key]
+    
+    try:
+        with session.get(url, headers=headers, stream=True, timeout=60) as response:
+            if response.status_code == 304:
+                print(f"[SUCCESS] Up to date: {dest}")
+                return True
+            if response.status_code == 416:
+                # The .part is not a prefix of the current file: start over
+                print(f"Partial download of {dest.name} is stale, restarting...")
+                part.unlink(missing_ok=True)
+                etags.pop(part_etag_key, None)
+                return _download_file(session, url, dest, etags, position)
+            response.raise_for_status()
+            if response.headers.get("ETag"):
+                # Validator for resuming this .part if the download is cut off
+                etags[part_etag_key] = response.headers["ETag"]
+            
+            # 206 = server honoured the Range header, so append
+            mode = "ab" if response.status_code == 206 else "wb"
+            print(f"Downloading {dest.name}{' (resuming)' if mode == 'ab' else ''}...")
+            response.raw.decode_content = True
+            done = part.stat().st_size if mode == "ab" else 0
+            remaining = int(response.headers.get("Content-Length", 0))
+            with open(part, mode) as f, _progress_bar(
+                total=done + remaining if remaining else None, initial=done,
+                desc=dest.name, unit="B", unit_scale=True, position=position, leave=True,
+            ) as bar:
+                for chunk in iter(lambda: response.raw.read(1 << 20), b""):
+                    f.write(chunk)
+                    bar.update(len(chunk))
+            os.replace(part, dest)
+            etags.pop(part_etag_key, None)
+            
+            if response.headers.get("ETag"):
+                etags[url] = response.headers["ETag"]
+            print(f"[SUCCESS] Downloaded: {dest}")
+            return True
+            
+    except Exception as e:
+        print(f"[ERROR] Failed to download {dest.name}: {e}")
+        return False
+
+def test_piper_tts(model_path, config_path, output_name="test_piper_output.wav"):
     """Test Piper TTS with the downloaded model"""
     
     print("\n" + "=" * 60)
@@ -83,11 +190,13 @@ def test_piper_tts(model_path, config_path):
     print("=" * 60)
     
     try:
-        from piper import PiperVoice
+        from utils.tts_manager import load_piper_voice
         
+        # Reruns load the optimized graph saved next to the model
         print("Loading Piper voice model...")
-        voice = PiperVoice.load(model_path, config_path, use_cuda=False)
-        print("[SUCCESS] Voice model loaded successfully!")
+        start = time.perf_counter_ns()
+        voice = load_piper_voice(model_path, config_path, use_cuda=False)
+        print(f"[SUCCESS] Voice model loaded successfully! ({(time.perf_counter_ns() - start) / 1e9:.2f}s)")
         
         # Test text (your typical YouTube Shorts script)
         test_text = """Meet Jimmy, a lively six-year-old who loves playing with his toys. 
@@ -98,12 +207,14 @@ def test_piper_tts(model_path, config_path):
         print(f"Text: {test_text[:50]}...")
         
         # Save as WAV file
-        output_path = Path("temp_files/test_piper_output.wav")
+        output_path = Path("temp_files") / output_name
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Generate audio directly to WAV file
-        with wave.open(str(output_path), "wb") as wav_file:
-            voice.synthesize_wav(test_text, wav_file)
+        # Sentences are synthesized in parallel and joined into one WAV
+        from utils.tts_manager import synthesize_piper_wav
+        start = time.perf_counter_ns()
+        duration = synthesize_piper_wav(voice, test_text, output_path)
+        print(f"[INFO] Synthesis time: {(time.perf_counter_ns() - start) / 1e9:.2f}s")
         
         print(f"[SUCCESS] Audio generated and saved: {output_path}")
         
@@ -111,11 +222,7 @@ def test_piper_tts(model_path, config_path):
         file_size = output_path.stat().st_size / 1024  # KB
         print(f"[INFO] File size: {file_size:.1f} KB")
         
-        # Get duration from WAV file
-        with wave.open(str(output_path), "rb") as wav_file:
-            frames = wav_file.getnframes()
-            sample_rate = wav_file.getframerate()
-            duration = frames / sample_rate
+        # Duration comes from the synthesized samples (no second WAV read)
         print(f"[INFO] Duration: {duration:.1f} seconds")
         
         print("\n[QUALITY TEST]")
@@ -142,8 +249,20 @@ def main():
     
     model_path, config_path = model_files
     
-    # Test TTS
+    # Test TTS (FP32 reference)
     audio_file = test_piper_tts(model_path, config_path)
+    
+    # Int8 copy for comparison; FP32 stays in use if it cannot be built or run
+    from utils.tts_manager import quantized_piper_model
+    int8_path = quantized_piper_model(model_path)
+    if audio_file and int8_path:
+        print(f"\nTesting int8 model: {int8_path}")
+        int8_audio = test_piper_tts(int8_path, config_path, "test_piper_output_int8.wav")
+        if int8_audio:
+            print(f"Int8 test audio saved at: {int8_audio}")
+            print("Compare it with the FP32 audio; set PIPER_INT8 = True in settings/config.py if it sounds the same")
+        else:
+            print("[INFO] Int8 model failed; keeping the FP32 model")
     if audio_file:
         print(f"\n[SUCCESS] Piper TTS is ready to use!")
         print(f"Test audio saved at: {audio_file}")
@@ -10,9 +10,10 @@ from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
-from helpers.sd_webui_api import SDWebUIAPI
+from helpers.sd_webui_api import get_webui_api
 from settings.config import Config
 
 
@@ -23,7 +24,9 @@ def test_connection():
     print("=" * 70)
     
     try:
-        api = SDWebUIAPI(
+        # Same process-wide client (and keep-alive session) that step 3
+        # picks up in the full workflow test
+        api = get_webui_api(
             host=Config.SD_WEBUI_HOST,
             timeout=Config.SD_WEBUI_TIMEOUT
         )
@@ -85,12 +88,13 @@ def test_generation(api):
         steps=Config.SD_INFERENCE_STEPS,
         cfg_scale=Config.SD_GUIDANCE_SCALE,
         sampler=Config.SD_WEBUI_SAMPLER,
+        use_cache=False,  # Always exercise the WebUI itself
     )
     
     if image:
         # Save test image
         output_path = Path("test_webui_generation.png")
-        image.save(output_path)
+        image.save(output_path, compress_level=1)  # Inspection copy; fast zlib level
         print(f"✓ Image generated successfully!")
         print(f"✓ Saved to: {output_path}")
         print(f"  Size: {image.size[0]}x{image.size[1]} pixels")
@@ -118,6 +122,7 @@ def test_full_workflow():
     
     print("\nGenerating backgrounds for 3 test scenes...")
     print("This will use the settings from config.py")
+    print("(Set SD_WEBUI_IMAGE_CACHE = True to reuse these images on re-runs)")
     print()
     
     image_paths = generate_ai_backgrounds(test_scenes, duration_per_scene=3.0)
@@ -149,6 +154,10 @@ def main():
     # Test 2: Info
     test_info(api)
     
+    # Checkpoint load happens here, not inside the timed generation below
+    api.warmup()
+    print()
+    
     # Test 3: Single generation
     success = test_generation(api)
     if not success:
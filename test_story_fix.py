@@ -2,12 +2,28 @@
 Test script to verify that story generation no longer includes unwanted facts.
 """
 
+import re
 import sys
 from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# Facts/educational markers a pure story should not contain
+UNWANTED_PHRASES = [
+    "did you know",
+    "research shows",
+    "studies indicate",
+    "brain development",
+    "75%",
+    "learning",
+    "educational",
+    "facts",
+    "statistics",
+]
+_UNWANTED_RE = re.compile("|".join(map(re.escape, UNWANTED_PHRASES)), re.IGNORECASE)
 
 def test_story_generation():
     """Test story generation to ensure no facts are included"""
@@ -38,23 +54,9 @@ def test_story_generation():
             print("-" * 40)
             print()
             
-            # Check for unwanted content
-            unwanted_phrases = [
-                "did you know",
-                "research shows", 
-                "studies indicate",
-                "brain development",
-                "75%",
-                "learning",
-                "educational",
-                "facts",
-                "statistics"
-            ]
-            
-            found_unwanted = []
-            for phrase in unwanted_phrases:
-                if phrase.lower() in script.lower():
-                    found_unwanted.append(phrase)
+            # Check for unwanted content (one case-insensitive pass)
+            found = {match.group(0).lower() for match in _UNWANTED_RE.finditer(script)}
+            found_unwanted = [phrase for phrase in UNWANTED_PHRASES if phrase in found]
             
             if found_unwanted:
                 print("❌ PROBLEM: Found unwanted content:")
@@ -7,7 +7,8 @@ from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 def test_voice_synthesis_ui():
     """Test the voice synthesis UI with Piper TTS integration"""
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the AI prompt optimizer's request batching.
+"""
+
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from helpers.ai_prompt_optimizer import AIPromptOptimizer, SemanticPromptCache
+
+
+class TestPromptOptimizerDedup(unittest.TestCase):
+    """Repeated scenes are sent to the AI once."""
+
+    def setUp(self):
+        # No disk or semantic cache, so every scene is a miss
+        for target in ("_get_prompt_cache", "_get_semantic_cache"):
+            patcher = patch(f"helpers.ai_prompt_optimizer.{target}", return_value=None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.optimizer = AIPromptOptimizer()
+        self.optimizer.context_aware = True
+        patcher = patch.object(
+            self.optimizer, "_analyze_narrative_context",
+            return_value=self.optimizer._get_default_narrative_analysis(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_prompt_optimizer_dedup(self):
+        """Scenes repeated in the same role share one optimization."""
+        script_data = {"title": "Ocean Facts", "script": "The ocean...", "topic": "ocean"}
+        # Middle scenes of five: indexes 1 and 2 are both "build"
+        scenes = ["Opening shot", "Ocean waves at sunset", "Ocean waves at sunset",
+                  "Deep sea creatures", "Final shot"]
+
+        def fake_batch(batch, narrative_analysis, video_title):
+            return [(f"opt {desc} ({role})", "neg") for desc, role in batch]
+
+        with patch.object(self.optimizer, "_optimize_scene_batch", side_effect=fake_batch) as batch:
+            results = self.optimizer.optimize_prompts_with_context(scenes, script_data)
+
+        self.assertEqual(batch.call_count, 1)
+        sent = batch.call_args[0][0]
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[1], results[2])
+        self.assertEqual(results[1][0], "opt Ocean waves at sunset (build)")
+
+
+
+class TestSemanticPromptCacheLazyModel(unittest.TestCase):
+    """The embedding model is only loaded when there is something to search or store."""
+
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        model = MagicMock()
+        model.get_sentence_embedding_dimension.return_value = 2
+        model.encode.side_effect = lambda texts, normalize_embeddings: np.tile([1.0, 0.0], (len(texts), 1))
+        patcher = patch("helpers.ai_prompt_optimizer.SentenceTransformer", return_value=model, create=True)
+        self.model_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("helpers.ai_prompt_optimizer.FAISS_AVAILABLE", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lookup_on_empty_cache_skips_model(self):
+        """A lookup with no cached prompts never builds the model."""
+        cache = SemanticPromptCache(self.cache_dir, "model", 0.9)
+        self.assertIsNone(cache.lookup("Ocean waves", "build", "ctx", "groq/model"))
+        self.model_class.assert_not_called()
+
+    def test_store_then_lookup(self):
+        """Storing loads the model once; a later cache instance finds the entry."""
+        cache = SemanticPromptCache(self.cache_dir, "model", 0.9)
+        cache.add_many([("Ocean waves", "build")], "ctx", "groq/model", [("opt", "neg")])
+        self.assertEqual(self.model_class.call_count, 1)
+
+        reloaded = SemanticPromptCache(self.cache_dir, "model", 0.9)
+        self.assertEqual(reloaded.lookup("Ocean waves", "build", "ctx", "groq/model"), ("opt", "neg"))
+
+
+if __name__ == "__main__":
+    unittest.main()
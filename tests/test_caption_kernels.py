@@ -0,0 +1,164 @@
+"""
+Unit tests for the step 4 caption kernels.
+
+Checks that the vectorised word timings, phrase timings, ASS timestamps
+and Dialogue lines match the original per-word and per-phrase loops
+exactly, on both the NumPy fallback and the Numba kernel.
+"""
+
+import numpy as np
+import pytest
+
+from steps import _caption_kernels
+from steps._caption_kernels import build_phrase_times, format_ass_timestamps, word_bounds
+from steps.step4_add_captions import _iter_dialogue_lines, _words_to_array
+
+
+def _loop_word_bounds(word_count, total_duration):
+    """The original per-word timing loop, kept as the reference."""
+    time_per_word = total_duration / word_count
+    starts, ends = [], []
+    current_time = 0
+    for i in range(word_count):
+        starts.append(round(current_time, 2))
+        if i == word_count - 1:
+            ends.append(round(total_duration, 2))
+        else:
+            ends.append(round(current_time + time_per_word, 2))
+        current_time += time_per_word
+    return starts, ends
+
+
+def _loop_sec_to_ass_ts(sec):
+    """The original per-timestamp ASS formatter, kept as the reference."""
+    if sec < 0:
+        sec = 0.0
+    total_cs = int(round(sec * 100))
+    cs = total_cs % 100
+    total_s = total_cs // 100
+    s = total_s % 60
+    total_m = total_s // 60
+    m = total_m % 60
+    h = total_m // 60
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _loop_phrases(word_timestamps, words_per_phrase):
+    """The original per-phrase loop: (start, end, [\\kf centiseconds]) per phrase."""
+    phrases = []
+    for i in range(0, len(word_timestamps), words_per_phrase):
+        phrase = word_timestamps[i : i + words_per_phrase]
+        start = max(0.0, float(phrase[0]["start"]))
+        end = max(start, float(phrase[-1]["end"]))
+        kf = [int(round(max(0.08, float(w["end"]) - float(w["start"])) * 100)) for w in phrase]
+        phrases.append((start, end, kf))
+    return phrases
+
+
+def _loop_dialogue_lines(word_timestamps, words_per_phrase):
+    """The original create_shorts_captions Dialogue lines, kept as the reference."""
+    lines = []
+    for i in range(0, len(word_timestamps), words_per_phrase):
+        phrase = word_timestamps[i : i + words_per_phrase]
+        start = max(0.0, float(phrase[0]["start"]))
+        end = max(start, float(phrase[-1]["end"]))
+        parts = []
+        for w in phrase:
+            dur = max(0.08, float(w["end"]) - float(w["start"]))  # minimum 80 ms per word
+            cs = int(round(dur * 100))
+            word_text = str(w["word"]).replace("{", "(").replace("}", ")")
+            parts.append(f"{{\\kf{cs}}}{word_text}")
+        text_payload = " ".join(parts)
+        start_ts = _loop_sec_to_ass_ts(start)
+        end_ts = _loop_sec_to_ass_ts(end)
+        lines.append(f"Dialogue: 0,{start_ts},{end_ts},StyleKaraoke,,0,0,0,,{{\\an2}}{text_payload}")
+    return lines
+
+
+def _random_words(count, seed):
+    """Word timings with short, overlapping, negative and reversed spans mixed in."""
+    rng = np.random.default_rng(seed)
+    vocabulary = ["ocean", "waves", "{deep}", "straße", "naïve", "sea", "42", "glow"]
+    words = []
+    current = -0.05  # First word starts before zero: phrase starts clamp to 0
+    for i in range(count):
+        start = current
+        end = start + float(rng.uniform(-0.05, 0.6))  # Some spans are under 80 ms or reversed
+        words.append({"word": vocabulary[i % len(vocabulary)], "start": start, "end": end})
+        current += float(rng.uniform(0.0, 0.5))
+    return words
+
+
+@pytest.fixture(params=["numpy", "numba"])
+def kernel(request, monkeypatch):
+    """Run build_phrase_times on the NumPy fallback, then on the Numba kernel."""
+    if request.param == "numba":
+        pytest.importorskip("numba")
+    else:
+        monkeypatch.setattr(_caption_kernels, "NUMBA_AVAILABLE", False)
+    return request.param
+
+
+class TestBuildPhraseTimes:
+    """Test phrase bounds and karaoke fill times."""
+
+    @pytest.mark.parametrize("words_per_phrase", [1, 2, 3, 5])
+    @pytest.mark.parametrize("count", [1, 7, 30, 301])
+    def test_matches_loop(self, kernel, count, words_per_phrase):
+        """Phrase starts, ends and \\kf centiseconds equal the per-phrase loop."""
+        words = _random_words(count, seed=count * 10 + words_per_phrase)
+        array = _words_to_array(words)
+        starts, ends, kf_cs = build_phrase_times(array["start"], array["end"], words_per_phrase)
+
+        expected = _loop_phrases(words, words_per_phrase)
+        assert starts.tolist() == [start for start, _, _ in expected]
+        assert ends.tolist() == [end for _, end, _ in expected]
+        assert kf_cs.tolist() == [cs for _, _, kf in expected for cs in kf]
+
+
+class TestFormatAssTimestamps:
+    """Test vectorised ASS timestamp formatting."""
+
+    def test_matches_loop(self):
+        """Negatives, half-centiseconds and hour rollovers format like the loop."""
+        seconds = np.array([-1.0, 0.0, 0.005, 0.015, 0.125, 6.775, 59.995, 61.5,
+                            3599.994, 3599.995, 3600.0, 36000.01])
+        seconds = np.concatenate([seconds, np.random.default_rng(3).uniform(-5, 4000, 500)])
+        assert format_ass_timestamps(seconds) == [_loop_sec_to_ass_ts(x) for x in seconds.tolist()]
+
+
+class TestDialogueLines:
+    """Test the generated ASS Dialogue lines against the original per-phrase loop."""
+
+    @pytest.mark.parametrize("words_per_phrase", [1, 3, 4])
+    @pytest.mark.parametrize("count", [1, 10, 1000])
+    def test_matches_loop(self, kernel, count, words_per_phrase):
+        """Byte-identical lines, including the threaded path for long scripts."""
+        words = _random_words(count, seed=count + words_per_phrase)
+        lines = b"".join(_iter_dialogue_lines(_words_to_array(words), words_per_phrase))
+        assert lines.decode("utf-8").splitlines() == _loop_dialogue_lines(words, words_per_phrase)
+
+
+class TestWordBounds:
+    """Test evenly spaced word timings."""
+
+    def test_matches_loop_where_numpy_rounding_differs(self):
+        """n=96 over 54.2 s hits a value np.round puts on the other side."""
+        starts, ends = word_bounds(96, 54.2)
+        expected_starts, expected_ends = _loop_word_bounds(96, 54.2)
+        assert starts.tolist() == expected_starts
+        assert ends.tolist() == expected_ends
+
+    @pytest.mark.parametrize("word_count", [1, 2, 7, 13, 40, 96, 150])
+    @pytest.mark.parametrize("total_duration", [0.5, 9.99, 30.0, 54.2, 59.87])
+    def test_matches_loop(self, word_count, total_duration):
+        """Rounded starts and ends equal the loop for a spread of inputs."""
+        starts, ends = word_bounds(word_count, total_duration)
+        expected_starts, expected_ends = _loop_word_bounds(word_count, total_duration)
+        assert starts.tolist() == expected_starts
+        assert ends.tolist() == expected_ends
+
+    def test_last_word_ends_at_duration(self):
+        """The last word ends exactly at the narration length."""
+        _, ends = word_bounds(13, 27.345)
+        assert ends[-1] == round(27.345, 2)
@@ -0,0 +1,27 @@
+"""
+Unit tests for file operation utilities.
+"""
+
+from utils.file_operations import files_exist
+
+
+class TestFilesExist:
+    """Test batched file existence checks."""
+
+    def test_mixed_paths(self, tmp_path):
+        """Test existing, missing and directory paths in one call."""
+        (tmp_path / "voice.onnx").write_bytes(b"")
+        (tmp_path / "voice.onnx.json").write_text("{}")
+        (tmp_path / "subdir").mkdir()
+
+        result = files_exist(
+            tmp_path / "voice.onnx",
+            str(tmp_path / "voice.onnx.json"),
+            tmp_path / "voice.onnx.part",
+            tmp_path / "subdir",
+        )
+        assert result == [True, True, False, False]
+
+    def test_missing_directory(self, tmp_path):
+        """Test paths whose folder does not exist."""
+        assert files_exist(tmp_path / "missing" / "voice.onnx") == [False]
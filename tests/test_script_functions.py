@@ -9,7 +9,8 @@ from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 from steps.step1_write_script import estimate_script_duration, generate_word_timestamps
 
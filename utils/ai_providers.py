@@ -6,9 +6,10 @@ Supports multiple AI providers with automatic fallback:
 - Ollama (local, free, offline)
 """
 
+import json
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import requests
 
@@ -18,23 +19,65 @@ sys.path.insert(0, str(project_root))
 
 from settings.config import Config
 
+if TYPE_CHECKING:
+    from utils.performance_optimizer import DiskCache
+
 
 class AIProviderError(Exception):
     """Base exception for AI provider errors"""
     pass
 
 
+_grok_cache: Optional["DiskCache"] = None
+
+
+def _get_grok_cache() -> Optional["DiskCache"]:
+    """Disk cache of Grok replies under CACHE_DIR/grok (None when caching is off)"""
+    global _grok_cache
+    if not getattr(Config, 'ENABLE_CACHING', True):
+        return None
+    if _grok_cache is None:
+        # Imported on first use: performance_optimizer sets up its own caches at import
+        from utils.performance_optimizer import DiskCache
+        try:
+            _grok_cache = DiskCache(Path(Config.CACHE_DIR) / "grok")
+        except OSError:
+            return None
+    return _grok_cache
+
+
+def _user_message(user_prompt: str, images: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Chat user message; base64 PNG images are attached as image_url content parts"""
+    if not images:
+        return {"role": "user", "content": user_prompt}
+    return {
+        "role": "user",
+        "content": [{"type": "text", "text": user_prompt}] + [
+            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image}"}}
+            for image in images
+        ],
+    }
+
+
 class GrokProvider:
     """Grok AI Provider (xAI) - Internet-Connected, Smart"""
     
     @staticmethod
-    def generate(system_prompt: str, user_prompt: str) -> str:
+    def generate(
+        system_prompt: str, user_prompt: str, model: Optional[str] = None, use_cache: bool = False,
+        images: Optional[List[str]] = None
+    ) -> str:
         """
         Generate text using Grok API (xAI) via OpenAI-compatible client.
         
         Args:
             system_prompt: System instructions for the AI
             user_prompt: User's actual prompt
+            model: Grok model to use instead of Config.GROK_MODEL
+            use_cache: Return the stored reply to an identical earlier request
+                (same prompts, model, temperature and token limit) and store
+                new ones. Off by default: regenerating should give a new story
+            images: Base64 PNG images to send with the user prompt (vision models)
             
         Returns:
             Generated text response
@@ -45,6 +88,20 @@ class GrokProvider:
         if not Config.GROK_API_KEY:
             raise AIProviderError("GROK_API_KEY not configured. Get one at https://x.ai")
         
+        model = model or Config.GROK_MODEL
+        cache = _get_grok_cache() if use_cache else None
+        if cache is not None:
+            cache_key = json.dumps(
+                {"system": system_prompt, "user": user_prompt, "model": model,
+                 "temperature": Config.GROK_TEMPERATURE, "max_tokens": Config.GROK_MAX_TOKENS,
+                 **({"images": images} if images else {})},
+                sort_keys=True,
+            )
+            if cache.is_valid(cache_key):
+                cached = cache.get(cache_key)
+                if cached:
+                    return cached
+        
         try:
             from openai import OpenAI
         except ImportError:
@@ -58,32 +115,37 @@ class GrokProvider:
             )
             
             response = client.chat.completions.create(
-                model=Config.GROK_MODEL,
+                model=model,
                 messages=[
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
+                    _user_message(user_prompt, images)
                 ],
                 temperature=Config.GROK_TEMPERATURE,
                 max_tokens=Config.GROK_MAX_TOKENS
             )
             
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
             
         except Exception as e:
             raise AIProviderError(f"Grok generation failed: {str(e)}")
+        
+        if cache is not None and content:
+            cache.put(cache_key, content, ttl=getattr(Config, 'GROK_CACHE_TTL', 7 * 24 * 3600))
+        return content
 
 
 class GroqProvider:
     """Groq AI Provider - Free, Fast, Internet-Connected"""
     
     @staticmethod
-    def generate(system_prompt: str, user_prompt: str) -> str:
+    def generate(system_prompt: str, user_prompt: str, images: Optional[List[str]] = None) -> str:
         """
         Generate text using Groq API.
         
         Args:
             system_prompt: System instructions for the AI
             user_prompt: User's actual prompt
+            images: Base64 PNG images to send with the user prompt (vision models)
             
         Returns:
             Generated text response
@@ -103,7 +165,7 @@ class GroqProvider:
                 model=Config.GROQ_MODEL,
                 messages=[
                     {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
+                    _user_message(user_prompt, images)
                 ],
                 temperature=Config.GROQ_TEMPERATURE,
                 max_tokens=Config.GROQ_MAX_TOKENS
@@ -172,7 +234,9 @@ class OllamaProvider:
             raise AIProviderError(f"Ollama generation failed: {e}")
 
 
-def generate_with_ai(system_prompt: str, user_prompt: str, logger=None) -> str:
+def generate_with_ai(
+    system_prompt: str, user_prompt: str, logger=None, images: Optional[List[str]] = None
+) -> str:
     """
     Generate text using configured AI provider with automatic fallback.
     
@@ -180,6 +244,8 @@ def generate_with_ai(system_prompt: str, user_prompt: str, logger=None) -> str:
         system_prompt: System instructions for the AI
         user_prompt: User's actual prompt
         logger: Optional logger instance for status messages
+        images: Base64 PNG images to send as image content parts; the
+            configured models must accept vision input
         
     Returns:
         Generated text response
@@ -210,7 +276,7 @@ def generate_with_ai(system_prompt: str, user_prompt: str, logger=None) -> str:
             if logger:
                 logger.info(f"Attempting generation with {provider_name}...")
             
-            result = provider_class.generate(system_prompt, user_prompt)
+            result = provider_class.generate(system_prompt, user_prompt, images=images)
             
             if result and len(result.strip()) > 0:
                 if logger:
@@ -422,6 +422,33 @@ def get_safe_filename(filename: str, max_length: int = 100) -> str:
     return safe_name
 
 
+def files_exist(*paths: Union[str, Path]) -> List[bool]:
+    """
+    Check several files with one directory listing per parent folder.
+    
+    Cheaper than a stat() per path when checking sibling files (a voice
+    model and its config, a download and its .part file).
+    
+    Args:
+        *paths: Files to look for
+        
+    Returns:
+        One bool per path, True if it exists and is a regular file
+    """
+    listings: Dict[str, set] = {}
+    results = []
+    for path in map(Path, paths):
+        parent = str(path.parent)
+        if parent not in listings:
+            try:
+                with os.scandir(parent) as entries:
+                    listings[parent] = {os.path.normcase(e.name) for e in entries if e.is_file()}
+            except OSError:
+                listings[parent] = set()
+        results.append(os.path.normcase(path.name) in listings[parent])
+    return results
+
+
 def get_file_size_mb(file_path: Union[str, Path]) -> float:
     """
     Get file size in megabytes.
@@ -16,6 +16,27 @@ try:
 except ImportError:
     HAS_JSON5 = False
 
+# Optional: orjson parses the common well-formed case several times faster.
+# Its JSONDecodeError subclasses json.JSONDecodeError, so every fallback
+# below still catches it
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+_loads = orjson.loads if HAS_ORJSON else json.loads
+
+# Compiled once; the fallbacks run on every malformed LLM reply
+_BRACE_RE = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x1f\x7f-\x9f]")
+_KEY_VALUE_PATTERNS = [
+    re.compile(r'"([^"]+)":\s*"([^"]*)"'),  # String values
+    re.compile(r'"([^"]+)":\s*(\d+(?:\.\d+)?)'),  # Numeric values
+    re.compile(r'"([^"]+)":\s*(true|false|null)'),  # Boolean/null values
+    re.compile(r'"([^"]+)":\s*(\[[^\]]*\])'),  # Array values
+]
+
 
 def extract_json_from_response(text: str) -> Dict[str, Any]:
     """
@@ -33,7 +54,7 @@ def extract_json_from_response(text: str) -> Dict[str, Any]:
 
     # Strategy 1: Try direct JSON parsing
     try:
-        return json.loads(text.strip())
+        return _loads(text.strip())
     except json.JSONDecodeError:
         pass
 
@@ -45,10 +66,10 @@ def extract_json_from_response(text: str) -> Dict[str, Any]:
             pass
 
     # Strategy 3: Find JSON object with balanced braces using regex
-    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', text, re.DOTALL)
+    json_match = _BRACE_RE.search(text)
     if json_match:
         try:
-            return json.loads(json_match.group())
+            return _loads(json_match.group())
         except json.JSONDecodeError:
             pass
 
@@ -64,7 +85,7 @@ def extract_json_from_response(text: str) -> Dict[str, Any]:
     if start_idx >= 0 and end_idx > start_idx:
         try:
             candidate = text[start_idx:end_idx]
-            return json.loads(candidate)
+            return _loads(candidate)
         except json.JSONDecodeError:
             pass
 
@@ -72,7 +93,7 @@ def extract_json_from_response(text: str) -> Dict[str, Any]:
     cleaned = clean_json_text(text)
     if cleaned != text:
         try:
-            return json.loads(cleaned)
+            return _loads(cleaned)
         except json.JSONDecodeError:
             pass
 
@@ -90,7 +111,7 @@ def clean_json_text(text: str) -> str:
         Cleaned text
     """
     # Remove control characters
-    text = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", text)
+    text = _CONTROL_CHARS_RE.sub("", text)
 
     # Remove markdown code blocks
     if "```json" in text:
@@ -138,15 +159,8 @@ def extract_key_value_pairs(text: str) -> Optional[Dict[str, Any]]:
     result = {}
 
     # Look for patterns like "key": "value" or "key": value
-    patterns = [
-        r'"([^"]+)":\s*"([^"]*)"',  # String values
-        r'"([^"]+)":\s*(\d+(?:\.\d+)?)',  # Numeric values
-        r'"([^"]+)":\s*(true|false|null)',  # Boolean/null values
-        r'"([^"]+)":\s*(\[[^\]]*\])',  # Array values
-    ]
-
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
+    for pattern in _KEY_VALUE_PATTERNS:
+        matches = pattern.findall(text)
         for key, value in matches:
             try:
                 # Try to parse the value
@@ -24,7 +24,9 @@ class PromptManager:
         else:
             self.prompts_dir = Path(prompts_dir)
 
-        self._prompts_cache: Dict[str, str] = {}
+        self._prompts_cache: Dict[str, Template] = {}
+        # Templates rendered without variables, which most prompts are
+        self._rendered_cache: Dict[str, str] = {}
 
     def get_prompt(self, prompt_name: str, **kwargs) -> str:
         """Get a prompt template and format it with provided variables.
@@ -36,16 +38,26 @@ class PromptManager:
         Returns:
             Formatted prompt string
         """
+        if not kwargs and prompt_name in self._rendered_cache:
+            return self._rendered_cache[prompt_name]
+
+        template = self._load_template(prompt_name)
+        prompt = template.safe_substitute(**kwargs)
+        if not kwargs:
+            self._rendered_cache[prompt_name] = prompt
+        return prompt
+
+    def _load_template(self, prompt_name: str) -> Template:
+        """Read a prompt file once and keep its parsed Template."""
         if prompt_name not in self._prompts_cache:
             prompt_path = self.prompts_dir / f"{prompt_name}.txt"
             if not prompt_path.exists():
                 raise FileNotFoundError(f"Prompt template not found: {prompt_path}")
 
             with open(prompt_path, 'r', encoding='utf-8') as f:
-                self._prompts_cache[prompt_name] = f.read().strip()
+                self._prompts_cache[prompt_name] = Template(f.read().strip())
 
-        template = Template(self._prompts_cache[prompt_name])
-        return template.safe_substitute(**kwargs)
+        return self._prompts_cache[prompt_name]
     
     def get_available_prompts(self) -> list:
         """Get list of available prompt templates."""
@@ -135,6 +147,7 @@ class PromptManager:
     def clear_cache(self):
         """Clear the prompt cache to force reloading from disk."""
         self._prompts_cache.clear()
+        self._rendered_cache.clear()
 
 
 # Global prompt manager instance
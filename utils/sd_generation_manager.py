@@ -5,12 +5,16 @@ Unified interface for generating AI backgrounds using both WebUI API and diffuse
 Eliminates code duplication and provides consistent functionality across both methods.
 """
 
+import hashlib
 import os
+import shutil
 import time
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple, Union
 import torch
+import torch.nn.functional as F
 
 from settings.config import Config
 from utils.gpu_manager import get_gpu_manager, gpu_memory_context, check_gpu_compatibility, reset_gpu_state
@@ -21,7 +25,7 @@ logger = logging.getLogger(__name__)
 
 # Import WebUI API helper
 try:
-    from helpers.sd_webui_api import SDWebUIAPI
+    from helpers.sd_webui_api import SDWebUIAPI, get_webui_api
     WEBUI_AVAILABLE = True
 except ImportError:
     WEBUI_AVAILABLE = False
@@ -31,7 +35,9 @@ except ImportError:
 try:
     from helpers.ai_prompt_optimizer import optimize_prompts_with_ai
     from helpers.controlnet_processor import process_control_images
-    from helpers.image_quality_analyzer import analyze_image_quality, generate_refinement_prompt
+    from helpers.image_quality_analyzer import (
+        analyze_image_quality, analyze_image_quality_batch, generate_refinement_prompt
+    )
     AI_ENHANCEMENTS_AVAILABLE = True
 except ImportError:
     AI_ENHANCEMENTS_AVAILABLE = False
@@ -43,6 +49,161 @@ class SDGenerationError(Exception):
     pass
 
 
+# PNG encoding is CPU-bound and releases the GIL in zlib, so saves run here
+# while the next scene is refined and upscaled
+_SAVE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="png_save")
+
+# Reusable page-locked host buffers for decoded frames, keyed by (H, W, C)
+_PINNED_FRAMES: Dict[Tuple[int, ...], torch.Tensor] = {}
+
+
+def _pinned_frame_buffer(shape: Tuple[int, ...]) -> torch.Tensor:
+    """Return a pinned uint8 host tensor of the given shape, allocated once per shape."""
+    buffer = _PINNED_FRAMES.get(shape)
+    if buffer is None:
+        buffer = torch.empty(shape, dtype=torch.uint8, pin_memory=True)
+        _PINNED_FRAMES[shape] = buffer
+    return buffer
+
+
+def load_sd_pipeline(device: str):
+    """
+    Load the configured Stable Diffusion pipeline onto a device.
+
+    Applies the UNet quantization selected by Config.SD_QUANT:
+    - "fp16": plain half-precision weights (default)
+    - "int8" / "nf4": bitsandbytes weight quantization of the UNet
+    - "fp8": torchao float8 weight-only quantization (SM 8.9+ only)
+
+    On GPUs with bf16 support (Ampere+) the half-precision weights are loaded
+    as bfloat16 instead of float16: same memory and tensor-core throughput,
+    but with fp32's exponent range, so the SDXL UNet/VAE no longer need fp32
+    upcasts to avoid overflow (black/NaN images).
+
+    Falls back to unquantized weights when the quantization backend is unavailable.
+
+    Args:
+        device: Target device ("cuda" or "cpu")
+
+    Returns:
+        Loaded DiffusionPipeline
+    """
+    from diffusers import DiffusionPipeline
+
+    quant = str(getattr(Config, 'SD_QUANT', 'fp16')).lower()
+    use_bf16 = device == "cuda" and torch.cuda.is_bf16_supported()
+    load_kwargs = {
+        "torch_dtype": torch.bfloat16 if use_bf16 else torch.float16,
+        "use_safetensors": True,
+        # Half-size fp16 files either way; bf16 casts from them at load time
+        "variant": "fp16" if device == "cuda" else None,
+    }
+    dtype_name = "bf16" if use_bf16 else "fp16"
+    logger.info(f"Loading Stable Diffusion weights as {dtype_name}")
+
+    if quant in ("int8", "nf4"):
+        try:
+            from diffusers import BitsAndBytesConfig, UNet2DConditionModel
+
+            if quant == "int8":
+                quant_config = BitsAndBytesConfig(load_in_8bit=True)
+            else:
+                quant_config = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=load_kwargs["torch_dtype"],
+                )
+
+            load_kwargs["unet"] = UNet2DConditionModel.from_pretrained(
+                Config.STABLE_DIFFUSION_MODEL,
+                subfolder="unet",
+                quantization_config=quant_config,
+                **load_kwargs,
+            )
+            logger.info(f"Loaded UNet with bitsandbytes {quant} weights")
+        except ImportError as e:
+            logger.warning(f"SD_QUANT={quant} requires bitsandbytes ({e}), using {dtype_name}")
+
+    pipe = DiffusionPipeline.from_pretrained(
+        Config.STABLE_DIFFUSION_MODEL,
+        **load_kwargs,
+    ).to(device)
+
+    if quant == "fp8":
+        # W8A16 FP8 kernels only exist on Ada/Hopper (SM 8.9+)
+        if device == "cuda" and torch.cuda.get_device_capability() >= (8, 9):
+            try:
+                from torchao.quantization import quantize_, float8_weight_only
+
+                quantize_(pipe.unet, float8_weight_only())
+                logger.info("Quantized UNet weights to fp8")
+            except ImportError as e:
+                logger.warning(f"SD_QUANT=fp8 requires torchao ({e}), using {dtype_name}")
+        else:
+            logger.warning(f"SD_QUANT=fp8 needs an SM 8.9+ GPU, using {dtype_name}")
+
+    return pipe
+
+
+def _decode_latents_to_video_size(pipe: Any, latents: torch.Tensor) -> Any:
+    """
+    Decode SDXL latents and resize to the video resolution on the GPU.
+    
+    Replaces the CPU LANCZOS resize of the decoded PIL image: the VAE decodes
+    once at its native size and F.interpolate scales the pixel tensor to
+    VIDEO_WIDTH x VIDEO_HEIGHT before a single uint8 copy back to the host.
+    
+    Args:
+        pipe: Loaded SDXL DiffusionPipeline
+        latents: Latents returned by pipe(..., output_type="latent")
+        
+    Returns:
+        PIL Image at VIDEO_WIDTH x VIDEO_HEIGHT
+    """
+    from PIL import Image as PILImage
+    
+    vae = pipe.vae
+    # SDXL's VAE overflows in fp16; decode in fp32 when the model asks for it
+    needs_upcast = vae.dtype == torch.float16 and getattr(vae.config, "force_upcast", False)
+    
+    with torch.no_grad():
+        if needs_upcast:
+            vae.to(torch.float32)
+        try:
+            latents = latents.to(device=vae.device, dtype=vae.dtype)
+            decoded = vae.decode(latents / vae.config.scaling_factor, return_dict=False)[0]
+        finally:
+            if needs_upcast:
+                vae.to(torch.float16)
+        
+        target_size = (Config.VIDEO_HEIGHT, Config.VIDEO_WIDTH)
+        if tuple(decoded.shape[-2:]) != target_size:
+            decoded = F.interpolate(
+                decoded.float(),
+                size=target_size,
+                mode="bicubic",
+                align_corners=False,
+                antialias=True,
+            )
+        
+        pixels = ((decoded / 2 + 0.5).clamp(0, 1) * 255).round().to(torch.uint8)
+        frame = pixels[0].permute(1, 2, 0)
+        
+        if frame.is_cuda:
+            # DMA straight into a reused pinned buffer instead of a fresh
+            # pageable allocation + staging copy every scene
+            host = _pinned_frame_buffer(tuple(frame.shape))
+            host.copy_(frame, non_blocking=True)
+            torch.cuda.current_stream().synchronize()
+            array = host.numpy()
+        else:
+            array = frame.numpy()
+    
+    # fromarray copies RGB data into PIL's own storage, so the pinned buffer
+    # is free to be reused for the next scene
+    return PILImage.fromarray(array)
+
+
 class SDGenerationManager:
     """
     Unified manager for Stable Diffusion generation using both WebUI and diffusers.
@@ -64,6 +225,8 @@ class SDGenerationManager:
         self.resource_manager = get_resource_manager()
         self._webui_api = None
         self._diffusers_pipe = None
+        self._diffusers_device = None
+        self._text_encoders_offloaded = False
         self._gpu_resource = None
         
         logger.info(f"SD Generation Manager initialized: method={self.method}, enhancements={self.use_enhancements}")
@@ -79,7 +242,7 @@ class SDGenerationManager:
         if self._webui_api is None:
             if not WEBUI_AVAILABLE:
                 raise SDGenerationError("WebUI API not available")
-            self._webui_api = SDWebUIAPI(
+            self._webui_api = get_webui_api(
                 host=Config.SD_WEBUI_HOST,
                 timeout=Config.SD_WEBUI_TIMEOUT
             )
@@ -100,13 +263,10 @@ class SDGenerationManager:
             logger.info(f"Loading SDXL model: {Config.STABLE_DIFFUSION_MODEL}")
             
             with gpu_memory_context():
-                self._diffusers_pipe = DiffusionPipeline.from_pretrained(
-                    Config.STABLE_DIFFUSION_MODEL,
-                    torch_dtype=torch.float16,
-                    use_safetensors=True,
-                    variant="fp16" if device == "cuda" else None,
-                ).to(device)
-                
+                self._diffusers_pipe = load_sd_pipeline(device)
+                self._diffusers_device = device
+                self._text_encoders_offloaded = False
+
                 # Enable memory optimizations
                 if Config.SD_ATTENTION_SLICING:
                     self._diffusers_pipe.enable_attention_slicing(1)
@@ -155,22 +315,23 @@ class SDGenerationManager:
         scene_desc: str, 
         script_data: Optional[Dict] = None,
         scene_index: int = 0,
-        generation_method: str = "webui"
+        generation_method: str = "webui",
+        quality_analysis: Optional[Dict] = None
     ) -> Any:
-        """Analyze image quality and refine if needed."""
+        """Analyze image quality and refine if needed (quality_analysis: result of a batched analysis)."""
         if not self.use_enhancements:
             return image
         
-        logger.info(f"🔍 Quality Analysis: Evaluating generated image...")
-        
         try:
-            quality_analysis = analyze_image_quality(
-                image=image,
-                original_prompt=prompt,
-                scene_description=scene_desc,
-                script_context=script_data,
-                scene_index=scene_index
-            )
+            if quality_analysis is None:
+                logger.info(f"🔍 Quality Analysis: Evaluating generated image...")
+                quality_analysis = analyze_image_quality(
+                    image=image,
+                    original_prompt=prompt,
+                    scene_description=scene_desc,
+                    script_context=script_data,
+                    scene_index=scene_index
+                )
             
             if quality_analysis.get('meets_threshold', True):
                 logger.info(f"✅ Image meets quality threshold ({quality_analysis.get('overall_score', 0):.1f}/10)")
@@ -236,37 +397,112 @@ class SDGenerationManager:
             logger.error(f"WebUI generation failed: {e}")
             return None
     
-    def _generate_diffusers_image(self, prompt: str, negative_prompt: str) -> Optional[Any]:
-        """Generate image using diffusers pipeline."""
+    def _encode_prompts(self, prompts: List[str], negative_prompts: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Encode diffusers prompts in one text-encoder pass.
+        
+        SDXL runs both CLIP text encoders on every pipe(prompt=...) call. Encoding
+        all scenes up front runs them once, and the encoders are then parked on
+        the CPU so the UNet loop has their ~2 GB of VRAM.
+        
+        Returns:
+            pipe() embedding kwargs per prompt, or None when the pipeline has no
+            SDXL-style encode_prompt (callers pass prompt strings instead)
+        """
+        pipe = self._get_diffusers_pipe()
+        if not hasattr(pipe, "encode_prompt") or getattr(pipe, "text_encoder_2", None) is None:
+            return None
+        
+        device = self._diffusers_device
+        try:
+            if self._text_encoders_offloaded:
+                pipe.text_encoder.to(device)
+                pipe.text_encoder_2.to(device)
+                self._text_encoders_offloaded = False
+            
+            with torch.no_grad():
+                (
+                    prompt_embeds,
+                    negative_prompt_embeds,
+                    pooled_prompt_embeds,
+                    negative_pooled_prompt_embeds,
+                ) = pipe.encode_prompt(
+                    prompt=prompts,
+                    negative_prompt=negative_prompts,
+                    device=device,
+                    num_images_per_prompt=1,
+                    do_classifier_free_guidance=True,
+                )
+        except Exception as e:
+            logger.warning(f"Prompt encoding failed: {e}, passing prompt strings")
+            return None
+        
+        if device == "cuda":
+            pipe.text_encoder.to("cpu")
+            pipe.text_encoder_2.to("cpu")
+            self._text_encoders_offloaded = True
+            torch.cuda.empty_cache()
+        
+        return [
+            {
+                "prompt_embeds": prompt_embeds[i : i + 1],
+                "negative_prompt_embeds": negative_prompt_embeds[i : i + 1],
+                "pooled_prompt_embeds": pooled_prompt_embeds[i : i + 1],
+                "negative_pooled_prompt_embeds": negative_pooled_prompt_embeds[i : i + 1],
+            }
+            for i in range(len(prompts))
+        ]
+    
+    def _generate_diffusers_image(
+        self,
+        prompt: str,
+        negative_prompt: str,
+        seed: Optional[int] = None,
+        prompt_embeds: Optional[Dict[str, Any]] = None
+    ) -> Optional[Any]:
+        """
+        Generate image using diffusers pipeline.
+        
+        seed fixes the generator (random when None); prompt_embeds is this prompt's
+        entry from _encode_prompts, encoded here when not supplied.
+        """
         try:
             pipe = self._get_diffusers_pipe()
             
+            if prompt_embeds is None:
+                encoded = self._encode_prompts([prompt], [negative_prompt])
+                prompt_embeds = encoded[0] if encoded else None
+            prompt_kwargs = prompt_embeds or {"prompt": prompt, "negative_prompt": negative_prompt}
+            
             # Clear GPU memory before generation
             if torch.cuda.is_available():
                 torch.cuda.empty_cache()
                 torch.cuda.ipc_collect()
             
-            # Generate image
+            generator = None
+            if seed is not None:
+                generator = torch.Generator(device=self._diffusers_device).manual_seed(seed)
+            
+            # Generate image, kept in latent space so decode + resize run on the GPU
             result = pipe(
-                prompt,
+                **prompt_kwargs,
                 height=Config.SD_GENERATION_HEIGHT,
                 width=Config.SD_GENERATION_WIDTH,
                 num_inference_steps=Config.SD_INFERENCE_STEPS,
                 guidance_scale=Config.SD_GUIDANCE_SCALE,
-                negative_prompt=negative_prompt,
+                generator=generator,
+                output_type="latent",
             )
             
-            return result.images[0] if result.images else None
+            return _decode_latents_to_video_size(pipe, result.images)
             
         except Exception as e:
             logger.error(f"Diffusers generation failed: {e}")
             return None
     
     def _upscale_image(self, image: Any) -> Any:
-        """Upscale image to final resolution if needed."""
-        if (Config.SD_GENERATION_WIDTH != Config.VIDEO_WIDTH or 
-            Config.SD_GENERATION_HEIGHT != Config.VIDEO_HEIGHT):
-            
+        """Upscale image to final resolution if needed (diffusers images already arrive at it)."""
+        if image.size != (Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT):
             from PIL import Image as PILImage
             image = image.resize(
                 (Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), 
@@ -276,12 +512,51 @@ class SDGenerationManager:
         
         return image
     
-    def _save_image(self, image: Any, index: int, temp_dir: Path) -> str:
-        """Save image to disk and return path."""
+    def _scene_cache_path(self, prompt: str, negative_prompt: str) -> Optional[Path]:
+        """
+        Location of a diffusers scene in the render cache, or None when it is not cached.
+        
+        The file name is a blake2b digest of everything that determines the final
+        image, so a hit is exactly what generating the scene again would produce.
+        WebUI scenes are cached by the WebUI client itself (SD_WEBUI_IMAGE_CACHE).
+        """
+        if self.method != "diffusers" or not getattr(Config, 'ENABLE_CACHING', True):
+            return None
+        
+        digest = hashlib.blake2b(digest_size=8)
+        for part in (
+            prompt, negative_prompt, Config.STABLE_DIFFUSION_MODEL, getattr(Config, 'SD_QUANT', 'fp16'),
+            Config.SD_GENERATION_WIDTH, Config.SD_GENERATION_HEIGHT, Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT,
+            Config.SD_INFERENCE_STEPS, Config.SD_GUIDANCE_SCALE, self.use_enhancements,
+        ):
+            digest.update(repr(part).encode("utf-8"))
+            digest.update(b"\0")
+        
+        cache_dir = Path(Config.CACHE_DIR) / "sdxl"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        return cache_dir / f"{digest.hexdigest()}.png"
+    
+    def _store_in_cache(self, image_path: str, cache_path: Path) -> None:
+        """Copy a saved scene into the render cache via a temp file, so a crash never leaves a truncated hit."""
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            shutil.copyfile(image_path, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write render cache entry {cache_path.name}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+    
+    def _save_image(self, image: Any, index: int, temp_dir: Path) -> Tuple[Future, Path]:
+        """
+        Queue the image's PNG save on the background pool; returns (future, path).
+        
+        Uses zlib level 1: these are temp files read back by the clip renderer,
+        and level 1 encodes several times faster than the default for a
+        slightly larger file.
+        """
         image_path = temp_dir / f"ai_background_{index}.png"
-        image.save(image_path)
-        logger.info(f"✓ Saved: {image_path.name}")
-        return str(image_path)
+        return _SAVE_POOL.submit(image.save, image_path, compress_level=1), image_path
     
     def generate_backgrounds(
         self, 
@@ -311,24 +586,44 @@ class SDGenerationManager:
         # Optimize prompts
         optimized_prompts = self._optimize_prompts(optimized_scenes, script_data)
         
+        # Unpack prompt data
+        scene_prompts = []  # (prompt, negative prompt) per scene
+        for prompt_data in optimized_prompts:
+            if isinstance(prompt_data, tuple) and len(prompt_data) == 2:
+                scene_prompts.append(prompt_data)
+            else:
+                scene_prompts.append((prompt_data, "blurry, low quality, distorted, ugly, bad composition, horizontal"))
+        
         # Prepare output
-        image_paths = []
+        scene_paths = {}  # scene index -> saved image path
+        cache_paths = {}  # scene index -> render cache entry to fill
+        pending_saves = []  # (scene index, Future, image path) PNG writes on _SAVE_POOL
         temp_dir = Path(Config.TEMP_DIR)
         temp_dir.mkdir(parents=True, exist_ok=True)
         
         previous_image = None  # For ControlNet continuity
+        generated = []  # (scene index, description, prompt, image) before refinement
         
         try:
-            for i, (scene_desc, prompt_data) in enumerate(zip(optimized_scenes, optimized_prompts)):
+            # Encode every prompt that still has to be generated in one text-encoder pass
+            prompt_embeds = {}  # scene index -> pipe() embedding kwargs
+            if self.method == "diffusers":
+                uncached = []
+                for i, (prompt, negative_prompt) in enumerate(scene_prompts):
+                    cache_path = self._scene_cache_path(prompt, negative_prompt)
+                    if cache_path is None or not cache_path.exists():
+                        uncached.append(i)
+                if uncached:
+                    encoded = self._encode_prompts(
+                        [scene_prompts[i][0] for i in uncached],
+                        [scene_prompts[i][1] for i in uncached]
+                    )
+                    if encoded is not None:
+                        prompt_embeds = dict(zip(uncached, encoded))
+            
+            for i, (scene_desc, (prompt, negative_prompt)) in enumerate(zip(optimized_scenes, scene_prompts)):
                 logger.info(f"[Scene {i+1}/{len(optimized_scenes)}]")
                 
-                # Unpack prompt data
-                if isinstance(prompt_data, tuple) and len(prompt_data) == 2:
-                    prompt, negative_prompt = prompt_data
-                else:
-                    prompt = prompt_data
-                    negative_prompt = "blurry, low quality, distorted, ugly, bad composition, horizontal"
-                
                 # Process ControlNet if available
                 controlnet_data = None
                 if (self.use_enhancements and 
@@ -341,33 +636,75 @@ class SDGenerationManager:
                         previous_image=previous_image
                     )
                 
+                # Reuse the image from an earlier run with identical settings
+                cache_path = self._scene_cache_path(prompt, negative_prompt)
+                if cache_path is not None and cache_path.exists():
+                    image_path = temp_dir / f"ai_background_{i}.png"
+                    shutil.copyfile(cache_path, image_path)
+                    scene_paths[i] = str(image_path)
+                    logger.info(f"✓ Reused cached background {cache_path.stem} (skipped generation)")
+                    continue
+                
                 # Generate image
                 if self.method == "webui":
                     image = self._generate_webui_image(prompt, negative_prompt, controlnet_data)
+                elif cache_path is not None:
+                    # Seed from the cache key so the entry is what these settings generate
+                    cache_paths[i] = cache_path
+                    image = self._generate_diffusers_image(
+                        prompt, negative_prompt, seed=int(cache_path.stem, 16) % (2**63), prompt_embeds=prompt_embeds.get(i)
+                    )
                 else:
-                    image = self._generate_diffusers_image(prompt, negative_prompt)
+                    image = self._generate_diffusers_image(prompt, negative_prompt, prompt_embeds=prompt_embeds.get(i))
                 
                 if not image:
                     logger.error(f"✗ Failed to generate scene {i+1}")
                     continue
                 
-                # Analyze and refine if needed
-                image = self._analyze_and_refine_image(
-                    image, prompt, scene_desc, script_data, i, self.method
-                )
-                
-                # Upscale and save
-                image = self._upscale_image(image)
-                image_path = self._save_image(image, i, temp_dir)
-                image_paths.append(image_path)
+                generated.append((i, scene_desc, prompt, image))
                 
                 # Store for ControlNet continuity
                 previous_image = image
                 
                 # Cleanup
-                del image
                 if torch.cuda.is_available():
                     torch.cuda.empty_cache()
+            
+            # One batched quality analysis for all scenes, then refine the failures
+            analyses = [None] * len(generated)
+            if self.use_enhancements and generated:
+                logger.info(f"🔍 Quality Analysis: Evaluating {len(generated)} generated images...")
+                try:
+                    analyses = analyze_image_quality_batch(
+                        [image for _, _, _, image in generated],
+                        [prompt for _, _, prompt, _ in generated],
+                        [scene_desc for _, scene_desc, _, _ in generated],
+                        script_data
+                    )
+                except Exception as e:
+                    logger.warning(f"Batched quality analysis failed: {e}, analyzing scenes one at a time")
+            
+            for (i, scene_desc, prompt, image), quality_analysis in zip(generated, analyses):
+                image = self._analyze_and_refine_image(
+                    image, prompt, scene_desc, script_data, i, self.method, quality_analysis
+                )
+                
+                # Upscale and save (encoded in the background)
+                image = self._upscale_image(image)
+                pending_saves.append((i, *self._save_image(image, i, temp_dir)))
+            
+            for i, future, image_path in pending_saves:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to save {image_path.name}, skipping this scene: {e}")
+                    continue
+                logger.info(f"✓ Saved: {image_path.name}")
+                scene_paths[i] = str(image_path)
+                if i in cache_paths:
+                    self._store_in_cache(str(image_path), cache_paths[i])
+            
+            image_paths = [scene_paths[i] for i in sorted(scene_paths)]
         
         except Exception as e:
             logger.error(f"Generation failed: {e}")
@@ -6,12 +6,14 @@ and proper async handling for Edge TTS and gTTS fallback.
 """
 
 import asyncio
+import json
 import logging
 import tempfile
 import threading
 import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union
 import sys
 
 # Add project root to path
@@ -34,6 +36,8 @@ except ImportError:
     gTTS = None
     AudioSegment = None
 
+import numpy as np
+
 try:
     from piper import PiperVoice
     PIPER_TTS_AVAILABLE = True
@@ -42,12 +46,181 @@ except ImportError:
     PiperVoice = None
 
 from settings.config import Config
+from utils.file_operations import files_exist
 from utils.performance_optimizer import performance_optimizer
 from utils.resource_manager import ManagedResource, get_resource_manager
 
 logger = logging.getLogger(__name__)
 
 
+def quantized_piper_model(model_path: Union[str, Path]) -> Optional[Path]:
+    """
+    Dynamic int8 copy of a Piper ONNX voice (MatMul/Gemm weights), built once.
+    
+    About 4x smaller and faster on CPUs with int8 dot-product support;
+    rebuilt when the FP32 model is newer. Config stays the FP32 .onnx.json.
+    
+    Returns:
+        Path to <name>.int8.onnx, or None if onnxruntime's quantizer is unavailable
+    """
+    model_path = Path(model_path)
+    int8_path = model_path.with_suffix(".int8.onnx")
+    if int8_path.exists() and int8_path.stat().st_mtime >= model_path.stat().st_mtime:
+        return int8_path
+    
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        logger.warning("onnxruntime quantization not available; using the FP32 Piper model")
+        return None
+    
+    try:
+        logger.info(f"Quantizing Piper model to int8: {int8_path.name}")
+        quantize_dynamic(
+            str(model_path), str(int8_path),
+            weight_type=QuantType.QInt8,
+            op_types_to_quantize=["MatMul", "Gemm"],
+        )
+        return int8_path
+    except Exception as e:
+        logger.warning(f"Piper int8 quantization failed: {e}")
+        int8_path.unlink(missing_ok=True)
+        return None
+
+
+# Loaded voices, shared by every TTSManager in the process
+_piper_voices: Dict[tuple, Any] = {}
+_piper_voices_lock = threading.Lock()
+
+
+def _optimized_piper_session(model_path: Path) -> Any:
+    """
+    CPU ONNX session for a Piper model that skips graph optimization after the first run.
+    
+    The first load optimizes as usual and saves the result next to the
+    model as <name>.opt.onnx; later loads read that file with optimization
+    off. It is rebuilt when the model is newer.
+    """
+    import onnxruntime
+    
+    opt_path = model_path.with_suffix(".opt.onnx")
+    options = onnxruntime.SessionOptions()
+    if opt_path.exists() and opt_path.stat().st_mtime >= model_path.stat().st_mtime:
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        source = opt_path
+    else:
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.optimized_model_filepath = str(opt_path)
+        source = model_path
+    return onnxruntime.InferenceSession(
+        str(source), sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+
+def load_piper_voice(model_path: Union[str, Path], config_path: Union[str, Path], use_cuda: bool = False) -> Any:
+    """
+    PiperVoice for a model, loaded once per process.
+    
+    CPU voices are built on _optimized_piper_session, so a fresh process
+    also avoids the ONNX graph optimization cost; CUDA voices and Piper
+    builds whose PiperVoice cannot be constructed directly use
+    PiperVoice.load.
+    
+    Args:
+        model_path: Piper .onnx model
+        config_path: Matching .onnx.json config
+        use_cuda: Run on the CUDA execution provider
+    
+    Returns:
+        Loaded PiperVoice (shared; do not modify)
+    """
+    model_path = Path(model_path)
+    key = (str(model_path), model_path.stat().st_mtime_ns, str(config_path), use_cuda)
+    with _piper_voices_lock:
+        voice = _piper_voices.get(key)
+        if voice is None:
+            voice = _build_piper_voice(model_path, Path(config_path), use_cuda)
+            _piper_voices[key] = voice
+    return voice
+
+
+def _build_piper_voice(model_path: Path, config_path: Path, use_cuda: bool) -> Any:
+    """Load a PiperVoice, from the cached optimized graph when on CPU"""
+    if not use_cuda:
+        try:
+            from piper.config import PiperConfig
+            
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = PiperConfig.from_dict(json.load(f))
+            return PiperVoice(session=_optimized_piper_session(model_path), config=config)
+        except Exception as e:
+            logger.warning(f"Optimized Piper load failed, using PiperVoice.load: {e}")
+            model_path.with_suffix(".opt.onnx").unlink(missing_ok=True)
+    return PiperVoice.load(model_path, config_path, use_cuda=use_cuda)
+
+
+def synthesize_piper_wav(
+    voice: Any, text: str, output_path: Union[str, Path], workers: int = 4, syn_config: Any = None
+) -> float:
+    """
+    Write Piper speech for text to a 16-bit mono WAV, one sentence per thread.
+    
+    Phonemization (espeak, not thread-safe) runs serially; the per-sentence
+    ONNX inference, which releases the GIL, runs on a thread pool and the
+    PCM is joined in order before one WAV write. Each sentence gets the same
+    peak normalization and volume that PiperVoice.synthesize applies. Piper
+    builds without the phoneme-level API fall back to a single
+    synthesize_wav call.
+    
+    Args:
+        voice: Loaded PiperVoice
+        text: Text to speak
+        output_path: WAV file to write
+        workers: Sentences synthesized at once
+        syn_config: Piper SynthesisConfig (Piper's defaults when None)
+    
+    Returns:
+        Duration of the written audio in seconds (no need to reopen the file)
+    """
+    if not all(hasattr(voice, name) for name in ("phonemize", "phonemes_to_ids", "phoneme_ids_to_audio")):
+        with wave.open(str(output_path), "wb") as wav_file:
+            if syn_config is None:
+                voice.synthesize_wav(text, wav_file)
+            else:
+                voice.synthesize_wav(text, wav_file, syn_config=syn_config)
+            return wav_file.getnframes() / wav_file.getframerate()
+    
+    if syn_config is None:
+        try:
+            from piper import SynthesisConfig
+            syn_config = SynthesisConfig()
+        except ImportError:
+            pass
+    
+    def sentence_audio(phoneme_ids: List[int]) -> np.ndarray:
+        audio = voice.phoneme_ids_to_audio(phoneme_ids, syn_config)
+        if getattr(syn_config, "normalize_audio", True):
+            peak = np.max(np.abs(audio)) if audio.size else 0.0
+            audio = np.zeros_like(audio) if peak < 1e-8 else audio / peak
+        volume = getattr(syn_config, "volume", 1.0)
+        if volume != 1.0:
+            audio = audio * volume
+        return np.clip(audio, -1.0, 1.0)
+    
+    sentence_ids = [voice.phonemes_to_ids(phonemes) for phonemes in voice.phonemize(text)]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sentence_ids)))) as pool:
+        audio = list(pool.map(sentence_audio, sentence_ids))
+    
+    pcm = np.concatenate(audio) if audio else np.zeros(0, dtype=np.float32)
+    pcm = (pcm * 32767).astype(np.int16)
+    with wave.open(str(output_path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(voice.config.sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return len(pcm) / voice.config.sample_rate
+
+
 class TTSError(Exception):
     """Base exception for TTS operations"""
     pass
@@ -195,21 +368,27 @@ class TTSManager(ManagedResource):
                 return False
             
             # Check if model files exist
-            if not Path(model_path).exists() or not Path(config_path).exists():
+            if not all(files_exist(model_path, config_path)):
                 logger.error(f"Piper TTS model files not found: {model_path}, {config_path}")
                 return False
             
+            # int8 weights only help the CPU provider
+            if getattr(Config, 'PIPER_INT8', False) and not use_cuda:
+                model_path = quantized_piper_model(model_path) or model_path
+            
             # Load Piper voice model
             logger.info("Loading Piper TTS model...")
-            voice = PiperVoice.load(model_path, config_path, use_cuda=use_cuda)
+            voice = load_piper_voice(model_path, config_path, use_cuda=use_cuda)
             
             # Clean text for TTS
             cleaned_text = self._clean_text(text)
             
             # Generate audio directly to WAV file
             logger.info(f"Generating speech with Piper TTS: {len(cleaned_text)} characters")
-            with wave.open(str(output_path), "wb") as wav_file:
-                voice.synthesize_wav(cleaned_text, wav_file)
+            synthesize_piper_wav(
+                voice, cleaned_text, output_path,
+                workers=getattr(Config, 'PIPER_SYNTHESIS_WORKERS', 4)
+            )
             
             logger.info(f"Piper TTS generated audio: {output_path}")
             return True
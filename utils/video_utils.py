@@ -5,10 +5,17 @@ Provides comprehensive FFmpeg command building, video operations,
 and hardware acceleration support for YouTube Shorts generation.
 """
 
+import json
 import logging
+import os
 import subprocess
+import threading
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union, Tuple
+from tempfile import NamedTemporaryFile
+from typing import Callable, List, Dict, Any, Optional, Union, Tuple
+from xml.sax.saxutils import escape
 import sys
 
 # Add project root to path
@@ -25,6 +32,493 @@ class VideoProcessingError(Exception):
     pass
 
 
+# Single-pass escape tables for text and paths embedded in filter graphs.
+# drawtext text='...' is unescaped three times: by the filtergraph parser
+# (inside the quotes everything is literal, so ' closes, escapes, reopens),
+# by the option parser (\ escapes, : separates), and by drawtext's own
+# %{...} expansion (\ escapes % and \). [ ] , ; are inert inside the quotes.
+_DRAWTEXT_ESCAPE = str.maketrans({
+    "\\": "\\\\\\\\",
+    "%": "\\\\\\%",
+    ":": "\\:",
+    "'": "\\'\\''",
+})
+_FILTER_PATH_ESCAPE = str.maketrans({"\\": "/", ":": "\\:"})
+
+
+def escape_drawtext(text: str) -> str:
+    """Escape text for a drawtext text='...' option"""
+    return text.translate(_DRAWTEXT_ESCAPE)
+
+
+def filter_path(path: Union[str, Path]) -> str:
+    """
+    Format a path for a filter option (subtitles=, fontsdir=)
+    
+    Forward slashes, and the drive-letter colon (D:/...) escaped so it is
+    not read as a filter option separator.
+    """
+    return str(Path(path)).translate(_FILTER_PATH_ESCAPE)
+
+
+@lru_cache(maxsize=8)
+def scale_pad_fragment(width: int, height: int, cuda: bool = False,
+                       gpu_frames: bool = False) -> str:
+    """
+    Filter chain that letterboxes any input into a width x height frame
+    
+    Args:
+        width: Frame width
+        height: Frame height
+        cuda: Scale and pad on the GPU (scale_cuda/pad_cuda); frames are
+            downloaded again afterwards, so the chain still yields CPU
+            frames for concat, subtitles and drawtext
+        gpu_frames: The input already arrives as CUDA frames (decoded with
+            cuda_decode_args), so the upload step is skipped
+        
+    Returns:
+        scale/pad/setsar chain without input or output labels
+    """
+    if cuda:
+        upload = "" if gpu_frames else "format=nv12,hwupload_cuda,"
+        return (
+            f"{upload}"
+            f"scale_cuda=w={width}:h={height}:force_original_aspect_ratio=decrease,"
+            f"pad_cuda={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
+            f"hwdownload,format=nv12,setsar=1"
+        )
+    return (
+        f"scale=w={width}:h={height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
+        f"setsar=1"
+    )
+
+
+# Dark blue-gray fill used when there is no clip to show
+BACKGROUND_COLOR_HEX = "%02x%02x%02x" % (30, 30, 40)
+
+
+@lru_cache(maxsize=4)
+def background_png(color_hex: str = BACKGROUND_COLOR_HEX) -> Optional[str]:
+    """
+    Cached 1x1 PNG of a solid color, for use as a looped image input
+    
+    Upscaling a single pixel is a fill, so FFmpeg decodes one tiny frame
+    instead of running a full-size lavfi color source for every frame.
+    
+    Args:
+        color_hex: Color as rrggbb
+        
+    Returns:
+        Path to the PNG, or None if it cannot be created (callers fall back
+        to a lavfi color input)
+    """
+    try:
+        from PIL import Image
+        
+        png_path = Path(Config.CACHE_DIR) / f"bg_{color_hex}.png"
+        if not png_path.exists():
+            png_path.parent.mkdir(parents=True, exist_ok=True)
+            Image.new("RGB", (1, 1), f"#{color_hex}").save(png_path, optimize=True)
+        return str(png_path)
+    except (ImportError, AttributeError, OSError, ValueError) as e:
+        logger.debug(f"Background PNG unavailable: {e}")
+        return None
+
+
+def background_fill_fragment(width: int, height: int) -> str:
+    """
+    Filter chain that stretches a solid-color input to width x height
+    
+    No aspect-preserving letterbox: padding a 1x1 image would leave black
+    bars around the fill.
+    """
+    return f"scale={width}:{height}:flags=neighbor,setsar=1"
+
+
+@lru_cache(maxsize=32)
+def watermark_xy(position: str, width: int, height: int, margin: int = 20) -> str:
+    """
+    drawtext x/y expressions for a corner position
+    
+    The frame size is folded in as constants, so FFmpeg only evaluates the
+    text width/height (tw/th) terms.
+    
+    Args:
+        position: "top-right", "top-left", "bottom-right" or "bottom-left"
+        width: Frame width
+        height: Frame height
+        margin: Distance from the frame edges in pixels
+        
+    Returns:
+        "x=...:y=..." fragment (top-right for unknown positions)
+    """
+    vertical, _, horizontal = position.partition("-")
+    x = f"{margin}" if horizontal == "left" else f"{width - margin}-tw"
+    y = f"{height - margin}-th" if vertical == "bottom" else f"{margin}"
+    return f"x={x}:y={y}"
+
+
+@lru_cache(maxsize=32)
+def watermark_drawtext(text: str, position: str, font_size: int, opacity: float) -> str:
+    """
+    Complete drawtext filter for the watermark
+    
+    Args:
+        text: Watermark text (escaped here)
+        position: Corner position, see watermark_xy
+        font_size: Font size in pixels
+        opacity: Text alpha (0-1)
+        
+    Returns:
+        drawtext filter without input or output labels
+    """
+    escaped_text = escape_drawtext(text)
+    pos_xy = watermark_xy(position, Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT)
+    return (
+        f"drawtext=text='{escaped_text}':"
+        f"fontcolor=white:fontsize={font_size}:"
+        f"{pos_xy}:alpha={opacity}"
+    )
+
+
+# System font locations for the fontconfig file below; WINDOWSFONTDIR is
+# fontconfig's own placeholder for %WINDIR%\Fonts
+_SYSTEM_FONT_DIRS = {
+    "nt": ["WINDOWSFONTDIR"],
+    "darwin": ["/System/Library/Fonts", "/Library/Fonts", "~/Library/Fonts"],
+    "posix": ["/usr/share/fonts", "/usr/local/share/fonts", "~/.fonts"],
+}
+
+# Existing system and user fontconfig files, included so their aliases and
+# rules still apply (missing ones are skipped by fontconfig)
+_SYSTEM_FONT_CONFS = {
+    "nt": [],
+    "darwin": ["/usr/local/etc/fonts/fonts.conf", "/opt/homebrew/etc/fonts/fonts.conf",
+               "~/.config/fontconfig/fonts.conf"],
+    "posix": ["/etc/fonts/fonts.conf", "~/.config/fontconfig/fonts.conf"],
+}
+
+
+@lru_cache(maxsize=1)
+def ffmpeg_env() -> Dict[str, str]:
+    """
+    Environment for FFmpeg runs that render text (subtitles, drawtext)
+    
+    libass and drawtext resolve fonts through fontconfig, which rescans every
+    font directory on each FFmpeg start unless it has a writable cache (the
+    default on Windows builds). Point it at a fonts.conf with a persistent
+    cache under Config.CACHE_DIR so the scan happens once, not per render.
+    
+    Returns:
+        Copy of os.environ with FONTCONFIG_FILE set (left as is when the
+        environment already sets one)
+    """
+    env = dict(os.environ)
+    if env.get("FONTCONFIG_FILE"):
+        return env
+    try:
+        cache_dir = Path(Config.CACHE_DIR) / "fontconfig"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except (AttributeError, OSError) as e:
+        logger.debug(f"Fontconfig cache unavailable: {e}")
+        return env
+    
+    platform_key = "darwin" if sys.platform == "darwin" else os.name
+    font_dirs = [str(project_root / "fonts"), *_SYSTEM_FONT_DIRS.get(platform_key, [])]
+    dirs_xml = "".join(f"  <dir>{escape(font_dir)}</dir>\n" for font_dir in font_dirs)
+    includes_xml = "".join(
+        f'  <include ignore_missing="yes">{escape(conf_file)}</include>\n'
+        for conf_file in _SYSTEM_FONT_CONFS.get(platform_key, [])
+    )
+    # The cache comes before the includes so it is the first cachedir listed
+    conf = (
+        '<?xml version="1.0"?>\n'
+        '<!DOCTYPE fontconfig SYSTEM "fonts.dtd">\n'
+        "<fontconfig>\n"
+        f"{dirs_xml}"
+        f"  <cachedir>{escape(str(cache_dir))}</cachedir>\n"
+        f"{includes_xml}"
+        "</fontconfig>\n"
+    )
+    conf_path = cache_dir / "fonts.conf"
+    try:
+        current = conf_path.read_text(encoding="utf-8") if conf_path.exists() else None
+        if current != conf:
+            # Renders in other processes may be reading the file right now
+            tmp_path = conf_path.with_name(f"fonts.conf.{os.getpid()}.tmp")
+            tmp_path.write_text(conf, encoding="utf-8")
+            os.replace(tmp_path, conf_path)
+    except OSError as e:
+        logger.debug(f"Fontconfig file unavailable: {e}")
+        return env
+    
+    env["FONTCONFIG_FILE"] = str(conf_path)
+    return env
+
+
+# ASS numpad alignment and margins for each watermark corner
+_WATERMARK_ASS_ALIGNMENT = {
+    "top-left": 7,
+    "top-right": 9,
+    "bottom-left": 1,
+    "bottom-right": 3,
+}
+_ASS_TEXT_ESCAPE = str.maketrans("{}", "()")
+
+
+def ass_with_watermark(ass_path: Union[str, Path], text: str,
+                       position: str = "top-right", font_size: int = 16,
+                       opacity: float = 0.6, margin: int = 20) -> str:
+    """
+    Copy an ASS file with the watermark added as one more event
+    
+    libass then draws captions and watermark in a single subtitles pass,
+    instead of subtitles followed by a separate drawtext pass over every
+    frame. The source file is left untouched.
+    
+    Args:
+        ass_path: Caption ASS file (step 4 output)
+        text: Watermark text
+        position: Corner, as for watermark_xy
+        font_size: Font size in pixels
+        opacity: Text alpha (0-1)
+        margin: Distance from the frame edges in pixels
+        
+    Returns:
+        Path to the merged ASS file in Config.TEMP_DIR
+    """
+    lines = Path(ass_path).read_text(encoding="utf-8").splitlines()
+    alignment = _WATERMARK_ASS_ALIGNMENT.get(position, 9)
+    # ASS alpha is inverted: 00 opaque, FF transparent
+    alpha = round((1.0 - max(0.0, min(1.0, opacity))) * 255)
+    style = (
+        f"Style: Watermark,Arial,{font_size},&H{alpha:02X}FFFFFF,&H{alpha:02X}FFFFFF,"
+        f"&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,0,0,{alignment},"
+        f"{margin},{margin},{margin},1"
+    )
+    event = f"Dialogue: 1,0:00:00.00,9:59:59.99,Watermark,,0,0,0,,{text.translate(_ASS_TEXT_ESCAPE)}"
+    
+    # Style goes at the end of the styles section, before the blank line
+    # that precedes [Events]; the event goes at the end of the file
+    events_at = next(
+        (i for i, line in enumerate(lines) if line.strip() == "[Events]"), len(lines)
+    )
+    style_at = events_at
+    while style_at > 0 and not lines[style_at - 1].strip():
+        style_at -= 1
+    lines[style_at:style_at] = [style]
+    lines.append(event)
+    
+    temp_dir = Path(getattr(Config, "TEMP_DIR", ".") or ".")
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile("w", encoding="utf-8", suffix=".ass", prefix="captions_wm_",
+                            dir=temp_dir, delete=False) as merged:
+        merged.write("\n".join(lines) + "\n")
+    return merged.name
+
+
+def write_concat_list(clip_paths: List[Union[str, Path]],
+                      segment_duration: Optional[float] = None) -> str:
+    """
+    Write an FFmpeg concat demuxer list into Config.TEMP_DIR
+    
+    Args:
+        clip_paths: Video clips in playback order
+        segment_duration: Seconds to take from each clip (whole clip if None)
+        
+    Returns:
+        Path to the list file, for "-f concat -safe 0 -i <path>"
+    """
+    temp_dir = Path(getattr(Config, "TEMP_DIR", ".") or ".")
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    outpoint = f"outpoint {segment_duration}\n" if segment_duration else ""
+    with NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", prefix="concat_",
+                            dir=temp_dir, delete=False) as list_file:
+        for clip in clip_paths:
+            clip_norm = Path(clip).resolve().as_posix().replace("'", "'\\''")
+            list_file.write(f"file '{clip_norm}'\n{outpoint}")
+    return list_file.name
+
+
+def write_clip_meta(clip_path: Union[str, Path], width: int, height: int, fps: int,
+                    duration: float, codec: str = "h264", pix_fmt: str = "yuv420p") -> None:
+    """
+    Record a rendered clip's stream format in <clip>.meta.json
+    
+    Read back by probe_video_stream, so clips this project rendered itself
+    are never ffprobed. Failure to write only costs a later probe.
+    """
+    meta = {"codec": codec, "w": width, "h": height, "pix_fmt": pix_fmt,
+            "fps": fps, "dur": duration}
+    try:
+        Path(f"{clip_path}.meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    except OSError as e:
+        logger.debug(f"Could not write clip metadata for {clip_path}: {e}")
+
+
+@lru_cache(maxsize=256)
+def _read_clip_meta(meta_path: str, mtime_ns: int) -> Optional[Tuple[str, ...]]:
+    """Parse a .meta.json sidecar into probe fields; mtime only keys the cache"""
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return (str(meta["codec"]), str(meta["w"]), str(meta["h"]),
+                str(meta["pix_fmt"]), f"{meta['fps']}/1")
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+@lru_cache(maxsize=256)
+def _probe_video_stream(path: str, mtime_ns: int, size: int) -> Optional[Tuple[str, ...]]:
+    """ffprobe the first video stream; mtime/size only key the cache"""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=codec_name,width,height,pix_fmt,r_frame_rate",
+             "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=15
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    fields = result.stdout.strip().split(",")
+    return tuple(fields) if result.returncode == 0 and len(fields) == 5 else None
+
+
+def probe_video_stream(path: Union[str, Path]) -> Optional[Tuple[str, ...]]:
+    """
+    Codec, width, height, pixel format and frame rate of a clip's video stream
+    
+    Taken from the clip's .meta.json sidecar (see write_clip_meta) when one
+    at least as new as the clip exists; otherwise probed once per file
+    version (path, mtime, size).
+    
+    Returns:
+        Tuple of ffprobe fields, or None if the file cannot be probed
+    """
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    try:
+        meta_stat = Path(f"{path}.meta.json").stat()
+    except OSError:
+        meta_stat = None
+    if meta_stat and meta_stat.st_mtime_ns >= stat.st_mtime_ns:
+        fields = _read_clip_meta(f"{path}.meta.json", meta_stat.st_mtime_ns)
+        if fields:
+            return fields
+    return _probe_video_stream(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def clip_fits_frame(clip_path: Union[str, Path], width: int, height: int) -> bool:
+    """True when a clip's frames are already width x height (no scale/pad needed)"""
+    probe = probe_video_stream(clip_path)
+    return bool(probe) and probe[1] == str(width) and probe[2] == str(height)
+
+
+def passthrough_fragment(gpu_frames: bool = False) -> str:
+    """
+    Filter chain for a clip already at the output size
+    
+    Args:
+        gpu_frames: The input arrives as CUDA frames and must be downloaded
+        
+    Returns:
+        setsar chain without input or output labels
+    """
+    return "hwdownload,format=nv12,setsar=1" if gpu_frames else "setsar=1"
+
+
+def clips_share_format(clip_paths: List[Union[str, Path]],
+                       width: Optional[int] = None, height: Optional[int] = None) -> bool:
+    """
+    Check that clips can be joined by the concat demuxer without re-scaling
+    
+    Args:
+        clip_paths: Video clips
+        width: Required frame width (any if None)
+        height: Required frame height (any if None)
+        
+    Returns:
+        True when every clip has the same codec, size, pixel format and
+        frame rate (and the required size, if given)
+    """
+    probes = {probe_video_stream(clip) for clip in clip_paths}
+    if len(probes) != 1 or None in probes:
+        return False
+    _, clip_width, clip_height, _, _ = probes.pop()
+    return ((width is None or clip_width == str(width)) and
+            (height is None or clip_height == str(height)))
+
+
+@lru_cache(maxsize=64)
+def _probe_duration(path: str, mtime_ns: int, size: int) -> Optional[float]:
+    """ffprobe the container duration; mtime/size only key the cache"""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=15
+        )
+        return float(result.stdout.strip()) if result.returncode == 0 else None
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return None
+
+
+def trim_audio(audio_path: Union[str, Path], duration: float) -> Optional[str]:
+    """
+    Stream-copy the first `duration` seconds of an audio file into TEMP_DIR
+    
+    Only done when the file runs more than 0.1 s past `duration`, so the
+    final render never decodes audio it would throw away and needs no
+    -shortest. No decode or re-encode happens here.
+    
+    Args:
+        audio_path: Narration audio
+        duration: Seconds to keep
+        
+    Returns:
+        Path to the trimmed copy (the caller deletes it), or None when the
+        original can be used as is or trimming failed
+    """
+    try:
+        stat = Path(audio_path).stat()
+    except OSError:
+        return None
+    audio_len = _probe_duration(str(audio_path), stat.st_mtime_ns, stat.st_size)
+    if audio_len is None or audio_len <= duration + 0.1:
+        return None
+    
+    temp_dir = Path(getattr(Config, "TEMP_DIR", ".") or ".")
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile(suffix=Path(audio_path).suffix, prefix="audio_trim_",
+                            dir=temp_dir, delete=False) as trimmed:
+        trimmed_path = trimmed.name
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+         "-i", str(audio_path), "-t", str(duration), "-c:a", "copy", trimmed_path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        logger.debug(f"Audio trim failed, using full file: {result.stderr.strip()}")
+        Path(trimmed_path).unlink(missing_ok=True)
+        return None
+    return trimmed_path
+
+
+def ffmpeg_log_args() -> List[str]:
+    """
+    Global options that keep FFmpeg's stderr down to errors
+    
+    No banner, no per-frame stats and no info chatter, so a caller that
+    captures stderr only ever buffers the lines it reports on failure.
+    DEBUG_MODE keeps FFmpeg's normal info output.
+    """
+    level = "info" if getattr(Config, "DEBUG_MODE", False) else "error"
+    return ["-hide_banner", "-nostats", "-loglevel", level]
+
+
 class FFmpegCommandBuilder:
     """Builder class for constructing FFmpeg commands with hardware acceleration"""
     
@@ -40,29 +534,29 @@ class FFmpegCommandBuilder:
         self.filter_complex_parts = []
         self.output_args = []
         self.input_count = 0
+        # Scratch files (concat lists) to delete once FFmpeg has finished
+        self.temp_files: List[str] = []
         
-        # Hardware acceleration settings
-        self.hw_encoder = getattr(Config, "HARDWARE_ENCODER", "h264_nvenc")
+        # Hardware acceleration settings (encoder probed once per process)
+        self.hw_encoder = detect_hw_encoder() if use_hardware_acceleration else "libx264"
         self.hw_decoder = getattr(Config, "HARDWARE_DECODER", "h264_cuvid")
-        self.nvenc_preset = getattr(Config, "NVENC_PRESET", "p1")
-        self.nvenc_tune = getattr(Config, "NVENC_TUNE", "ull")
-        self.nvenc_rc = getattr(Config, "NVENC_RC", "cbr")
-        self.nvenc_bitrate = getattr(Config, "NVENC_BITRATE", "5M")
-        self.nvenc_max_bitrate = getattr(Config, "NVENC_MAX_BITRATE", "8M")
-        self.nvenc_gop_size = getattr(Config, "NVENC_GOP_SIZE", 30)
     
     def add_input(self, path: Union[str, Path], duration: Optional[float] = None, 
                   is_image: bool = False, is_color: bool = False, 
-                  color: Optional[str] = None) -> int:
+                  color: Optional[str] = None, loop: bool = True,
+                  hw_decode: bool = False) -> int:
         """
         Add input to the command
         
         Args:
             path: Path to input file or color specification
             duration: Duration in seconds
-            is_image: Whether this is an image (will be looped)
+            is_image: Whether this is an image (looped unless loop=False)
             is_color: Whether this is a color input
             color: Color specification for color input
+            loop: Loop image inputs for the duration; pass False when a
+                filter (zoompan) generates the frames from a single image
+            hw_decode: Decode a video input on the GPU into CUDA frames
             
         Returns:
             Input index for referencing in filters
@@ -71,13 +565,26 @@ class FFmpegCommandBuilder:
         self.input_count += 1
         
         if is_color:
-            # Color input
-            color_hex = color or "%02x%02x%02x" % (30, 30, 40)
-            self.input_args.extend([
-                "-f", "lavfi",
-                "-t", str(duration or 1.0),
-                "-i", f"color=c=#{color_hex}:s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}:r={Config.VIDEO_FPS}"
-            ])
+            # Color input: a looped 1x1 PNG (see background_png), or a lavfi
+            # color source when the PNG cannot be written
+            color_hex = color or BACKGROUND_COLOR_HEX
+            png_path = background_png(color_hex)
+            if png_path:
+                self.input_args.extend([
+                    "-loop", "1",
+                    "-framerate", str(Config.VIDEO_FPS),
+                    "-t", str(duration or 1.0),
+                    "-i", png_path
+                ])
+            else:
+                self.input_args.extend([
+                    "-f", "lavfi",
+                    "-t", str(duration or 1.0),
+                    "-i", f"color=c=#{color_hex}:s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}:r={Config.VIDEO_FPS}"
+                ])
+        elif is_image and not loop:
+            # Single still frame; the filter chain sets the duration
+            self.input_args.extend(["-i", str(path)])
         elif is_image:
             # Image input (will be looped)
             self.input_args.extend([
@@ -86,16 +593,45 @@ class FFmpegCommandBuilder:
                 "-i", str(path)
             ])
         else:
-            # Video input
-            self.input_args.extend([
-                "-t", str(duration or 1.0),
-                "-i", str(path)
-            ])
+            # Video or audio input, read whole unless a duration is given
+            if hw_decode:
+                self.input_args.extend(cuda_decode_args())
+            if duration:
+                self.input_args.extend(["-t", str(duration)])
+            self.input_args.extend(["-i", str(path)])
         
         return input_index
     
+    def add_concat_list_input(self, clip_paths: List[Union[str, Path]],
+                              segment_duration: float, hw_decode: bool = False) -> int:
+        """
+        Add several video clips as one input through the concat demuxer
+        
+        The clips are joined while demuxing, so the filter graph gets a single
+        stream instead of one input and one concat pad per clip. All clips
+        must share codec, size and frame rate (see clips_share_format).
+        
+        Args:
+            clip_paths: Video clips in playback order
+            segment_duration: Seconds to take from each clip
+            hw_decode: Decode the joined stream on the GPU into CUDA frames
+            
+        Returns:
+            Input index for referencing in filters
+        """
+        list_path = write_concat_list(clip_paths, segment_duration)
+        self.temp_files.append(list_path)
+        
+        input_index = self.input_count
+        self.input_count += 1
+        if hw_decode:
+            self.input_args.extend(cuda_decode_args())
+        self.input_args.extend(["-f", "concat", "-safe", "0", "-i", list_path])
+        return input_index
+    
     def add_scale_filter(self, input_index: int, output_label: str, 
-                        width: int = None, height: int = None) -> str:
+                        width: int = None, height: int = None,
+                        gpu_frames: bool = False) -> str:
         """
         Add scaling filter for input
         
@@ -104,6 +640,7 @@ class FFmpegCommandBuilder:
             output_label: Label for output of this filter
             width: Target width (defaults to config)
             height: Target height (defaults to config)
+            gpu_frames: Input was added with hw_decode=True (needs CUDA scaling)
             
         Returns:
             Output label for chaining
@@ -111,14 +648,41 @@ class FFmpegCommandBuilder:
         width = width or Config.VIDEO_WIDTH
         height = height or Config.VIDEO_HEIGHT
         
-        filter_parts = [
-            f"[{input_index}:v]",
-            f"scale=w={width}:h={height}:force_original_aspect_ratio=decrease,",
-            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,",
-            f"setsar=1[{output_label}]"
-        ]
+        cuda = gpu_frames or use_cuda_scaling(self.hw_encoder)
+        scale_pad = scale_pad_fragment(width, height, cuda=cuda, gpu_frames=gpu_frames)
+        self.filter_complex_parts.append(f"[{input_index}:v]{scale_pad}[{output_label}]")
+        return output_label
+    
+    def add_passthrough_filter(self, input_index: int, output_label: str,
+                               gpu_frames: bool = False) -> str:
+        """
+        Add a no-scale filter for a video input already at the output size
         
-        self.filter_complex_parts.append("".join(filter_parts))
+        Args:
+            input_index: Index of the video input
+            output_label: Label for output of this filter
+            gpu_frames: Input was added with hw_decode=True
+            
+        Returns:
+            Output label for chaining
+        """
+        passthrough = passthrough_fragment(gpu_frames)
+        self.filter_complex_parts.append(f"[{input_index}:v]{passthrough}[{output_label}]")
+        return output_label
+    
+    def add_background_filter(self, input_index: int, output_label: str) -> str:
+        """
+        Add the fill filter for a color input (added with is_color=True)
+        
+        Args:
+            input_index: Index of the color input
+            output_label: Label for output of this filter
+            
+        Returns:
+            Output label for chaining
+        """
+        fill = background_fill_fragment(Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT)
+        self.filter_complex_parts.append(f"[{input_index}:v]{fill}[{output_label}]")
         return output_label
     
     def add_ken_burns_filter(self, input_index: int, output_label: str,
@@ -144,7 +708,9 @@ class FFmpegCommandBuilder:
             f"d={int(duration * Config.VIDEO_FPS)}:",
             f"x='iw/2-(iw/zoom/2)':",
             f"y='ih/2-(ih/zoom/2)':",
-            f"s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}[{output_label}]"
+            f"s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}:",
+            f"fps={Config.VIDEO_FPS},",
+            f"setsar=1[{output_label}]"
         ]
         
         self.filter_complex_parts.append("".join(filter_parts))
@@ -168,7 +734,8 @@ class FFmpegCommandBuilder:
         return output_label
     
     def add_subtitles_filter(self, input_label: str, output_label: str,
-                           ass_path: str) -> str:
+                           ass_path: str, watermark_text: Optional[str] = None,
+                           watermark_position: str = "top-right") -> str:
         """
         Add ASS subtitles filter
         
@@ -176,17 +743,27 @@ class FFmpegCommandBuilder:
             input_label: Input label
             output_label: Output label
             ass_path: Path to ASS subtitle file
+            watermark_text: Also draw this watermark in the same libass pass
+                (replaces a separate add_watermark_filter)
+            watermark_position: Corner for the watermark
             
         Returns:
             Output label for chaining
         """
+        if watermark_text:
+            ass_path = ass_with_watermark(
+                ass_path, watermark_text, watermark_position,
+                Config.WATERMARK_FONT_SIZE, getattr(Config, "WATERMARK_OPACITY", 0.6)
+            )
+            self.temp_files.append(ass_path)
+        
         fonts_dir = Path("fonts")
-        ass_norm = str(Path(ass_path)).replace("\\", "/")
-        fonts_norm = str(fonts_dir).replace("\\", "/")
+        ass_norm = filter_path(ass_path)
+        fonts_norm = filter_path(fonts_dir)
         
         filter_parts = [
             f"[{input_label}]",
-            f"subtitles={ass_norm}:fontsdir={fonts_norm}[{output_label}]"
+            f"subtitles='{ass_norm}':fontsdir='{fonts_norm}'[{output_label}]"
         ]
         
         self.filter_complex_parts.append("".join(filter_parts))
@@ -206,26 +783,11 @@ class FFmpegCommandBuilder:
         Returns:
             Output label for chaining
         """
-        # Escape text for FFmpeg
-        escaped_text = text.replace(":", "\\:").replace("'", "\\'")
-        
-        # Position calculations
-        pos_map = {
-            "top-right": "x=w-tw-20:y=20",
-            "top-left": "x=20:y=20",
-            "bottom-right": "x=w-tw-20:y=h-th-20",
-            "bottom-left": "x=20:y=h-th-20"
-        }
-        pos_xy = pos_map.get(position, "x=w-tw-20:y=20")
-        
-        filter_parts = [
-            f"[{input_label}]",
-            f"drawtext=text='{escaped_text}':",
-            f"fontcolor=white:fontsize={Config.WATERMARK_FONT_SIZE}:",
-            f"{pos_xy}:alpha={Config.WATERMARK_OPACITY}[{output_label}]"
-        ]
-        
-        self.filter_complex_parts.append("".join(filter_parts))
+        drawtext = watermark_drawtext(
+            text, position, Config.WATERMARK_FONT_SIZE,
+            getattr(Config, "WATERMARK_OPACITY", 0.6)
+        )
+        self.filter_complex_parts.append(f"[{input_label}]{drawtext}[{output_label}]")
         return output_label
     
     def set_output_args(self, output_path: Union[str, Path], 
@@ -245,27 +807,12 @@ class FFmpegCommandBuilder:
         self.output_args = [
             "-map", "[vout]",
             "-map", f"{audio_input_index}:a",
-            "-shortest",
             "-r", str(fps),
             "-t", str(max(0.1, duration))
         ]
         
-        # Add hardware acceleration if enabled
-        if self.use_hardware_acceleration:
-            self.output_args.extend([
-                "-c:v", self.hw_encoder,
-                "-preset", self.nvenc_preset,
-                "-tune", self.nvenc_tune,
-                "-rc", self.nvenc_rc,
-                "-b:v", self.nvenc_bitrate,
-                "-maxrate", self.nvenc_max_bitrate,
-                "-g", str(self.nvenc_gop_size)
-            ])
-        else:
-            self.output_args.extend([
-                "-c:v", "libx264",
-                "-preset", "fast"
-            ])
+        # Video encoder: detected hardware encoder, or libx264
+        self.output_args.extend(["-c:v", self.hw_encoder, *encoder_output_args(self.hw_encoder)])
         
         # Audio codec
         self.output_args.extend([
@@ -283,7 +830,7 @@ class FFmpegCommandBuilder:
     
     def build_command(self) -> List[str]:
         """Build the complete FFmpeg command"""
-        cmd = ["ffmpeg", "-y"]
+        cmd = ["ffmpeg", "-y", *ffmpeg_log_args()]
         cmd.extend(self.input_args)
         
         if self.filter_complex_parts:
@@ -395,87 +942,266 @@ def create_static_video(image_path: Union[str, Path], duration: float,
         raise VideoProcessingError(f"Failed to create static video: {e}")
 
 
-def combine_video_with_audio(video_clips: List[Union[str, Path]], 
-                           audio_path: Union[str, Path],
-                           audio_duration: float,
-                           output_path: Union[str, Path],
-                           caption_ass_path: Optional[str] = None) -> str:
-    """
-    Combine video clips with audio using optimized FFmpeg command
+class FFmpegProcess:
+    """Running FFmpeg command with progress and stderr drained in background threads"""
     
-    Args:
-        video_clips: List of video/image paths
-        audio_path: Path to audio file
-        audio_duration: Duration of audio
-        output_path: Path to output video
-        caption_ass_path: Optional path to ASS subtitle file
+    def __init__(self, cmd: List[str], total_duration: float,
+                 output_path: Union[str, Path],
+                 on_progress: Optional[Callable[[float], None]] = None,
+                 temp_files: Optional[List[str]] = None):
+        """
+        Start FFmpeg without blocking the caller
         
-    Returns:
-        Path to created video
-    """
-    builder = FFmpegCommandBuilder(use_hardware_acceleration=True)
+        Args:
+            cmd: FFmpeg command as built by FFmpegCommandBuilder
+            total_duration: Expected output duration, used for the percentage
+            output_path: Path FFmpeg writes to
+            on_progress: Optional callback receiving the completed fraction (0-1)
+            temp_files: Scratch files the command reads, deleted after it exits
+        """
+        self.output_path = str(output_path)
+        self.temp_files = list(temp_files or [])
+        self.total_duration = max(total_duration, 0.001)
+        self.on_progress = on_progress or _print_progress
+        self._stderr_tail = deque(maxlen=40)
+        
+        # -progress is a global option, so it goes straight after the binary
+        self.proc = subprocess.Popen(
+            [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            env=ffmpeg_env(),
+        )
+        self._threads = [
+            threading.Thread(target=self._drain_progress, args=(self.proc.stdout,), daemon=True),
+            threading.Thread(target=self._drain_stderr, args=(self.proc.stderr,), daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
     
-    # Add video inputs
-    video_labels = []
-    for i, clip in enumerate(video_clips):
-        clip_path = Path(clip)
-        if clip_path.suffix.lower() in ['.mp4', '.avi', '.mov', '.mkv']:
-            # Video file
-            input_idx = builder.add_input(clip, audio_duration / len(video_clips))
-        else:
-            # Image file
-            input_idx = builder.add_input(clip, audio_duration / len(video_clips), is_image=True)
+    def _drain_progress(self, stream) -> None:
+        """Parse key=value progress lines and report the completed fraction"""
+        last_fraction = -1.0
+        for line in stream:
+            key, _, value = line.strip().partition("=")
+            # out_time_ms is in microseconds despite its name
+            if key == "out_time_ms" and value.isdigit():
+                fraction = min(0.999, int(value) / 1_000_000 / self.total_duration)
+            elif key == "progress" and value == "end":
+                fraction = 1.0
+            else:
+                continue
+            if fraction != last_fraction:
+                last_fraction = fraction
+                try:
+                    self.on_progress(fraction)
+                except Exception as e:
+                    # Keep draining: FFmpeg blocks once the stdout pipe fills
+                    logger.warning(f"FFmpeg progress callback failed: {e}")
+        stream.close()
+    
+    def _drain_stderr(self, stream) -> None:
+        """Keep the last stderr lines for error reports without filling the pipe"""
+        for line in stream:
+            self._stderr_tail.append(line)
+        stream.close()
+    
+    def poll(self) -> Optional[int]:
+        """Return FFmpeg's exit code, or None while it is still running"""
+        return self.proc.poll()
+    
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """
+        Wait for FFmpeg to finish
+        
+        Returns:
+            Path to created video
+        """
+        returncode = self.proc.wait(timeout=timeout)
+        for thread in self._threads:
+            thread.join()
+        for temp_file in self.temp_files:
+            Path(temp_file).unlink(missing_ok=True)
+        
+        if returncode != 0:
+            # Partial output, or the empty placeholder reserved for the name
+            Path(self.output_path).unlink(missing_ok=True)
+            stderr = "".join(self._stderr_tail)
+            logger.error(f"FFmpeg failed: {stderr}")
+            raise VideoProcessingError(f"Video combination failed: {stderr}")
         
-        # Scale each input
-        label = f"v{i}"
-        builder.add_scale_filter(input_idx, label)
-        video_labels.append(label)
+        logger.info(f"Video created successfully: {self.output_path}")
+        return self.output_path
+
+
+def _print_progress(fraction: float) -> None:
+    """Default progress callback: single-line percentage on stdout"""
+    end = "\n" if fraction >= 1.0 else ""
+    print(f"\r  Rendering: {fraction:6.1%}", end=end, flush=True)
+
+
+_VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+def _combine_builder(video_clips: List[Union[str, Path]],
+                     audio_path: Union[str, Path],
+                     audio_duration: float,
+                     output_path: Union[str, Path],
+                     caption_ass_path: Optional[str] = None) -> FFmpegCommandBuilder:
+    """Builder holding the combine command and the scratch files it needs"""
+    builder = FFmpegCommandBuilder(use_hardware_acceleration=True)
     
-    # Concatenate videos
-    if video_labels:
-        concat_label = builder.add_concat_filter(video_labels, "vc")
+    segment_duration = audio_duration / max(1, len(video_clips))
+    # With NVENC, video files are decoded on NVDEC and scaled on the GPU too
+    gpu_decode = use_cuda_scaling(builder.hw_encoder)
+    if len(video_clips) > 1 and all(
+        Path(clip).suffix.lower() in _VIDEO_EXTENSIONS for clip in video_clips
+    ) and clips_share_format(video_clips):
+        # Pre-rendered clips: join in the demuxer, one scale for the whole stream
+        input_idx = builder.add_concat_list_input(video_clips, segment_duration,
+                                                  hw_decode=gpu_decode)
+        concat_label = builder.add_scale_filter(input_idx, "vc", gpu_frames=gpu_decode)
     else:
-        # No video clips, create solid background
-        input_idx = builder.add_input("", audio_duration, is_color=True)
-        concat_label = builder.add_scale_filter(input_idx, "vc")
-    
-    # Add subtitles if provided
-    current_label = concat_label
-    if caption_ass_path and Path(caption_ass_path).exists():
-        current_label = builder.add_subtitles_filter(concat_label, "vc_subs", caption_ass_path)
+        # Add video inputs
+        video_labels = []
+        for i, clip in enumerate(video_clips):
+            clip_path = Path(clip)
+            # A lone clip feeds [vc] directly: no single-input concat node
+            label = "vc" if len(video_clips) == 1 else f"v{i}"
+            if clip_path.suffix.lower() in _VIDEO_EXTENSIONS:
+                # Video file (e.g. pre-rendered Ken Burns clip): scale to frame
+                # (skipped when the clip is already at the output size)
+                input_idx = builder.add_input(clip, segment_duration, hw_decode=gpu_decode)
+                if clip_fits_frame(clip, Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT):
+                    builder.add_passthrough_filter(input_idx, label, gpu_frames=gpu_decode)
+                else:
+                    builder.add_scale_filter(input_idx, label, gpu_frames=gpu_decode)
+            else:
+                # Image file: Ken Burns zoompan inline in this graph, so no
+                # separate FFmpeg process or intermediate clip encode per image
+                input_idx = builder.add_input(clip, is_image=True, loop=False)
+                builder.add_ken_burns_filter(input_idx, label, segment_duration)
+            video_labels.append(label)
+        
+        # Concatenate videos
+        if len(video_labels) > 1:
+            concat_label = builder.add_concat_filter(video_labels, "vc")
+        elif video_labels:
+            concat_label = "vc"
+        else:
+            # No video clips, create solid background
+            input_idx = builder.add_input("", audio_duration, is_color=True)
+            concat_label = builder.add_background_filter(input_idx, "vc")
     
-    # Add watermark
+    # Add subtitles if provided, with the watermark drawn in the same libass
+    # pass; without captions the watermark is a drawtext filter
     watermark_text = getattr(Config, "WATERMARK_TEXT", "AI Generated")
     watermark_pos = getattr(Config, "WATERMARK_POSITION_MODE", "top-right")
-    final_label = builder.add_watermark_filter(current_label, "vout", watermark_text, watermark_pos)
+    if caption_ass_path and Path(caption_ass_path).exists():
+        builder.add_subtitles_filter(concat_label, "vout", caption_ass_path,
+                                     watermark_text, watermark_pos)
+    else:
+        builder.add_watermark_filter(concat_label, "vout", watermark_text, watermark_pos)
     
-    # Add audio input
-    audio_input_idx = builder.add_input(audio_path)
+    # Add audio input (pre-trimmed by stream copy when it runs long)
+    trimmed_audio = trim_audio(audio_path, audio_duration)
+    if trimmed_audio:
+        builder.temp_files.append(trimmed_audio)
+    audio_input_idx = builder.add_input(trimmed_audio or audio_path)
     
     # Set output
     builder.set_output_args(output_path, audio_input_idx, audio_duration)
     
-    # Build and execute command
+    return builder
+
+
+def build_combine_command(video_clips: List[Union[str, Path]],
+                          audio_path: Union[str, Path],
+                          audio_duration: float,
+                          output_path: Union[str, Path],
+                          caption_ass_path: Optional[str] = None) -> List[str]:
+    """
+    Build the FFmpeg command that combines video clips, audio and captions
+    
+    Args:
+        video_clips: List of video/image paths
+        audio_path: Path to audio file
+        audio_duration: Duration of audio
+        output_path: Path to output video
+        caption_ass_path: Optional path to ASS subtitle file
+        
+    Returns:
+        FFmpeg command as a list of arguments
+    """
+    return _combine_builder(video_clips, audio_path, audio_duration,
+                            output_path, caption_ass_path).build_command()
+
+
+def start_combine_video_with_audio(video_clips: List[Union[str, Path]],
+                                   audio_path: Union[str, Path],
+                                   audio_duration: float,
+                                   output_path: Union[str, Path],
+                                   caption_ass_path: Optional[str] = None,
+                                   on_progress: Optional[Callable[[float], None]] = None) -> FFmpegProcess:
+    """
+    Start combining video clips with audio and return without waiting
+    
+    The caller can prepare the next video while FFmpeg renders, then call
+    wait() on the returned process to collect the output path.
+    
+    Args:
+        video_clips: List of video/image paths
+        audio_path: Path to audio file
+        audio_duration: Duration of audio
+        output_path: Path to output video
+        caption_ass_path: Optional path to ASS subtitle file
+        on_progress: Optional callback receiving the completed fraction (0-1)
+        
+    Returns:
+        Running FFmpegProcess
+    """
+    builder = _combine_builder(video_clips, audio_path, audio_duration,
+                               output_path, caption_ass_path)
     cmd = builder.build_command()
     
     try:
         logger.info(f"Combining video with audio: {len(video_clips)} clips")
         logger.debug(f"FFmpeg command: {' '.join(cmd)}")
-        
-        result = subprocess.run(cmd, text=True, capture_output=True)
-        
-        if result.returncode != 0:
-            logger.error(f"FFmpeg failed: {result.stderr}")
-            raise VideoProcessingError(f"Video combination failed: {result.stderr}")
-        
-        logger.info(f"Video created successfully: {output_path}")
-        return str(output_path)
-        
-    except Exception as e:
+        return FFmpegProcess(cmd, audio_duration, output_path, on_progress,
+                             temp_files=builder.temp_files)
+    except OSError as e:
+        for temp_file in builder.temp_files:
+            Path(temp_file).unlink(missing_ok=True)
         logger.error(f"Video combination error: {e}")
         raise VideoProcessingError(f"Failed to combine video: {e}")
 
 
+def combine_video_with_audio(video_clips: List[Union[str, Path]], 
+                           audio_path: Union[str, Path],
+                           audio_duration: float,
+                           output_path: Union[str, Path],
+                           caption_ass_path: Optional[str] = None) -> str:
+    """
+    Combine video clips with audio using optimized FFmpeg command
+    
+    Args:
+        video_clips: List of video/image paths
+        audio_path: Path to audio file
+        audio_duration: Duration of audio
+        output_path: Path to output video
+        caption_ass_path: Optional path to ASS subtitle file
+        
+    Returns:
+        Path to created video
+    """
+    process = start_combine_video_with_audio(video_clips, audio_path, audio_duration,
+                                             output_path, caption_ass_path)
+    return process.wait()
+
+
 def check_ffmpeg_availability() -> Tuple[bool, str]:
     """
     Check if FFmpeg is available and supports required features
@@ -512,7 +1238,8 @@ def check_hardware_acceleration() -> Dict[str, bool]:
         "nvenc": False,
         "cuvid": False,
         "qsv": False,
-        "vaapi": False
+        "vaapi": False,
+        "videotoolbox": False
     }
     
     try:
@@ -525,6 +1252,7 @@ def check_hardware_acceleration() -> Dict[str, bool]:
             acceleration["cuvid"] = "h264_cuvid" in output
             acceleration["qsv"] = "h264_qsv" in output
             acceleration["vaapi"] = "h264_vaapi" in output
+            acceleration["videotoolbox"] = "h264_videotoolbox" in output
         
     except Exception as e:
         logger.warning(f"Could not check hardware acceleration: {e}")
@@ -532,6 +1260,153 @@ def check_hardware_acceleration() -> Dict[str, bool]:
     return acceleration
 
 
+def _encoder_works(encoder: str) -> bool:
+    """Encode a few blank frames to confirm the encoder initialises on this machine."""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error",
+             "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.1",
+             "-c:v", encoder, "-f", "null", "-"],
+            capture_output=True, timeout=15
+        )
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+@lru_cache(maxsize=1)
+def detect_hw_encoder() -> str:
+    """
+    Pick the H.264 encoder for final renders (probed once per process).
+    
+    Prefers NVENC, then Quick Sync, then VideoToolbox. An encoder only counts
+    when FFmpeg lists it *and* a test encode succeeds, since stock FFmpeg
+    builds list NVENC even without an NVIDIA GPU. VAAPI is skipped because it
+    needs an explicit device and hwupload chain.
+    
+    Returns:
+        Encoder name, "libx264" when no hardware encoder is usable
+    """
+    if not getattr(Config, "USE_GPU_ENCODING", True):
+        return "libx264"
+    
+    available = check_hardware_acceleration()
+    for feature, encoder in (("nvenc", "h264_nvenc"),
+                             ("qsv", "h264_qsv"),
+                             ("videotoolbox", "h264_videotoolbox")):
+        if available.get(feature) and _encoder_works(encoder):
+            logger.info(f"Using hardware encoder: {encoder}")
+            return encoder
+    
+    logger.info("No hardware H.264 encoder available, using libx264")
+    return "libx264"
+
+
+@lru_cache(maxsize=1)
+def cuda_scale_available() -> bool:
+    """
+    Check that this FFmpeg can scale and pad on the GPU
+    
+    pad_cuda only exists in recent FFmpeg builds, so the whole upload,
+    scale, pad, download chain is test-run once per process.
+    
+    Returns:
+        True when scale_pad_fragment(..., cuda=True) will work
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error",
+             "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.1",
+             "-vf", scale_pad_fragment(128, 128, cuda=True),
+             "-f", "null", "-"],
+            capture_output=True, timeout=15
+        )
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def use_cuda_scaling(encoder: str) -> bool:
+    """Scale/pad on the GPU only when NVENC already has the CUDA device busy"""
+    return encoder.endswith("_nvenc") and cuda_scale_available()
+
+
+def cuda_decode_args() -> List[str]:
+    """
+    Input options that decode a video file on NVDEC into CUDA frames
+    
+    Use only together with scale_pad_fragment(..., cuda=True, gpu_frames=True)
+    (or an explicit hwdownload), since CPU filters cannot read CUDA frames.
+    """
+    return ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"]
+
+
+def encoder_output_args(encoder: str) -> List[str]:
+    """
+    Rate-control/preset arguments for an encoder chosen by detect_hw_encoder.
+    
+    Args:
+        encoder: FFmpeg encoder name
+        
+    Returns:
+        Output arguments to follow "-c:v <encoder>"
+    """
+    gop = str(getattr(Config, "NVENC_GOP_SIZE", 30))
+    quality_mode = getattr(Config, "ENCODE_MODE", "bitrate") == "quality"
+    if quality_mode and (encoder.endswith("_nvenc") or encoder == "libx264"):
+        return _quality_output_args(encoder)
+    if encoder.endswith("_nvenc"):
+        return [
+            "-preset", getattr(Config, "NVENC_PRESET", "p4"),
+            "-tune", getattr(Config, "NVENC_TUNE", "hq"),
+            "-rc", getattr(Config, "NVENC_RC", "vbr"),
+            "-b:v", getattr(Config, "NVENC_BITRATE", "5M"),
+            "-maxrate", getattr(Config, "NVENC_MAX_BITRATE", "8M"),
+            "-g", gop
+        ]
+    if encoder == "h264_qsv":
+        return ["-preset", "faster", "-global_quality", str(getattr(Config, "VIDEO_CRF", 23)), "-g", gop]
+    if encoder == "h264_videotoolbox":
+        return ["-b:v", getattr(Config, "GPU_BITRATE", "5M"), "-g", gop]
+    args = [
+        "-preset", getattr(Config, "VIDEO_PRESET", "veryfast"),
+        "-crf", str(getattr(Config, "VIDEO_CRF", 23))
+    ]
+    # Slideshow profile: slow Ken Burns pans give motion search almost nothing to find
+    tune = getattr(Config, "VIDEO_X264_TUNE", "")
+    if tune:
+        args += ["-tune", tune]
+    x264_params = getattr(Config, "VIDEO_X264_PARAMS", "")
+    if x264_params:
+        args += ["-x264-params", x264_params]
+    return args
+
+
+def _quality_output_args(encoder: str) -> List[str]:
+    """
+    Constant-quality arguments for ENCODE_MODE = "quality" (NVENC or libx264)
+    
+    Bits follow content instead of a fixed rate: the static caption and
+    watermark regions cost almost nothing, and a longer GOP with B-frames
+    and extra references lets the encoder reuse them across frames.
+    """
+    if encoder.endswith("_nvenc"):
+        return [
+            "-preset", getattr(Config, "NVENC_PRESET", "p4"),
+            "-rc", "vbr",
+            "-cq", str(getattr(Config, "NVENC_CQ", 21)),
+            "-b:v", "0",
+            "-maxrate", getattr(Config, "NVENC_MAX_BITRATE", "8M"),
+            "-g", "60", "-bf", "2", "-refs", "3",
+            "-spatial-aq", "1", "-temporal-aq", "1"
+        ]
+    args = ["-preset", "veryfast", "-crf", str(getattr(Config, "QUALITY_CRF", 20)), "-g", "60"]
+    tune = getattr(Config, "VIDEO_X264_TUNE", "")
+    if tune:
+        args += ["-tune", tune]
+    return args
+
+
 if __name__ == "__main__":
     # Test video utilities
     print("=" * 60)